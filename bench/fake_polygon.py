@@ -0,0 +1,175 @@
+""" Local stand-in for the aggregates endpoint of api.polygon.io
+
+Serves synthetic candles under the same URL scheme and response format as
+`/v2/aggs/ticker/{ticker}/range/{mult}/{timespan}/{from}/{to}`, with configurable
+page size (`next_url` pagination), latency and rate limited (429) responses.
+
+Run standalone with `python -m bench.fake_polygon --port 8080`.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse, json, random, threading, time
+
+import numpy as np
+
+from trbot import candles
+from trbot.candles import Timespan
+from trbot.store import Columns
+
+from . import synthetic
+
+
+class FakePolygonServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, page_size: int = 5000,
+        latency: float = 0.0, error_rate: float = 0.0, seed: int = 0,
+        start: str = "2020-01-01 00:00:00", end: str = "2026-01-01 00:00:00"
+    ) -> None:
+        self.page_size: int = page_size
+        self.latency: float = latency
+        self.error_rate: float = error_rate
+        self._start: int = candles.datetime_to_timestamp(start)
+        self._end: int = candles.datetime_to_timestamp(end)
+        self._random: random.Random = random.Random(seed)
+        self._datasets: dict[tuple[str, int, str], Columns] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+        self.num_requests: int = 0
+        self.num_rate_limited: int = 0
+
+        server = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                server._handle(self)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self._httpd: ThreadingHTTPServer = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakePolygonServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def _dataset(self, ticker: str, mult: int, timespan: str) -> Columns:
+        key = (ticker, mult, timespan)
+        with self._lock:
+            if key not in self._datasets:
+                step_ms: int = mult * Timespan(timespan).to_ms()
+                self._datasets[key] = synthetic.generate(
+                    (self._end - self._start) // step_ms,
+                    seed=synthetic.ticker_seed(ticker),
+                    start=self._start,
+                    step_ms=step_ms
+                )
+            return self._datasets[key]
+
+    def _handle(self, req: BaseHTTPRequestHandler) -> None:
+        with self._lock:
+            self.num_requests += 1
+            rate_limited: bool = self._random.random() < self.error_rate
+            if rate_limited:
+                self.num_rate_limited += 1
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        url = urlparse(req.path)
+        parts: list[str] = url.path.strip("/").split("/")
+        # ["v2", "aggs", "ticker", TICKER, "range", MULT, TIMESPAN, FROM, TO]
+        if len(parts) != 9 or parts[:3] != ["v2", "aggs", "ticker"] or parts[4] != "range":
+            self._send(req, 404, { "status": "NOT_FOUND", "message": f"Unknown path: {url.path}" })
+            return
+
+        if rate_limited:
+            self._send(req, 429, {
+                "status": "ERROR",
+                "message": "You've exceeded the maximum requests per minute."
+            })
+            return
+
+        query: dict[str, list[str]] = parse_qs(url.query)
+        ticker: str = parts[3]
+        mult: int = int(parts[5])
+        timespan: str = parts[6]
+        from_ts: int = int(parts[7])
+        to_ts: int = int(parts[8])
+        limit: int = min(int(query.get("limit", ["5000"])[0]), self.page_size)
+
+        timestamps, open_, high, low, close, volume = self._dataset(ticker, mult, timespan)
+        lo: int = int(np.searchsorted(timestamps, from_ts, side="left"))
+        hi: int = int(np.searchsorted(timestamps, to_ts, side="right"))
+        page_end: int = min(hi, lo + limit)
+
+        results: list[dict] = [
+            { "v": v, "o": o, "c": c, "h": h, "l": l, "t": t, "n": 1 }
+            for t, o, h, l, c, v in zip(
+                timestamps[lo:page_end].tolist(), open_[lo:page_end].tolist(),
+                high[lo:page_end].tolist(), low[lo:page_end].tolist(),
+                close[lo:page_end].tolist(), volume[lo:page_end].tolist()
+            )
+        ]
+        root: dict = {
+            "ticker": ticker,
+            "queryCount": len(results),
+            "resultsCount": len(results),
+            "adjusted": True,
+            "results": results,
+            "status": "OK",
+            "request_id": f"fake-{self.num_requests}",
+            "count": len(results),
+        }
+        if page_end < hi:
+            host: str = req.headers.get("Host", "")
+            root["next_url"] = (
+                f"http://{host}/v2/aggs/ticker/{ticker}/range/{mult}/{timespan}"
+                f"/{int(timestamps[page_end])}/{to_ts}?adjusted=true&limit={limit}"
+            )
+
+        self._send(req, 200, root)
+
+    def _send(self, req: BaseHTTPRequestHandler, status: int, root: dict) -> None:
+        body: bytes = json.dumps(root).encode()
+        req.send_response(status)
+        req.send_header("Content-Type", "application/json")
+        req.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            req.send_header("Retry-After", "0")
+        req.end_headers()
+        req.wfile.write(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--page-size", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 429 responses")
+    args = parser.parse_args()
+
+    server = FakePolygonServer(
+        args.host, args.port, page_size=args.page_size, latency=args.latency,
+        error_rate=args.error_rate
+    )
+    print(f"Serving fake aggregates on {server.url}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
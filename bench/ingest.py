@@ -0,0 +1,96 @@
+""" Ingest benchmark against the local Polygon stand-in
+
+Downloads the candles of many tickers from a `FakePolygonServer` through the same code
+path used against the real API and reports the throughput, e.g.
+
+    python -m bench.ingest --tickers 20 --mult 1 --timespan minute --days 30 --latency 0.05
+"""
+from datetime import datetime, timedelta
+import argparse, json, time
+
+from trbot import broker, downloader
+from trbot.candles import CandleBatch, CandleOption, Timespan
+
+from .fake_polygon import FakePolygonServer
+
+
+# Settings of the broker module pointed to the local server for the length of a run
+_BROKER_SETTINGS: tuple[str, ...] = ("_BASE_URL", "_API_KEY", "_RATE_LIMITER", "_BACKOFF_BASE_SEC")
+
+def run(num_tickers: int = 20, mult: int = 1, timespan: Timespan = Timespan.MINUTE,
+    days: int = 30, workers: int = 8, page_size: int = 5000, latency: float = 0.0,
+    error_rate: float = 0.0, sequential: bool = False
+) -> dict:
+    server = FakePolygonServer(page_size=page_size, latency=latency, error_rate=error_rate).start()
+    # NOTE: restored once done, so a run doesn't leak into whatever imported the bench
+    saved: dict = { name: getattr(broker, name) for name in _BROKER_SETTINGS }
+    try:
+        broker.set_base_url(server.url)
+        broker.set_api_key("fake")
+        # No quota on the local server, and its 429s tell the client to retry right away
+        broker.set_rate_limit(10 ** 9, burst=10 ** 6)
+        broker._BACKOFF_BASE_SEC = 0.0
+
+        start: datetime = datetime(2021, 1, 4)
+        opts: list[CandleOption] = [
+            CandleOption(
+                ticker=f"T{i:03}",
+                start=start.strftime("%Y-%m-%d %H:%M:%S"),
+                end=(start + timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S"),
+                mult=mult,
+                timespan=timespan
+            )
+            for i in range(num_tickers)
+        ]
+
+        t: float = time.perf_counter()
+        results: list[CandleBatch]
+        if sequential:
+            results = [ broker.get_historical_candles(opt) for opt in opts ]
+        else:
+            results = downloader.download_many(opts, max_workers=workers, show_progress=False)
+        elapsed: float = time.perf_counter() - t
+    finally:
+        for name, value in saved.items():
+            setattr(broker, name, value)
+        server.stop()
+
+    num_candles: int = sum(len(cnds) for cnds in results)
+    return {
+        "tickers": num_tickers,
+        "candles": num_candles,
+        "requests": server.num_requests,
+        "rate_limited": server.num_rate_limited,
+        "seconds": elapsed,
+        "candles_per_sec": num_candles / elapsed if elapsed > 0 else float("inf"),
+        "mode": "sequential" if sequential else f"concurrent ({workers} workers)",
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--mult", type=int, default=1)
+    parser.add_argument("--timespan", default="minute", choices=[ ts.value for ts in Timespan ])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--page-size", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--sequential", action="store_true", help="one request after another")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    result: dict = run(
+        num_tickers=args.tickers, mult=args.mult, timespan=Timespan(args.timespan),
+        days=args.days, workers=args.workers, page_size=args.page_size,
+        latency=args.latency, error_rate=args.error_rate, sequential=args.sequential
+    )
+    for k, v in result.items():
+        print(f"{k:>16}: {v:.3f}" if isinstance(v, float) else f"{k:>16}: {v}")
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=4)
+
+if __name__ == "__main__":
+    main()
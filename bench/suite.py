@@ -0,0 +1,216 @@
+""" Benchmark suite over synthetic candle datasets
+
+Times the main hot paths (stockframe construction and loading, indicators, backtests,
+aggregate parsing and portfolio persistence) for every dataset size, e.g.
+
+    python -m bench.suite --sizes 10000,1000000,10000000 --out before.json
+    python -m bench.suite --sizes 10000,1000000,10000000 --compare before.json
+
+Benchmarks of the slow paths (Python code run once per candle, CSV files) are only run
+on datasets of up to `--max-loop-size` candles.
+"""
+from typing import Callable
+import argparse, json, os, platform, subprocess, tempfile, time
+
+import numpy as np
+import talib
+
+from trbot import candles, streaming
+from trbot.candles import CandleBatch, Timespan
+from trbot.journal import PortfolioJournal
+from trbot.portfolio import Order, OrderStatus, OrderType, Portfolio
+from trbot.stockframe import Stockframe
+from trbot.strategy import Strategy
+
+from . import synthetic
+
+
+class CrossoverStrategy(Strategy):
+    PARAMS = {
+        "fast_period": 8,
+        "slow_period": 21,
+    }
+
+    def setup(self) -> None:
+        close = self._sf.close
+        self.fast_ma = self.TA_EMA(close, period=self.params["fast_period"])
+        self.slow_ma = self.TA_EMA(close, period=self.params["slow_period"])
+
+    def on_candle(self) -> Order | None:
+        if self.ind_crossover(self.fast_ma, self.slow_ma):
+            return self.buy(1)
+
+        if self.ind_crossover(self.slow_ma, self.fast_ma):
+            return self.sell(1)
+
+        return None
+
+
+def _time(fn: Callable[[], object], repeat: int) -> float:
+    """ Best wall-clock time (in seconds) out of `repeat` runs """
+    best: float = float("inf")
+    for _ in range(repeat):
+        t: float = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+def _orders(count: int) -> list[Order]:
+    orders: list[Order] = []
+    for i in range(count):
+        order = Order(
+            symbol="SYN",
+            order_type=OrderType.MARKET,
+            quantity=1.0 if i % 2 == 0 else -1.0,
+            purchase_price=100.0 + i % 50,
+            purchase_dt=candles.timestamp_to_datetime(synthetic.DEFAULT_START + i * 60_000)
+        )
+        order.status = OrderStatus.FILLED
+        orders.append(order)
+    return orders
+
+def run(sizes: list[int], repeat: int = 3, max_loop_size: int = 1_000_000) -> list[dict]:
+    results: list[dict] = []
+
+    def record(name: str, size: int, seconds: float) -> None:
+        results.append({
+            "name": name,
+            "size": size,
+            "seconds": seconds,
+            "items_per_sec": size / seconds if seconds > 0 else float("inf"),
+        })
+        print(f"{name:<32} {size:>12,} {seconds * 1000:>12.3f} ms {size / max(seconds, 1e-12):>16,.0f} /s")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in sizes:
+            columns = synthetic.generate(size, seed=size)
+            batch = CandleBatch(*columns)
+            sf = Stockframe.from_arrays("SYN", 1, Timespan.MINUTE, *columns)
+
+            # ===================== STOCKFRAME =====================
+            record("stockframe.from_batch", size, _time(
+                lambda: Stockframe(batch, "SYN", 1, Timespan.MINUTE), repeat
+            ))
+            if size <= max_loop_size:
+                cnds = list(batch)
+                record("stockframe.from_candles", size, _time(
+                    lambda: Stockframe(cnds, "SYN", 1, Timespan.MINUTE), repeat
+                ))
+                del cnds
+
+            if size <= max_loop_size:
+                csv_path: str = candles.candles_outpath(tmpdir, "SYN", 1, Timespan.MINUTE)
+                record("stockframe.save_to_csv", size, _time(lambda: sf.save_to_csv(tmpdir), 1))
+                record("stockframe.from_csv", size, _time(lambda: Stockframe.from_csv(csv_path), 1))
+                os.remove(csv_path)
+
+            store_path: str = candles.store_outpath(tmpdir, "SYN", 1, Timespan.MINUTE)
+            record("stockframe.save_to_store", size, _time(lambda: sf.save_to_store(tmpdir), repeat))
+            record("stockframe.from_store", size, _time(lambda: Stockframe.from_store(store_path), repeat))
+            record("stockframe.from_store+sum", size, _time(
+                lambda: float(Stockframe.from_store(store_path).close.sum()), repeat
+            ))
+            os.remove(store_path)
+
+            # ===================== INDICATORS =====================
+            close = sf.close
+            record("talib.SMA_30", size, _time(lambda: talib.SMA(close, timeperiod=30), repeat))
+            record("talib.EMA_30", size, _time(lambda: talib.EMA(close, timeperiod=30), repeat))
+            record("talib.RSI_14", size, _time(lambda: talib.RSI(close, timeperiod=14), repeat))
+            if size <= max_loop_size:
+                values: list[float] = close.tolist()
+                def stream_ema() -> None:
+                    ema = streaming.StreamingEMA(30)
+                    for v in values:
+                        ema.update(v)
+                record("streaming.EMA_30", size, _time(stream_ema, 1))
+
+            # ===================== BACKTEST =====================
+            if size <= max_loop_size:
+                def backtest() -> None:
+                    CrossoverStrategy(sf).run(fast_forward=True, verbose=False)
+                record("strategy.run(fast_forward)", size, _time(backtest, 1))
+
+            # ===================== AGGREGATES PARSING =====================
+            if size <= max_loop_size:
+                page: bytes = json.dumps({
+                    "results": [
+                        { "v": v, "o": o, "c": c, "h": h, "l": l, "t": t, "n": 1 }
+                        for t, o, h, l, c, v in zip(*(col.tolist() for col in columns))
+                    ]
+                }).encode()
+                record("aggregates.parse", size, _time(
+                    lambda: CandleBatch.from_results(json.loads(page)["results"]), 1
+                ))
+                del page
+
+            # ===================== PORTFOLIO PERSISTENCE =====================
+            num_orders: int = min(size, 100_000)
+            orders: list[Order] = _orders(num_orders)
+            pft = Portfolio()
+            for order in orders:
+                pft.add_order(order)
+            json_path: str = os.path.join(tmpdir, "portfolio.json")
+            record("portfolio.save_to_json", num_orders, _time(lambda: pft.save_to_json(json_path), 1))
+
+            journal_dir: str = os.path.join(tmpdir, f"journal-{size}")
+            def journal_orders() -> None:
+                journal = PortfolioJournal(journal_dir)
+                for order in orders:
+                    journal.record(order, pft)
+                journal.close()
+            record("journal.record", num_orders, _time(journal_orders, 1))
+            record("journal.load", num_orders, _time(lambda: PortfolioJournal(journal_dir).load(), 1))
+
+    return results
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    with open(baseline_path, "r") as f:
+        baseline: dict = json.load(f)
+
+    before: dict[tuple[str, int], float] = {
+        (r["name"], r["size"]): r["seconds"] for r in baseline["results"]
+    }
+    print(f"\nCompared to {baseline.get('commit', baseline_path)} (>1x is faster):")
+    for r in results:
+        old: float | None = before.get((r["name"], r["size"]))
+        if old is not None and r["seconds"] > 0:
+            print(f"{r['name']:<32} {r['size']:>12,} {old / r['seconds']:>10.2f}x")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+        help="comma separated number of candles of each dataset")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark (the best one is kept)")
+    parser.add_argument("--max-loop-size", type=int, default=1_000_000)
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    args = parser.parse_args()
+
+    sizes: list[int] = [ int(s) for s in args.sizes.split(",") ]
+    results: list[dict] = run(sizes, args.repeat, args.max_loop_size)
+
+    if args.out is not None:
+        with open(args.out, "w") as f:
+            json.dump({
+                "commit": _commit(),
+                "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=4)
+
+    if args.compare is not None:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
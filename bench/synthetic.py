@@ -0,0 +1,41 @@
+""" Reproducible synthetic OHLCV data (geometric brownian motion) """
+import numpy as np
+from numpy.typing import NDArray
+
+from trbot import candles
+from trbot.candles import Timespan
+from trbot.stockframe import Stockframe
+from trbot.store import Columns
+
+
+DEFAULT_START: int = candles.datetime_to_timestamp("2020-01-01 00:00:00")
+
+def generate(count: int, seed: int = 0, start: int = DEFAULT_START, step_ms: int = 60_000,
+    start_price: float = 100.0, volatility: float = 0.002, drift: float = 0.0
+) -> Columns:
+    """ Generate `count` candles spaced `step_ms` apart (the same seed gives the same candles) """
+    rng = np.random.default_rng(seed)
+
+    timestamps: NDArray[np.int64] = start + np.arange(count, dtype=np.int64) * step_ms
+    close: NDArray[np.float64] = start_price * np.exp(np.cumsum(rng.normal(drift, volatility, count)))
+    open_: NDArray[np.float64] = np.empty(count, dtype=np.float64)
+    if count > 0:
+        open_[0] = start_price
+        open_[1:] = close[:-1]
+
+    # Wicks extend past the body by a fraction of the volatility
+    high: NDArray[np.float64] = np.maximum(open_, close) * (1.0 + np.abs(rng.normal(0.0, volatility / 2, count)))
+    low: NDArray[np.float64] = np.minimum(open_, close) * (1.0 - np.abs(rng.normal(0.0, volatility / 2, count)))
+    volume: NDArray[np.float64] = np.round(rng.lognormal(10.0, 0.5, count))
+
+    return (timestamps, open_, high, low, close, volume)
+
+def generate_stockframe(count: int, ticker: str = "SYN", mult: int = 1,
+    timespan: Timespan = Timespan.MINUTE, seed: int = 0, start: int = DEFAULT_START
+) -> Stockframe:
+    columns: Columns = generate(count, seed=seed, start=start, step_ms=mult * timespan.to_ms())
+    return Stockframe.from_arrays(ticker, mult, timespan, *columns)
+
+def ticker_seed(ticker: str) -> int:
+    """ Stable seed for a ticker (unlike `hash`, it doesn't change between processes) """
+    return int.from_bytes(ticker.encode(), "little") % (2 ** 32)
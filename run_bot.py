@@ -1,4 +1,4 @@
-import json, os, time
+import json, logging, os, time
 from datetime import datetime, timedelta
 
 import talib
@@ -14,10 +14,15 @@ from trbot.strategy import Strategy
 
 # ===================== STRATEGY =====================
 class MyStrategy(Strategy):
+    PARAMS = {
+        "fast_period": 8,
+        "slow_period": 21,
+    }
+
     def setup(self) -> None:
         close = self._sf.close
-        self.fast_ma = self.TA_EMA(close, period=8)
-        self.slow_ma = self.TA_EMA(close, period=21)
+        self.fast_ma = self.TA_EMA(close, period=self.params["fast_period"])
+        self.slow_ma = self.TA_EMA(close, period=self.params["slow_period"])
 
     def on_candle(self) -> Order | None:
         if self.ind_crossover(self.fast_ma, self.slow_ma):
@@ -28,10 +33,41 @@ class MyStrategy(Strategy):
 
         return None
 
+# Candles and indicator values are logged at DEBUG, orders and downloads at INFO
+logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+
 sf: Stockframe = Stockframe.from_csv("trout/aggs/MODIFIED_ohlcv-GM-4hour.csv")
 mys = MyStrategy(sf)
 mys.run()
 
+# # ===================== VECTORIZED BACKTEST =====================
+# from trbot.vectorized import Signal, SignalStrategy
+#
+# class MySignalStrategy(SignalStrategy):
+#     PARAMS = MyStrategy.PARAMS
+#
+#     def signals(self) -> tuple[Signal, Signal]:
+#         fast = talib.EMA(self.sf.close, timeperiod=self.params["fast_period"])
+#         slow = talib.EMA(self.sf.close, timeperiod=self.params["slow_period"])
+#         return self.crossover(fast, slow), self.crossover(slow, fast)
+#
+# # Same orders as `MyStrategy(sf).run(fast_forward=True)`
+# pft: Portfolio = MySignalStrategy(sf).run()
+
+# # ===================== LIVE RUNTIME (REPLAYED) =====================
+# from trbot.runtime import ReplayFeed
+#
+# feed = ReplayFeed.from_dir("trout/aggs", interval_sec=0.01)
+# bot = TradingBot("trout/intial_portfolio.json", journal_dir="trout/journal")
+# print(bot.run([ MyStrategy(sf) for sf in feed.stockframes ], feed))
+
+# # ===================== TRACING =====================
+# from trbot import tracing
+#
+# tracing.enable()
+# MyStrategy(sf).run(fast_forward=True)
+# print(tracing.to_prometheus())
+
 # # ===================== CANDLE REPLAYER =====================
 # sf: Stockframe = Stockframe.from_filepath("trout/ohlcv-GM-1hour.csv")
 # replayer: CandleReplayer = CandleReplayer(sf)
@@ -55,20 +91,36 @@ mys.run()
 
 
 # ===================== HISTORICAL CANDLES =====================
-# for ticker in [
+# from trbot import downloader
+#
+# tickers: list[str] = [
 #     "WMT", "INTC", "HPQ", "NKE", "GM", "TGT", "BBY", "SMCI", "SKX", "UAA", "PUMSY", "F", "HMC",
 #     "KR", "M", "LNVGY", "KHC", "GIS", "BYND", "GAP"
-# ]:
-#     opt: CandleOption = CandleOption(
+# ]
+# opts: list[CandleOption] = [
+#     CandleOption(
 #         ticker=ticker,
 #         start="2023-06-15 10:00:00",
 #         end="2025-06-13 16:00:00",
 #         mult=4,
 #         timespan=Timespan.HOUR
 #     )
-#     cnds: list[Candle] = broker.get_historical_candles(opt)
+#     for ticker in tickers
+# ]
+# for opt, cnds in zip(opts, downloader.download_many(opts)):
 #     sf: Stockframe = Stockframe(cnds, opt.ticker, opt.mult, opt.timespan)
-#     sf.to_csv("trout/aggs")
-
-#     print(f"Completed downloading for {ticker}")
-#     print("-----------------------")
+#     sf.save_to_csv("trout/aggs")
+
+
+# ===================== PARAMETER SWEEP =====================
+# NOTE: the workers unpickle the strategy class by its module and name. `__main__.MyStrategy`
+# is only found by forked workers (the default on Linux), so with the spawn start method
+# (macOS, Windows) move `MyStrategy` into a module of its own and import it from there.
+# from trbot import optimizer
+#
+# results = optimizer.sweep(
+#     MyStrategy,
+#     grid={ "fast_period": [5, 8, 13], "slow_period": [21, 34, 55] },
+#     filepaths=[ f"trout/aggs/{name}" for name in sorted(os.listdir("trout/aggs")) ],
+# )
+# print(results.head(10))
@@ -0,0 +1,50 @@
+import numpy as np
+
+from bench import synthetic
+from trbot import candles, downloader
+from trbot.cache import CandleCache, _subtract, _union
+from trbot.candles import CandleBatch, CandleOption, Timespan
+
+
+_MINUTE_MS: int = 60_000
+
+def test_union_and_subtract():
+    # Ranges a second apart or less are contiguous (datetime strings have a resolution of 1s)
+    assert _union([(9000, 12000), (0, 2000), (5000, 7000), (8000, 9500)]) == [(0, 2000), (5000, 12000)]
+    assert _subtract([(0, 2000), (5000, 12000)], 0, 20000) == [(2001, 4999), (12001, 20000)]
+    assert _subtract([(0, 2000)], 500, 1500) == []
+    assert _subtract([], 500, 1500) == [(500, 1500)]
+
+def _option(start: str, end: str) -> CandleOption:
+    return CandleOption("SYN", start, end, 1, Timespan.MINUTE)
+
+def test_only_missing_ranges_get_downloaded(tmp_path, monkeypatch):
+    # NOTE: the candle info is parsed out of the file path, which must not contain any dash
+    monkeypatch.chdir(tmp_path)
+    requested: list[tuple[str, str]] = []
+    def download_many(opts: list[CandleOption], show_progress: bool = False) -> list[CandleBatch]:
+        batches: list[CandleBatch] = []
+        for opt in opts:
+            requested.append((opt.start, opt.end))
+            # Candles start on whole minutes
+            start: int = -(-candles.datetime_to_timestamp(opt.start) // _MINUTE_MS) * _MINUTE_MS
+            count: int = (candles.datetime_to_timestamp(opt.end) - start) // _MINUTE_MS + 1
+            columns = synthetic.generate(count, seed=start)
+            batches.append(CandleBatch(start + np.arange(count, dtype=np.int64) * _MINUTE_MS, *columns[1:]))
+        return batches
+    monkeypatch.setattr(downloader, "download_many", download_many)
+
+    cache = CandleCache("cache")
+    sf = cache.get(_option("2020-01-01 10:00:00", "2020-01-01 11:00:00"))
+    assert sf.size == 61
+    sf = cache.get(_option("2020-01-01 09:30:00", "2020-01-01 11:30:00"))
+    assert sf.size == 121
+    np.testing.assert_array_equal(np.diff(sf.timestamps), _MINUTE_MS)
+    # Fully covered by now
+    cache.get(_option("2020-01-01 09:45:00", "2020-01-01 11:15:00"))
+
+    assert requested == [
+        ("2020-01-01 10:00:00", "2020-01-01 11:00:00"),
+        ("2020-01-01 09:30:00", "2020-01-01 09:59:59"),
+        ("2020-01-01 11:00:01", "2020-01-01 11:30:00"),
+    ]
@@ -0,0 +1,65 @@
+import logging
+
+import numpy as np
+import pytest
+
+from bench import ingest
+from bench.fake_polygon import FakePolygonServer
+from trbot import broker, candles, downloader
+from trbot.candles import CandleBatch, CandleOption, Timespan
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakePolygonServer(page_size=700, error_rate=0.2, seed=1).start()
+    monkeypatch.setattr(broker, "_BASE_URL", server.url)
+    monkeypatch.setattr(broker, "_API_KEY", "fake")
+    monkeypatch.setattr(broker, "_RATE_LIMITER", broker.RateLimiter(10 ** 9, burst=10 ** 6))
+    monkeypatch.setattr(broker, "_BACKOFF_BASE_SEC", 0.0)
+    yield server
+    server.stop()
+
+def _option(ticker: str, days: int) -> CandleOption:
+    return CandleOption(ticker, "2021-01-04 00:00:00", f"2021-01-{4 + days:02} 00:00:00", 5, Timespan.MINUTE)
+
+def _expected(server: FakePolygonServer, opt: CandleOption) -> np.ndarray:
+    timestamps: np.ndarray = server._dataset(opt.ticker, opt.mult, opt.timespan.value)[0]
+    start: int = candles.datetime_to_timestamp(opt.start)
+    end: int = candles.datetime_to_timestamp(opt.end)
+    return timestamps[(timestamps >= start) & (timestamps <= end)]
+
+def test_download_many_matches_sequential_downloads(server):
+    opts: list[CandleOption] = [ _option(f"T{i}", 2 + i) for i in range(4) ]
+    batches: list[CandleBatch] = downloader.download_many(opts, max_workers=4, show_progress=False)
+
+    assert server.num_rate_limited > 0
+    for opt, batch in zip(opts, batches):
+        # Every candle once, in order, over pages and windows (and retries)
+        np.testing.assert_array_equal(batch.columns[0], _expected(server, opt))
+        sequential: CandleBatch = broker.get_historical_candles(opt)
+        for a, b in zip(batch.columns, sequential.columns):
+            np.testing.assert_array_equal(a, b)
+
+def test_close_matches_dataset(server):
+    opt: CandleOption = _option("AAA", 1)
+    batch: CandleBatch = downloader.download_many([opt], show_progress=False)[0]
+    timestamps, _, _, _, close, _ = server._dataset("AAA", 5, "minute")
+    index: np.ndarray = np.searchsorted(timestamps, batch.columns[0])
+    np.testing.assert_array_equal(batch.columns[4], close[index])
+
+def test_ingest_bench_restores_broker_settings():
+    settings: list = [ getattr(broker, name) for name in ingest._BROKER_SETTINGS ]
+    result: dict = ingest.run(num_tickers=2, timespan=Timespan.HOUR, days=3, workers=2)
+    assert result["candles"] > 0
+    assert [ getattr(broker, name) for name in ingest._BROKER_SETTINGS ] == settings
+
+def test_progress_is_logged(server, caplog, capsys):
+    opts: list[CandleOption] = [ _option("AAA", 1), _option("BBB", 1) ]
+    with caplog.at_level(logging.INFO, logger="trbot.downloader"):
+        downloader.download_many(opts, max_workers=2)
+
+    num_windows: int = sum(len(broker.split_windows(opt)) for opt in opts)
+    records: list[logging.LogRecord] = [ r for r in caplog.records if r.name == "trbot.downloader" ]
+    assert len(records) == num_windows
+    assert records[-1].getMessage().startswith(f"[{num_windows}/{num_windows}] windows")
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from bench import synthetic
+from bench.suite import CrossoverStrategy
+from trbot import indgraph
+from trbot.engine import MultiStrategyRunner, PortfolioEngine, merge_timestamps
+from trbot.portfolio import Order
+from trbot.stockframe import Stockframe
+
+
+class MACDStrategy(CrossoverStrategy):
+    PARAMS = { **CrossoverStrategy.PARAMS, "name": "macd", "fast": 12 }
+
+    def setup(self) -> None:
+        macd, signal, _ = indgraph.MACD(indgraph.Source("close"), self.params["fast"], 26, 9)
+        self.macd, self.signal = self.add_indicators(**{
+            self.params["name"]: macd, f"{self.params['name']}_signal": signal
+        })
+
+    def on_candle(self) -> Order | None:
+        if self.ind_crossover(self.macd, self.signal):
+            return self.buy(1)
+        if self.ind_crossover(self.signal, self.macd):
+            return self.sell(1)
+        return None
+
+
+def _orders(orders) -> list[tuple]:
+    return [ (o.status, o.quantity, o.purchase_price, o.purchase_dt) for o in orders ]
+
+def _family(sf: Stockframe) -> list:
+    return [
+        CrossoverStrategy(sf, fast_period=5),
+        CrossoverStrategy(sf, fast_period=8, slow_period=30),
+        MACDStrategy(sf),
+        MACDStrategy(sf),
+        MACDStrategy(sf, name="fast_macd", fast=6),
+    ]
+
+def test_runner_matches_individual_runs():
+    sf: Stockframe = synthetic.generate_stockframe(5000, seed=5)
+    alone: list = _family(sf)
+    for strat in alone:
+        strat.run(fast_forward=True, verbose=False)
+
+    runner = MultiStrategyRunner(_family(sf))
+    portfolios = runner.run()
+
+    for strat, pft in zip(alone, portfolios):
+        assert len(pft.orders) > 10
+        assert _orders(pft.orders) == _orders(strat.portfolio.orders)
+    # Every indicator is computed once for the whole family: the 4 EMAs of the crossovers,
+    # plus the close and 4 nodes for the first MACD, plus 3 nodes for the faster one
+    assert len(runner.computed_indicators) == 12
+
+def test_runner_same_names_other_params():
+    sf: Stockframe = synthetic.generate_stockframe(3000, seed=6)
+    alone: list = [ MACDStrategy(sf), MACDStrategy(sf, fast=6) ]
+    for strat in alone:
+        strat.run(fast_forward=True, verbose=False)
+
+    family: list = [ MACDStrategy(sf), MACDStrategy(sf, fast=6) ]
+    portfolios = MultiStrategyRunner(family).run()
+
+    assert not np.array_equal(family[0]._indicators["macd"], family[1]._indicators["macd"], equal_nan=True)
+    for strat, pft in zip(alone, portfolios):
+        assert _orders(pft.orders) == _orders(strat.portfolio.orders)
+
+def test_runner_requires_same_stockframe():
+    with pytest.raises(ValueError):
+        MultiStrategyRunner([
+            CrossoverStrategy(synthetic.generate_stockframe(100)),
+            CrossoverStrategy(synthetic.generate_stockframe(100)),
+        ])
+
+
+@pytest.mark.parametrize("window_ms", [1, 7 * 60_000, PortfolioEngine.DEFAULT_WINDOW_MS])
+def test_merge_timestamps(window_ms):
+    series: list[np.ndarray] = [
+        np.array([0, 60_000, 120_000, 600_000], dtype=np.int64),
+        np.array([60_000, 90_000, 700_000], dtype=np.int64),
+        np.array([], dtype=np.int64),
+        np.array([0, 900_000], dtype=np.int64),
+    ]
+    owners: list[int] = [ int(i) for chunk in merge_timestamps(series, window_ms) for i in chunk ]
+    assert owners == [0, 3, 0, 1, 1, 0, 0, 1, 3]
+
+def test_engine_with_one_strategy_matches_standalone_run():
+    sf: Stockframe = synthetic.generate_stockframe(3000, seed=11)
+    alone = CrossoverStrategy(sf)
+    alone.run(fast_forward=True, verbose=False)
+    engine = PortfolioEngine([ CrossoverStrategy(sf) ], window_ms=60 * 60_000)
+    engine.run()
+    assert _orders(engine.portfolio.orders) == _orders(alone.portfolio.orders)
+
+def test_engine_shares_portfolio():
+    sfs: list[Stockframe] = [
+        synthetic.generate_stockframe(2000, ticker=ticker, seed=i) for i, ticker in enumerate(["AAA", "BBB"])
+    ]
+    engine = PortfolioEngine([ CrossoverStrategy(sf) for sf in sfs ])
+    pft = engine.run()
+
+    assert set(pft.positions.keys()) == {"AAA", "BBB"}
+    dates: list[str] = [ o.purchase_dt for o in pft.orders ]
+    assert dates == sorted(dates)
+    for sf in sfs:
+        alone = CrossoverStrategy(sf)
+        alone.run(fast_forward=True, verbose=False)
+        assert [ (o.quantity, o.purchase_dt) for o in pft.orders if o.symbol == sf.ticker ] == \
+            [ (o.quantity, o.purchase_dt) for o in alone.portfolio.orders ]
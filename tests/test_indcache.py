@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import talib
+
+from bench import synthetic
+from bench.suite import CrossoverStrategy
+from trbot import indcache
+from trbot.indcache import IndicatorCache
+
+
+def test_computes_once(tmp_path):
+    cache = IndicatorCache(str(tmp_path))
+    series: np.ndarray = np.arange(100, dtype=np.float64)
+    calls: list[int] = []
+    def compute() -> np.ndarray:
+        calls.append(1)
+        return talib.SMA(series, timeperiod=5)
+
+    first: np.ndarray = cache.get_or_compute("SMA", series, { "period": 5 }, compute)
+    second: np.ndarray = cache.get_or_compute("SMA", series.copy(), { "period": 5 }, compute)
+    assert len(calls) == 1
+    np.testing.assert_array_equal(first, second)
+    assert not second.flags.writeable
+
+    # Other parameters or other data are other entries
+    cache.get_or_compute("SMA", series, { "period": 6 }, compute)
+    cache.get_or_compute("SMA", series + 1.0, { "period": 5 }, compute)
+    assert len(calls) == 3
+
+def test_keys():
+    series: np.ndarray = np.arange(10, dtype=np.float64)
+    key: str = indcache.cache_key("EMA", series, { "period": 3 })
+    assert key == indcache.cache_key("EMA", series.copy(), { "period": 3 })
+    assert key != indcache.cache_key("EMA", series.astype(np.float32), { "period": 3 })
+    assert key != indcache.cache_key("EMA", series, { "period": 4 })
+    assert key != indcache.cache_key("SMA", series, { "period": 3 })
+
+def test_evicts_least_recently_used(tmp_path):
+    values: np.ndarray = np.zeros(1000)
+    cache = IndicatorCache(str(tmp_path), max_bytes=3 * values.nbytes + 1000)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, values)
+        os.utime(os.path.join(tmp_path, f"{key}.npy"), (i, i))
+
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a") is not None
+    cache.put("d", values)
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ("a", "c", "d"))
+    assert cache.size_bytes <= 3 * values.nbytes + 1000
+
+def test_partial_file_is_a_miss(tmp_path):
+    cache = IndicatorCache(str(tmp_path))
+    with open(os.path.join(tmp_path, "broken.npy"), "wb") as f:
+        f.write(b"\x93NUMPY")
+    assert cache.get("broken") is None
+
+def test_strategy_through_cache(tmp_path):
+    sf = synthetic.generate_stockframe(3000, seed=8)
+    plain = CrossoverStrategy(sf)
+    plain.run(fast_forward=True, verbose=False)
+
+    indcache.set_cache(IndicatorCache(str(tmp_path)))
+    try:
+        cached = [ CrossoverStrategy(sf) for _ in range(2) ]
+        for strat in cached:
+            strat.run(fast_forward=True, verbose=False)
+    finally:
+        indcache.set_cache(None)
+
+    assert len(os.listdir(tmp_path)) == 2
+    for strat in cached:
+        assert strat.portfolio.capital == plain.portfolio.capital
+        assert len(strat.portfolio.orders) == len(plain.portfolio.orders)
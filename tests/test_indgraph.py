@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+import talib
+
+from bench import synthetic
+from trbot import indgraph
+from trbot.indgraph import EMA, RSI, SMA, STDDEV, Source
+from trbot.stockframe import Stockframe
+
+
+@pytest.fixture(scope="module")
+def sf() -> Stockframe:
+    return synthetic.generate_stockframe(2000, seed=9)
+
+def test_nodes_match_talib(sf):
+    close = Source("close")
+    values = indgraph.evaluate({
+        "sma": SMA(close, 10),
+        "ema": EMA(Source("high"), 12),
+        "rsi": RSI(close, 14),
+        "stddev": STDDEV(close, 20),
+        "spread": EMA(close, 12) - 2.0 * SMA(close, 10) / 4.0,
+    }, sf)
+
+    np.testing.assert_allclose(values["sma"], talib.SMA(sf.close, timeperiod=10), equal_nan=True)
+    np.testing.assert_allclose(values["ema"], talib.EMA(sf.high, timeperiod=12), equal_nan=True)
+    np.testing.assert_allclose(values["rsi"], talib.RSI(sf.close, timeperiod=14), equal_nan=True)
+    np.testing.assert_allclose(values["stddev"], talib.STDDEV(sf.close, timeperiod=20), equal_nan=True)
+    np.testing.assert_allclose(
+        values["spread"],
+        talib.EMA(sf.close, timeperiod=12) - 2.0 * talib.SMA(sf.close, timeperiod=10) / 4.0,
+        equal_nan=True
+    )
+
+def test_bbands_match_talib(sf):
+    upper, middle, lower = indgraph.BBANDS(Source("close"), 20, 2.0, 1.5)
+    values = indgraph.evaluate({ "upper": upper, "middle": middle, "lower": lower }, sf)
+    expected = talib.BBANDS(sf.close, timeperiod=20, nbdevup=2.0, nbdevdn=1.5)
+    for name, exp in zip(("upper", "middle", "lower"), expected):
+        np.testing.assert_allclose(values[name], exp, rtol=1e-9, equal_nan=True)
+
+def test_macd_converges_to_talib(sf):
+    macd, signal, hist = indgraph.MACD(Source("close"))
+    values = indgraph.evaluate({ "macd": macd, "signal": signal, "hist": hist }, sf)
+    expected = talib.MACD(sf.close, fastperiod=12, slowperiod=26, signalperiod=9)
+    # Past the warm up (see the NOTE of `MACD`)
+    for name, exp in zip(("macd", "signal", "hist"), expected):
+        np.testing.assert_allclose(values[name][300:], exp[300:], rtol=1e-6, atol=1e-9)
+
+def test_shared_nodes_computed_once(sf, monkeypatch):
+    calls: list[int] = []
+    compute = EMA.compute
+    def counting(self, sf, inputs):
+        calls.append(self._period)
+        return compute(self, sf, inputs)
+    monkeypatch.setattr(EMA, "compute", counting)
+
+    close = Source("close")
+    memo: dict = {}
+    macd, _, _ = indgraph.MACD(close, 12, 26, 9)
+    indgraph.evaluate({ "macd": macd, "spread": EMA(close, 12) - EMA(Source("close"), 26) }, sf, memo)
+    assert sorted(calls) == [12, 26]
+
+    # Nothing needed is computed again with the same memo, and unused nodes never are
+    indgraph.evaluate({ "fast": EMA(close, 12) }, sf, memo)
+    assert sorted(calls) == [12, 26]
+
+def test_keys():
+    close = Source("close")
+    assert EMA(close, 12).key == EMA(Source("close"), 12).key
+    assert EMA(close, 12).key != EMA(close, 13).key
+    assert EMA(close, 12).key != SMA(close, 12).key
+    assert (EMA(close, 12) - 1.0).key != (1.0 - EMA(close, 12)).key
+    with pytest.raises(KeyError):
+        Source("vwap")
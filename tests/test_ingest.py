@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from trbot.candles import CandleBatch, Timespan
+from trbot.ingest import ColumnBuffer
+
+
+def _results(start: int, end: int) -> list[dict]:
+    return [
+        { "t": t * 60_000, "o": t + 0.1, "h": t + 0.5, "l": t - 0.5, "c": t + 0.2, "v": float(t), "n": 1 }
+        for t in range(start, end)
+    ]
+
+def test_pages_with_overlaps():
+    buf = ColumnBuffer(chunk=16)
+    # Pages overlapping at their boundaries (and one page entirely repeated)
+    assert buf.append_results(_results(0, 10)) == 10
+    assert buf.append_results(_results(9, 30)) == 20
+    assert buf.append_results(_results(5, 20)) == 0
+    assert buf.append_results([]) == 0
+    assert buf.append_batch(CandleBatch.from_results(_results(28, 40))) == 10
+
+    expected: CandleBatch = CandleBatch.from_results(_results(0, 40))
+    for actual, column in zip(buf.to_batch().columns, expected.columns):
+        np.testing.assert_array_equal(actual, column)
+    assert len(buf) == 40 and buf.capacity % 16 == 0
+
+def test_unordered_rows_within_page():
+    buf = ColumnBuffer()
+    results: list[dict] = _results(0, 5) + _results(2, 4) + _results(5, 8)
+    assert buf.append_results(results) == 8
+    np.testing.assert_array_equal(buf.to_batch().columns[0], np.arange(8) * 60_000)
+
+def test_stockframe_is_a_view():
+    buf = ColumnBuffer(capacity=100)
+    buf.append_results(_results(0, 50))
+    sf = buf.to_stockframe("SYN", 1, Timespan.MINUTE)
+    assert sf.size == 50
+    assert np.shares_memory(sf.close, buf.to_batch().columns[4])
+
+def test_rows_older_than_the_latest_one():
+    buf = ColumnBuffer()
+    buf.append_results(_results(0, 10))
+    # Repeating earlier rows is fine, inserting a missing one isn't
+    assert buf.append_results(_results(3, 5) + _results(12, 14)) == 2
+    with pytest.raises(ValueError):
+        buf.append_results(_results(11, 12))
+    np.testing.assert_array_equal(buf.to_batch().columns[0], np.r_[0:10, 12:14] * 60_000)
+
+def test_sparse_buffer_is_trimmed():
+    buf = ColumnBuffer(capacity=100_000, chunk=16)
+    buf.append_results(_results(0, 50))
+    close = buf.to_batch().columns[4]
+    assert buf.capacity == 50 and close.nbytes == 50 * 8
+
+    # Appends after a trim grow the buffer again, and views are handed out while it's full enough
+    buf.append_results(_results(50, 60))
+    assert buf.capacity == 112
+    assert np.shares_memory(buf.to_batch().columns[4], buf.to_stockframe("SYN", 1, Timespan.MINUTE).close)
+    np.testing.assert_array_equal(buf.to_batch().columns[0], np.arange(60) * 60_000)
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from trbot import broker
+from trbot.journal import PortfolioJournal
+from trbot.portfolio import Order, OrderType, Portfolio
+
+
+def _buy(pft: Portfolio, price: float, minute: int) -> None:
+    order = Order("SYN", OrderType.MARKET, 1.0, price, f"2020-01-01 10:{minute:02}:00")
+    broker.execute_order(order, pft)
+
+def test_restart_restores_portfolio(tmp_path):
+    pft: Portfolio = PortfolioJournal(str(tmp_path), compact_every=3).load()
+    for i in range(7):
+        _buy(pft, 10.0, i)
+    pft.journal.close()
+
+    journal = PortfolioJournal(str(tmp_path), compact_every=3)
+    restored: Portfolio = journal.load()
+    assert restored.capital == pft.capital == 930.0
+    assert restored.positions["SYN"].quantity == 7.0
+    assert journal.seq == 7
+    assert len(list(journal.history())) == 7
+
+def test_restart_after_torn_write(tmp_path):
+    pft: Portfolio = PortfolioJournal(str(tmp_path)).load()
+    _buy(pft, 10.0, 0)
+    _buy(pft, 10.0, 1)
+    pft.journal.close()
+    # The process died in the middle of appending the third event
+    with open(os.path.join(tmp_path, PortfolioJournal.JOURNAL_FILENAME), "a") as f:
+        f.write('{"seq":3,"symbol":"SYN","ty')
+
+    journal = PortfolioJournal(str(tmp_path))
+    pft = journal.load()
+    assert pft.capital == 980.0 and journal.seq == 2
+    for i in range(3):
+        _buy(pft, 10.0, 2 + i)
+    journal.close()
+
+    journal = PortfolioJournal(str(tmp_path))
+    restored: Portfolio = journal.load()
+    assert restored.capital == 950.0
+    assert journal.seq == 5
+    assert len(restored.orders) == 5
+
+def test_corrupted_event_raises(tmp_path):
+    pft: Portfolio = PortfolioJournal(str(tmp_path)).load()
+    for i in range(3):
+        _buy(pft, 10.0, i)
+    pft.journal.close()
+
+    path: str = os.path.join(tmp_path, PortfolioJournal.JOURNAL_FILENAME)
+    with open(path, "r") as f:
+        lines: list[str] = f.readlines()
+    with open(path, "w") as f:
+        f.writelines([ lines[0], "garbage\n", *lines[2:] ])
+
+    with pytest.raises(ValueError):
+        PortfolioJournal(str(tmp_path)).load()
+    # Nothing got truncated
+    with open(path, "r") as f:
+        assert len(f.readlines()) == 3
+
+def test_pending_orders_keep_their_prices(tmp_path):
+    pft: Portfolio = PortfolioJournal(str(tmp_path)).load()
+    broker.execute_order(Order("SYN", OrderType.LIMIT, 1.0, 9.0, "2020-01-01 10:00:00", limit_price=9.0), pft)
+    broker.execute_order(Order("SYN", OrderType.STOP_LOSS, -1.0, 8.0, "2020-01-01 10:05:00", stop_price=8.0), pft)
+    pft.journal.close()
+
+    journal = PortfolioJournal(str(tmp_path))
+    restored: Portfolio = journal.load()
+    for orders in (restored.orders, list(journal.history())):
+        assert [ o.to_dict() for o in orders ] == [ o.to_dict() for o in pft.orders ]
+        assert (orders[0].limit_price, orders[1].stop_price) == (9.0, 8.0)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from trbot import candles, metrics
+from trbot.candles import Timespan
+from trbot.portfolio import Order, OrderBatch, OrderStatus, OrderType
+from trbot.stockframe import Stockframe
+
+
+_CLOSE: list[float] = [100.0, 100.0, 110.0, 90.0, 120.0, 120.0]
+
+@pytest.fixture
+def sf() -> Stockframe:
+    start: int = candles.datetime_to_timestamp("2020-01-01 10:00:00")
+    timestamps: np.ndarray = start + np.arange(len(_CLOSE), dtype=np.int64) * 60_000
+    close: np.ndarray = np.array(_CLOSE)
+    return Stockframe.from_arrays("SYN", 1, Timespan.MINUTE, timestamps, close, close, close, close,
+        np.ones(len(close)))
+
+def _orders(sf: Stockframe) -> list[Order]:
+    fills: list[tuple[int, float, OrderStatus]] = [
+        (1, 2.0, OrderStatus.FILLED),       # buy 2 @ 100
+        (2, 5.0, OrderStatus.CANCELLED),    # never filled, ignored
+        (3, -1.0, OrderStatus.FILLED),      # sell 1 @ 90
+    ]
+    orders: list[Order] = []
+    for i, quantity, status in fills:
+        order = Order("SYN", OrderType.MARKET, quantity, _CLOSE[i],
+            candles.timestamp_to_datetime(int(sf.timestamps[i])))
+        order.status = status
+        orders.append(order)
+    orders.append(Order("OTHER", OrderType.MARKET, 1.0, 1.0, orders[0].purchase_dt))
+    orders[-1].status = OrderStatus.FILLED
+    return orders
+
+def test_equity_curve(sf):
+    curve = metrics.equity_curve(_orders(sf), sf)
+    np.testing.assert_allclose(curve["position"], [0, 2, 2, 1, 1, 1])
+    np.testing.assert_allclose(curve["cash"], [1000, 800, 800, 890, 890, 890])
+    np.testing.assert_allclose(curve["equity"], [1000, 1000, 1020, 980, 1010, 1010])
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_compute(sf, batched):
+    orders = _orders(sf)
+    perf: dict[str, float] = metrics.compute(OrderBatch.from_orders(orders) if batched else orders, sf)
+
+    assert perf["final_equity"] == pytest.approx(1010.0)
+    assert perf["total_return"] == pytest.approx(0.01)
+    assert perf["realized_pl"] == pytest.approx(-10.0)
+    assert perf["unrealized_pl"] == pytest.approx(20.0)
+    assert perf["market_value"] == pytest.approx(120.0)
+    assert perf["max_drawdown"] == pytest.approx(40.0 / 1020.0)
+    assert perf["exposure"] == pytest.approx(5.0 / 6.0)
+    assert perf["num_fills"] == 2.0
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_fills_before_first_candle(sf, batched):
+    orders: list[Order] = _orders(sf)
+    early = Order("SYN", OrderType.MARKET, 1.0, 95.0, "2020-01-01 09:59:00")
+    orders.append(early)
+    # Only filled orders count
+    early.status = OrderStatus.CANCELLED
+    metrics.compute(OrderBatch.from_orders(orders) if batched else orders, sf)
+
+    early.status = OrderStatus.FILLED
+    with pytest.raises(ValueError):
+        metrics.compute(OrderBatch.from_orders(orders) if batched else orders, sf)
+
+def test_closed_trades():
+    # Open, add, reduce, flip and close a position
+    quantity: np.ndarray = np.array([1.0, 1.0, -1.0, -2.0, 1.0])
+    price: np.ndarray = np.array([10.0, 20.0, 30.0, 40.0, 35.0])
+    pl, cost = metrics._closed_trades(quantity, price)
+    np.testing.assert_allclose(pl, [15.0, 25.0, 5.0])
+    np.testing.assert_allclose(cost, [15.0, 15.0, 40.0])
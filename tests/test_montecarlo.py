@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from trbot import montecarlo
+from trbot.portfolio import Order, OrderStatus, OrderType
+from bench import synthetic
+
+
+def _fill(quantity: float, price: float, dt: str) -> Order:
+    order = Order("SYN", OrderType.MARKET, quantity, price, dt)
+    order.status = OrderStatus.FILLED
+    return order
+
+def test_trade_pnl():
+    sf = synthetic.generate_stockframe(100)
+    orders: list[Order] = [
+        _fill(1.0, 100.0, "2020-01-01 00:01:00"),
+        _fill(1.0, 110.0, "2020-01-01 00:02:00"),
+        _fill(-2.0, 120.0, "2020-01-01 00:03:00"),
+        _fill(1.0, 100.0, "2020-01-01 00:04:00"),
+        _fill(-1.0, 90.0, "2020-01-01 00:05:00"),
+    ]
+    np.testing.assert_allclose(montecarlo.trade_pnl(orders, sf), [30.0, -10.0])
+
+def test_pnl_paths_are_additive():
+    # A one share trade making or losing $5 on a $1000 account
+    sim = montecarlo.simulate(np.array([5.0, -5.0]), num_paths=500, horizon=20, pnl=True, seed=1)
+    final: np.ndarray = sim["final_equity"]
+    assert np.all((final >= 900.0) & (final <= 1100.0))
+    np.testing.assert_allclose((final - 1000.0) % 10.0, 0.0, atol=1e-9)
+    assert sim["max_drawdown"].max() <= 100.0 / 1000.0 + 1e-12
+    assert not sim["ruined"].any()
+
+def test_return_paths_compound():
+    sim = montecarlo.simulate(np.array([0.1]), num_paths=3, horizon=2, initial_capital=100.0, seed=1)
+    np.testing.assert_allclose(sim["final_equity"], 121.0)
+    assert montecarlo.summarize(sim)["prob_loss"] == 0.0
+
+@pytest.mark.parametrize("method", montecarlo.METHODS)
+def test_chunking_doesnt_change_results(method):
+    returns: np.ndarray = np.random.default_rng(0).normal(0.0, 0.01, 300)
+    a = montecarlo.simulate(returns, num_paths=1000, method=method, seed=7, chunk_size=30_000)
+    b = montecarlo.simulate(returns, num_paths=1000, method=method, seed=7, chunk_size=30_000, processes=2)
+    np.testing.assert_array_equal(a["final_equity"], b["final_equity"])
+
+def test_chunks_are_sized_by_steps(monkeypatch):
+    sizes: list[int] = []
+    run_chunk = montecarlo._run_chunk
+    def record(task):
+        sizes.append(task[0] * task[1])
+        return run_chunk(task)
+    monkeypatch.setattr(montecarlo, "_run_chunk", record)
+
+    montecarlo.simulate(np.array([0.01, -0.01]), num_paths=50, horizon=1000, chunk_size=8000, seed=1)
+    assert sizes == [8000] * 6 + [2000]
+    # A chunk holds at least a path, however long
+    sizes.clear()
+    montecarlo.simulate(np.array([0.01, -0.01]), num_paths=3, horizon=1000, chunk_size=10, seed=1)
+    assert sizes == [1000] * 3
+    # The returns aren't kept around once done
+    assert montecarlo._returns is None
+
+@pytest.mark.parametrize("num_paths,horizon", [(0, 10), (10, 0)])
+def test_rejects_empty_simulations(num_paths, horizon):
+    with pytest.raises(ValueError):
+        montecarlo.simulate(np.array([0.01]), num_paths=num_paths, horizon=horizon)
+
+def test_summarize_uses_simulated_capital():
+    sim = montecarlo.simulate(np.array([-1.0, 1.0]), num_paths=200, horizon=4,
+        initial_capital=10.0, pnl=True, seed=3)
+    summary: dict[str, float] = montecarlo.summarize(sim)
+    assert summary["prob_loss"] == float(np.mean(sim["final_equity"] < 10.0))
+    assert summary["risk_of_ruin"] == 0.0
@@ -0,0 +1,25 @@
+import numpy as np
+
+from bench import synthetic
+from bench.suite import CrossoverStrategy
+from trbot import candles, optimizer
+from trbot.candles import Timespan
+
+
+def test_sweep_ranks_by_total_return(tmp_path, monkeypatch):
+    # NOTE: the candle info is parsed out of the file path, which must not contain any dash
+    monkeypatch.chdir(tmp_path)
+    filepaths: list[str] = []
+    for i, ticker in enumerate(["AAA", "BBB"]):
+        sf = synthetic.generate_stockframe(2000, ticker=ticker, seed=i)
+        sf.save_to_store(".")
+        filepaths.append(candles.store_outpath(".", ticker, 1, Timespan.MINUTE))
+
+    df = optimizer.sweep(
+        CrossoverStrategy, { "fast_period": [5, 8], "slow_period": [21, 30] }, filepaths, processes=1
+    )
+
+    assert len(df) == 8
+    assert np.all(np.diff(df["total_return"].to_numpy()) <= 0)
+    # The final value is the equity the total return is derived from
+    np.testing.assert_allclose(df["final_value"], 1000.0 * (1.0 + df["total_return"]))
@@ -0,0 +1,125 @@
+import pytest
+
+from trbot.orderbook import OrderBook
+from trbot.portfolio import Order, OrderStatus, OrderType, Portfolio
+
+
+_DT: str = "2020-01-01 10:00:00"
+
+def _order(order_type: OrderType, quantity: float, price: float) -> Order:
+    is_limit: bool = order_type in (OrderType.LIMIT, OrderType.TAKE_PROFIT)
+    return Order(
+        "SYN", order_type, quantity, 0.0, _DT,
+        limit_price=price if is_limit else None,
+        stop_price=None if is_limit else price
+    )
+
+def _candle(book: OrderBook, pft: Portfolio, open_: float, high: float, low: float,
+    timestamp: int = 0
+) -> list[Order]:
+    return book.on_candle("SYN", timestamp, _DT, open_, high, low, pft)
+
+
+@pytest.mark.parametrize("order_type,quantity,price,candle,fill", [
+    # Buy limits and sell stops trigger once the low falls to their price
+    (OrderType.LIMIT, 1.0, 99.0, (100.0, 101.0, 98.5), 99.0),
+    (OrderType.STOP, -1.0, 99.0, (100.0, 101.0, 99.0), 99.0),
+    # Sell limits and buy stops trigger once the high rises to their price
+    (OrderType.LIMIT, -1.0, 101.0, (100.0, 101.0, 99.0), 101.0),
+    (OrderType.STOP, 1.0, 101.0, (100.0, 102.0, 99.0), 101.0),
+    # Gaps through the price fill at the open
+    (OrderType.LIMIT, 1.0, 99.0, (97.0, 98.0, 96.0), 97.0),
+    (OrderType.STOP, -1.0, 99.0, (97.0, 98.0, 96.0), 97.0),
+    (OrderType.STOP, 1.0, 101.0, (103.0, 104.0, 102.0), 103.0),
+])
+def test_triggers(order_type, quantity, price, candle, fill):
+    book, pft = OrderBook(), Portfolio()
+    order: Order = _order(order_type, quantity, price)
+    book.submit(order)
+
+    assert _candle(book, pft, *candle) == [order]
+    assert order.status == OrderStatus.FILLED
+    assert order.purchase_price == fill
+    assert len(book) == 0 and len(pft.orders) == 1
+
+@pytest.mark.parametrize("order_type,quantity,price", [
+    (OrderType.LIMIT, 1.0, 98.0),
+    (OrderType.LIMIT, -1.0, 102.0),
+    (OrderType.STOP, 1.0, 102.0),
+    (OrderType.STOP, -1.0, 98.0),
+])
+def test_not_triggered(order_type, quantity, price):
+    book, pft = OrderBook(), Portfolio()
+    order: Order = _order(order_type, quantity, price)
+    book.submit(order)
+
+    assert _candle(book, pft, 100.0, 101.0, 99.0) == []
+    assert order.status == OrderStatus.WORKING
+    assert len(book) == 1 and len(pft.orders) == 0
+
+def test_only_triggered_orders_fill_in_submission_order():
+    book, pft = OrderBook(), Portfolio()
+    orders: list[Order] = [ _order(OrderType.LIMIT, 1.0, 90.0 + i) for i in range(10) ]
+    for order in reversed(orders):
+        book.submit(order)
+
+    done: list[Order] = _candle(book, pft, 100.0, 100.0, 95.0)
+    assert done == list(reversed(orders[5:]))
+    assert len(book) == 5
+    assert all(o.status == OrderStatus.WORKING for o in orders[:5])
+
+def test_oco_cancels_sibling():
+    book, pft = OrderBook(), Portfolio()
+    take_profit: Order = _order(OrderType.TAKE_PROFIT, -1.0, 110.0)
+    stop_loss: Order = _order(OrderType.STOP_LOSS, -1.0, 90.0)
+    book.submit_oco([take_profit, stop_loss])
+
+    assert _candle(book, pft, 100.0, 105.0, 95.0) == []
+    assert _candle(book, pft, 100.0, 111.0, 95.0) == [take_profit, stop_loss]
+    assert take_profit.status == OrderStatus.FILLED
+    assert stop_loss.status == OrderStatus.CANCELLED
+    assert len(book) == 0 and book._oco_groups == {} and book._oco_of == {}
+
+@pytest.mark.parametrize("stop_first", [True, False])
+def test_oco_both_triggered_stop_wins(stop_first):
+    book, pft = OrderBook(), Portfolio()
+    stop_loss: Order = _order(OrderType.STOP_LOSS, -1.0, 90.0)
+    take_profit: Order = _order(OrderType.TAKE_PROFIT, -1.0, 110.0)
+    limit: Order = _order(OrderType.LIMIT, 1.0, 95.0)
+    book.submit(limit)
+    book.submit_oco([stop_loss, take_profit] if stop_first else [take_profit, stop_loss])
+
+    # The candle crosses both legs of the bracket, and can't tell which came first
+    assert _candle(book, pft, 100.0, 120.0, 80.0) == [limit, stop_loss, take_profit]
+    assert stop_loss.status == OrderStatus.FILLED and stop_loss.purchase_price == 90.0
+    assert take_profit.status == OrderStatus.CANCELLED
+    assert len(pft.orders) == 2
+
+def test_cancelled_oco_order_leaves_sibling_working():
+    book, pft = OrderBook(), Portfolio()
+    ids: list[int] = book.submit_oco([
+        _order(OrderType.TAKE_PROFIT, -1.0, 110.0), _order(OrderType.STOP_LOSS, -1.0, 90.0)
+    ])
+    assert book.cancel(ids[0])
+    assert not book.cancel(ids[0])
+    assert ids[1] in book
+
+    _candle(book, pft, 100.0, 100.0, 85.0)
+    assert len(book) == 0 and book._oco_groups == {}
+
+def test_expiry():
+    book, pft = OrderBook(), Portfolio()
+    expiring: Order = _order(OrderType.LIMIT, 1.0, 90.0)
+    lasting: Order = _order(OrderType.LIMIT, 1.0, 80.0)
+    book.submit(expiring, expires_at=1000)
+    book.submit(lasting)
+
+    assert _candle(book, pft, 100.0, 100.0, 95.0, timestamp=999) == []
+    # Expired before it could be triggered by this candle
+    assert _candle(book, pft, 100.0, 100.0, 85.0, timestamp=1000) == [expiring]
+    assert expiring.status == OrderStatus.EXPIRED
+    assert book.working() == [lasting]
+
+def test_market_orders_are_rejected():
+    with pytest.raises(ValueError):
+        OrderBook().submit(Order("SYN", OrderType.MARKET, 1.0, 100.0, _DT))
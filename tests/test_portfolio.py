@@ -0,0 +1,53 @@
+import numpy as np
+
+from trbot import broker, candles
+from trbot.portfolio import Order, OrderBatch, OrderStatus, OrderType, Portfolio
+
+
+def _order(quantity: float, price: float, dt: str, order_type: OrderType = OrderType.MARKET,
+    **prices: float
+) -> Order:
+    return Order("SYN", order_type, quantity, price, dt, **prices)
+
+def test_order_batch_round_trip():
+    orders: list[Order] = [
+        _order(1.0, 100.0, "2020-01-01 10:00:00"),
+        _order(-2.0, 101.5, "2020-01-01 11:00:00", OrderType.LIMIT, limit_price=101.5),
+        _order(3.0, 99.0, "2020-01-02 09:30:00", OrderType.STOP_LOSS, stop_price=98.0),
+    ]
+    orders[0].status = OrderStatus.FILLED
+    orders[1].status = OrderStatus.CANCELLED
+    # Enough orders for the batch to grow a few times
+    batch = OrderBatch(capacity=1)
+    for order in orders * 30:
+        batch.append(order)
+
+    assert len(batch) == 90
+    assert [ o.to_dict() for o in batch ] == [ o.to_dict() for o in orders * 30 ]
+    assert batch[-1].stop_price == 98.0 and batch[-1].limit_price is None
+    np.testing.assert_array_equal(batch.quantity[:3], [1.0, -2.0, 3.0])
+
+    # Dates appended after the timestamps were read get parsed as well
+    expected = candles.datetimes_to_timestamps([ o.purchase_dt for o in orders * 31 ])
+    np.testing.assert_array_equal(batch.timestamps, expected[:90])
+    for order in orders:
+        batch.append(order)
+    np.testing.assert_array_equal(batch.timestamps, expected)
+
+def test_portfolio_orders():
+    pft = Portfolio()
+    first: Order = _order(1.0, 100.0, "2020-01-01 10:00:00")
+    broker.execute_order(first, pft)
+    broker.execute_order(_order(1.0, 5000.0, "2020-01-01 11:00:00"), pft)
+
+    # The orders are the executed objects themselves, and can still be updated
+    assert pft.orders[0] is first
+    pft.orders[0].status = OrderStatus.CANCELLED
+    assert [ o.status for o in pft.orders ] == [OrderStatus.CANCELLED, OrderStatus.CANCELLED]
+    assert Portfolio.to_dict(pft)["orders"][1]["purchase_price"] == "5000.00"
+
+    batch: OrderBatch = pft.order_batch()
+    assert [ o.to_dict() for o in batch ] == [ o.to_dict() for o in pft.orders ]
+    np.testing.assert_array_equal(batch.timestamps, [
+        candles.datetime_to_timestamp("2020-01-01 10:00:00"), candles.datetime_to_timestamp("2020-01-01 11:00:00")
+    ])
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from bench import synthetic
+from trbot import broker, candles
+from trbot.candles import Timespan
+from trbot.quotes import StockframeQuoteProvider
+from trbot.stockframe import Stockframe
+
+
+_HOUR_MS: int = 60 * 60 * 1000
+
+@pytest.fixture
+def sf() -> Stockframe:
+    return synthetic.generate_stockframe(20, ticker="SYN", mult=4, timespan=Timespan.HOUR)
+
+def test_quote_within_candle_is_its_open(sf):
+    provider = StockframeQuoteProvider([sf])
+    ts: int = int(sf.timestamps[5])
+    assert provider.get_quote("SYN", ts) == sf.open[5]
+    assert provider.get_quote("SYN", ts + 4 * _HOUR_MS - 1) == sf.open[5]
+    assert provider.get_quote("SYN", ts + 4 * _HOUR_MS) == sf.open[6]
+
+def test_quote_within_gap_is_last_close(sf):
+    keep: np.ndarray = np.arange(sf.size) != 6
+    gapped: Stockframe = Stockframe.from_arrays(
+        "SYN", sf.mult, sf.timespan, sf.timestamps[keep], sf.open[keep], sf.high[keep],
+        sf.low[keep], sf.close[keep], sf.volume[keep]
+    )
+    provider = StockframeQuoteProvider([gapped])
+    assert provider.get_quote("SYN", int(sf.timestamps[6]) + 1000) == sf.close[5]
+
+def test_quote_before_first_candle(sf):
+    with pytest.raises(ValueError):
+        StockframeQuoteProvider([sf]).get_quote("SYN", int(sf.timestamps[0]) - 1)
+
+def test_market_order_has_no_look_ahead(sf, monkeypatch):
+    monkeypatch.setattr(broker, "_QUOTE_PROVIDER", StockframeQuoteProvider([sf]))
+    order = broker.market_order("SYN", 1.0, candles.timestamp_to_datetime(int(sf.timestamps[5])))
+    assert order.purchase_price == sf.open[5]
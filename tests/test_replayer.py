@@ -0,0 +1,47 @@
+from bench import synthetic
+from bench.suite import CrossoverStrategy
+from trbot import candles
+from trbot.replayer import CandleReplayer
+
+
+def test_skip_through_every_candle():
+    sf = synthetic.generate_stockframe(50)
+    repl = CandleReplayer(sf)
+    seen: list[int] = []
+    while True:
+        repl.skip_to_next_candle()
+        if not repl.is_candle_available():
+            break
+        seen.append(repl.current_timestamp)
+    assert seen == sf.timestamps.tolist()
+
+def test_seek_time():
+    sf = synthetic.generate_stockframe(50)
+    repl = CandleReplayer(sf)
+    assert repl.seek_time(int(sf.timestamps[10])) == 10
+    # Between two candles, the next one is the first available
+    assert repl.seek_time(int(sf.timestamps[10]) + 1) == 11
+    assert repl.is_candle_available() and repl.index == 12
+    assert repl.seek_time(int(sf.timestamps[-1]) + 1) == 50
+    assert not repl.is_candle_available()
+
+def test_real_time_clock_waits_for_candles():
+    sf = synthetic.generate_stockframe(5)
+    repl = CandleReplayer(sf, time_factor=60.0, start_ind=1)
+    assert repl.is_candle_available()
+    assert not repl.is_candle_available()
+    # A second of real time is a minute of replay time, and the candle becomes available
+    # on the update after the clock reaches it
+    repl.update_time(1.0)
+    assert not repl.is_candle_available()
+    repl.update_time(1.0)
+    assert repl.is_candle_available()
+
+def test_fast_forward_start_at():
+    sf = synthetic.generate_stockframe(3000, seed=12)
+    strat = CrossoverStrategy(sf)
+    strat.start_at(candles.timestamp_to_datetime(int(sf.timestamps[1000])))
+    strat.run(fast_forward=True, verbose=False)
+    assert len(strat.portfolio.orders) > 0
+    assert min(o.purchase_dt for o in strat.portfolio.orders) > candles.timestamp_to_datetime(
+        int(sf.timestamps[1000]))
@@ -0,0 +1,69 @@
+from typing import Iterator
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench import synthetic
+from trbot import candles
+from trbot.candles import Timespan
+from trbot.resample import resample
+from trbot.stockframe import Stockframe
+
+
+@pytest.fixture(scope="module")
+def sf() -> Stockframe:
+    # A few days of minute candles, with a gap
+    sf = synthetic.generate_stockframe(3 * 24 * 60, seed=6)
+    keep: np.ndarray = (np.arange(sf.size) < 500) | (np.arange(sf.size) >= 700)
+    return Stockframe.from_arrays(
+        sf.ticker, sf.mult, sf.timespan, sf.timestamps[keep], sf.open[keep], sf.high[keep],
+        sf.low[keep], sf.close[keep], sf.volume[keep]
+    )
+
+@pytest.fixture(params=["UTC", "America/New_York"])
+def local_tz(request, monkeypatch) -> Iterator[str]:
+    """ Run under a certain local timezone (resampling buckets by local time) """
+    monkeypatch.setenv("TZ", request.param)
+    time.tzset()
+    candles._utc_offset_ms.cache_clear()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+    candles._utc_offset_ms.cache_clear()
+
+def _expected(sf: Stockframe, rule: str, tz: str) -> pd.DataFrame:
+    df = pd.DataFrame({
+        "open": sf.open, "high": sf.high, "low": sf.low, "close": sf.close, "volume": sf.volume,
+    }, index=pd.to_datetime(sf.timestamps, unit="ms", utc=True).tz_convert(tz))
+    return df.resample(rule).agg({
+        "open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum",
+    }).dropna()
+
+@pytest.mark.parametrize("mult,timespan,rule", [
+    (5, Timespan.MINUTE, "5min"),
+    (1, Timespan.HOUR, "1h"),
+    (4, Timespan.HOUR, "4h"),
+    (1, Timespan.DAY, "1D"),
+])
+def test_matches_pandas(sf, local_tz, mult, timespan, rule):
+    result: Stockframe = resample(sf, mult, timespan)
+    expected: pd.DataFrame = _expected(sf, rule, local_tz)
+
+    np.testing.assert_array_equal(result.timestamps, expected.index.as_unit("ms").asi8)
+    for column in ("open", "high", "low", "close", "volume"):
+        np.testing.assert_allclose(getattr(result, column), expected[column].to_numpy())
+
+def test_session_filter(sf):
+    result: Stockframe = resample(sf, 1, Timespan.HOUR, session_start="09:30", session_end="16:00")
+    times: list[str] = [ d[11:] for d in candles.timestamps_to_datetimes(result.timestamps).tolist() ]
+    # (the gap of the first day covers its first two hours of session)
+    assert times == [ f"{h:02}:30:00" for h in [*range(11, 16), *range(9, 16), *range(9, 16)] ]
+
+def test_rejects_uneven_timespans(sf):
+    five: Stockframe = resample(sf, 5, Timespan.MINUTE)
+    with pytest.raises(ValueError):
+        resample(five, 1, Timespan.MINUTE)
+    with pytest.raises(ValueError):
+        resample(five, 7, Timespan.MINUTE)
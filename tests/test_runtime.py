@@ -0,0 +1,161 @@
+import asyncio, json, sys, time
+
+import pytest
+
+from bench import synthetic
+from trbot import indgraph
+from trbot import broker
+from trbot.bot import TradingBot
+from trbot.candles import Candle, Timespan
+from trbot.engine import PortfolioEngine
+from trbot.portfolio import Order, Portfolio
+from trbot.runtime import LiveRuntime, ReplayFeed
+from trbot.stockframe import Stockframe
+from trbot.strategy import Strategy
+
+
+class BracketStrategy(Strategy):
+    """ Enters with a limit order on crossovers, exiting through a take-profit/stop-loss bracket """
+
+    def setup(self) -> None:
+        self.fast = self.TA_EMA(self._sf.close, period=5)
+        self.slow = self.TA_EMA(self._sf.close, period=20)
+
+    def on_candle(self) -> Order | None:
+        if self.ind_crossover(self.fast, self.slow):
+            close: float = float(self.last_close)
+            self.submit_oco([ self.take_profit(-1, close * 1.004), self.stop_loss(-1, close * 0.996) ])
+            return self.limit(1, close * 0.999)
+        if self.ind_crossover(self.slow, self.fast):
+            return self.sell(1)
+        return None
+
+
+class GraphBracketStrategy(BracketStrategy):
+    def setup(self) -> None:
+        self.fast, self.slow = self.add_indicators(
+            fast=indgraph.EMA(indgraph.Source("close"), 5), slow=indgraph.EMA(indgraph.Source("close"), 20)
+        )
+
+
+def _stockframes() -> list[Stockframe]:
+    return [
+        synthetic.generate_stockframe(3000, ticker=ticker, mult=15, timespan=Timespan.MINUTE,
+            seed=synthetic.ticker_seed(ticker))
+        for ticker in ("AAA", "BBB")
+    ]
+
+def _orders(orders) -> list[tuple]:
+    return [ (o.symbol, o.type, o.status, o.quantity, o.purchase_price, o.purchase_dt) for o in orders ]
+
+def test_same_orders_as_backtest():
+    sf: Stockframe = _stockframes()[0]
+    backtest = BracketStrategy(sf)
+    backtest.run(fast_forward=True, verbose=False)
+
+    live = BracketStrategy(sf)
+    runtime = LiveRuntime([live], ReplayFeed([sf]), queue_size=8)
+    stats: dict[str, float] = asyncio.run(runtime.run())
+
+    assert len(backtest.portfolio.orders) > 20
+    assert _orders(runtime.portfolio.orders) == _orders(backtest.portfolio.orders)
+    assert len(live.order_book) == len(backtest.order_book)
+    assert stats["candles"] == sf.size
+
+@pytest.mark.parametrize("strategy_cls", [BracketStrategy, GraphBracketStrategy])
+def test_candles_past_the_stockframe_get_appended(strategy_cls):
+    sf: Stockframe = _stockframes()[0]
+    backtest = strategy_cls(sf)
+    backtest.run(fast_forward=True, verbose=False)
+
+    # Starts with the first candles only, the others come in through the feed
+    prefix: Stockframe = Stockframe.from_arrays(sf.ticker, sf.mult, sf.timespan, *(
+        column[:1000] for column in (sf.timestamps, sf.open, sf.high, sf.low, sf.close, sf.volume)
+    ))
+    live = strategy_cls(prefix)
+    runtime = LiveRuntime([live], ReplayFeed([sf]))
+    asyncio.run(runtime.run())
+
+    assert live.sf.size == sf.size
+    assert _orders(runtime.portfolio.orders) == _orders(backtest.portfolio.orders)
+
+def test_candle_out_of_sequence_raises():
+    sf: Stockframe = _stockframes()[0]
+    strat = BracketStrategy(sf)
+    strat.begin(verbose=False)
+    strat.push_candle(Candle(1.0, 1.0, 1.0, 1.0, 1.0, int(sf.timestamps[0])))
+    with pytest.raises(ValueError):
+        strat.push_candle(Candle(1.0, 1.0, 1.0, 1.0, 1.0, int(sf.timestamps[2])))
+
+def test_same_orders_as_engine_under_thread_switches():
+    sfs: list[Stockframe] = _stockframes()
+    # NOTE: the lanes of the symbols execute in any order, so there's enough capital for
+    # no order to depend on the other symbol's
+    engine = PortfolioEngine([ BracketStrategy(sf) for sf in sfs ], Portfolio(1e9))
+    engine.run()
+
+    interval: float = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        runtime = LiveRuntime([ BracketStrategy(sf) for sf in sfs ], ReplayFeed(sfs), Portfolio(1e9))
+        asyncio.run(runtime.run())
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert runtime.portfolio.capital == pytest.approx(engine.portfolio.capital)
+    for sf in sfs:
+        assert _orders(o for o in runtime.portfolio.orders if o.symbol == sf.ticker) == \
+            _orders(o for o in engine.portfolio.orders if o.symbol == sf.ticker)
+
+def test_slow_broker_does_not_delay_other_symbols(monkeypatch):
+    sfs: list[Stockframe] = [
+        synthetic.generate_stockframe(800, ticker=ticker, mult=15, timespan=Timespan.MINUTE,
+            seed=synthetic.ticker_seed(ticker))
+        for ticker in ("AAA", "BBB")
+    ]
+    executed: dict[str, float] = {}
+    execute_order = broker.execute_order
+    def slow_execute_order(order: Order, portfolio: Portfolio) -> None:
+        if order.symbol == "AAA":
+            time.sleep(0.02)
+        execute_order(order, portfolio)
+        executed[order.symbol] = time.perf_counter()
+    monkeypatch.setattr(broker, "execute_order", slow_execute_order)
+
+    evaluated: dict[str, float] = {}
+    class TimedStrategy(BracketStrategy):
+        def on_candle(self) -> Order | None:
+            evaluated[self.sf.ticker] = time.perf_counter()
+            return super().on_candle()
+
+    strategies: list[Strategy] = [ TimedStrategy(sf) for sf in sfs ]
+    runtime = LiveRuntime(strategies, ReplayFeed(sfs), Portfolio(1e9))
+    asyncio.run(runtime.run())
+
+    assert sum(o.symbol == "AAA" for o in runtime.portfolio.orders) > 10
+    # Every candle of BBB was evaluated while AAA's orders were still being executed
+    assert evaluated["BBB"] < executed["AAA"]
+
+def test_bot_restores_from_journal(tmp_path):
+    sf: Stockframe = _stockframes()[0]
+    journal_dir: str = str(tmp_path / "journal")
+    bot = TradingBot(journal_dir=journal_dir)
+    bot.run([ BracketStrategy(sf) ], ReplayFeed([sf]))
+
+    restored = TradingBot(journal_dir=journal_dir)
+    assert restored.portfolio.capital == pytest.approx(bot.portfolio.capital)
+    assert _orders(restored.portfolio.orders) == _orders(bot.portfolio.orders)
+
+def test_bot_restores_initial_positions(tmp_path):
+    sf: Stockframe = _stockframes()[0]
+    portfolio_path: str = str(tmp_path / "portfolio.json")
+    with open(portfolio_path, "w") as f:
+        json.dump({ "capital": "5000.00", "positions": { "ZZZ": { "quantity": "3.00", "price": "10.00" } } }, f)
+    journal_dir: str = str(tmp_path / "journal")
+    bot = TradingBot(portfolio_path, journal_dir=journal_dir)
+    bot.run([ BracketStrategy(sf) ], ReplayFeed([sf]))
+
+    restored = TradingBot(portfolio_path, journal_dir=journal_dir)
+    assert sorted(restored.portfolio.positions) == ["AAA", "ZZZ"]
+    assert restored.portfolio.positions["ZZZ"].quantity == 3.0
+    assert restored.portfolio.capital == pytest.approx(bot.portfolio.capital)
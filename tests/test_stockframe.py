@@ -0,0 +1,45 @@
+import numpy as np
+
+from bench import synthetic
+from trbot import candles
+from trbot.candles import Candle, Timespan
+from trbot.stockframe import Stockframe
+
+
+def test_typed_columns():
+    sf = synthetic.generate_stockframe(100)
+    assert sf.timestamps.dtype == np.int64
+    for column in (sf.open, sf.high, sf.low, sf.close, sf.volume):
+        assert column.dtype == np.float64 and len(column) == sf.size
+    assert sf.dates[0] == candles.timestamp_to_datetime(int(sf.timestamps[0]))
+
+def test_from_candles():
+    cnds: list[Candle] = [
+        Candle(1.0 + i, 2.0 + i, 0.5 + i, 1.5 + i, 10.0 * i, 60_000 * i) for i in range(5)
+    ]
+    sf = Stockframe(cnds, "SYN", 1, Timespan.MINUTE)
+    np.testing.assert_array_equal(sf.timestamps, np.arange(5) * 60_000)
+    np.testing.assert_array_equal(sf.close, 1.5 + np.arange(5))
+
+def test_csv_round_trip(tmp_path, monkeypatch):
+    # NOTE: the candle info is parsed out of the file path, which must not contain any dash
+    monkeypatch.chdir(tmp_path)
+    sf = synthetic.generate_stockframe(500, ticker="SYN", mult=5)
+    sf.save_to_csv(".")
+    loaded = Stockframe.from_csv(candles.candles_outpath(".", "SYN", 5, Timespan.MINUTE))
+
+    assert (loaded.ticker, loaded.mult, loaded.timespan) == ("SYN", 5, Timespan.MINUTE)
+    np.testing.assert_array_equal(loaded.timestamps, sf.timestamps)
+    # Prices are written with 4 decimals
+    np.testing.assert_allclose(loaded.close, sf.close, atol=5e-5)
+
+def test_store_round_trip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sf = synthetic.generate_stockframe(500, ticker="SYN")
+    sf.save_to_store(".")
+    filepath: str = candles.store_outpath(".", "SYN", 1, Timespan.MINUTE)
+
+    loaded = Stockframe.from_store(filepath)
+    np.testing.assert_array_equal(loaded.close, sf.close)
+    ranged = Stockframe.from_store(filepath, sf.dates[100], sf.dates[199])
+    np.testing.assert_array_equal(ranged.timestamps, sf.timestamps[100:200])
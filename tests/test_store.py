@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import pytest
+
+from bench import synthetic
+from trbot import store
+
+
+@pytest.fixture
+def columns() -> store.Columns:
+    return synthetic.generate(1000, seed=2)
+
+def test_round_trip(tmp_path, columns):
+    filepath: str = str(tmp_path / "candles.bin")
+    store.write(filepath, columns)
+
+    loaded: store.Columns = store.open_columns(filepath)
+    for expected, actual in zip(columns, loaded):
+        np.testing.assert_array_equal(actual, expected)
+    assert not loaded[0].flags.writeable
+    assert store.time_range(filepath) == (int(columns[0][0]), int(columns[0][-1]))
+
+def test_range_query_is_inclusive(tmp_path, columns):
+    filepath: str = str(tmp_path / "candles.bin")
+    store.write(filepath, columns)
+    timestamps: np.ndarray = columns[0]
+
+    loaded: store.Columns = store.open_columns(filepath, int(timestamps[100]), int(timestamps[199]))
+    np.testing.assert_array_equal(loaded[0], timestamps[100:200])
+    np.testing.assert_array_equal(loaded[4], columns[4][100:200])
+    # Bounds between candles
+    loaded = store.open_columns(filepath, int(timestamps[100]) + 1, int(timestamps[199]) - 1)
+    np.testing.assert_array_equal(loaded[0], timestamps[101:199])
+    assert len(store.open_columns(filepath, int(timestamps[-1]) + 1)[0]) == 0
+
+def test_empty_store(tmp_path):
+    filepath: str = str(tmp_path / "empty.bin")
+    store.write(filepath, synthetic.generate(0))
+    assert all(len(col) == 0 for col in store.open_columns(filepath))
+    assert store.time_range(filepath) is None
+
+def test_rejects_unsorted_and_truncated(tmp_path, columns):
+    filepath: str = str(tmp_path / "candles.bin")
+    with pytest.raises(ValueError):
+        store.write(filepath, (columns[0][::-1], *columns[1:]))
+
+    store.write(filepath, columns)
+    os.truncate(filepath, os.path.getsize(filepath) - 8)
+    with pytest.raises(ValueError):
+        store.open_columns(filepath)
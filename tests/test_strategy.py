@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+import time
+
+import pytest
+
+from bench import synthetic
+from trbot import indgraph, strategy
+from trbot.portfolio import Order
+from trbot.strategy import Strategy
+
+
+class RecordingStrategy(Strategy):
+    PARAMS = { "every": 0 }
+
+    def setup(self) -> None:
+        self.seen: list[tuple[str, float]] = []
+
+    def on_candle(self) -> Order | None:
+        self.seen.append((self.curr_time_str, float(self.last_close)))
+        every: int = self.params["every"]
+        if every > 0 and len(self.seen) % every == 0:
+            return self.buy(1) if len(self.seen) % (2 * every) == 0 else self.sell(1)
+        return None
+
+def test_fast_forward_visits_every_candle_in_order():
+    sf = synthetic.generate_stockframe(20_000)
+    strat = RecordingStrategy(sf)
+    t: float = time.perf_counter()
+    strat.run(fast_forward=True, verbose=False)
+
+    # No waiting on the wall clock
+    assert time.perf_counter() - t < 5.0
+    assert strat.seen == list(zip(sf.dates.tolist(), sf.close.tolist()))
+
+def test_real_time_orders_match_fast_forward(monkeypatch):
+    sf = synthetic.generate_stockframe(300)
+    fast = RecordingStrategy(sf, every=7)
+    fast.run(fast_forward=True, verbose=False)
+
+    # A wall clock a second ahead on every reading (so two hours of replay time), which
+    # runs the replay's clock well ahead of the candles
+    clock = SimpleNamespace(now=0.0)
+    def wall_time() -> float:
+        clock.now += 1.0
+        return clock.now
+    monkeypatch.setattr(strategy, "time",
+        SimpleNamespace(time=wall_time, sleep=lambda _: None, perf_counter_ns=time.perf_counter_ns))
+    real = RecordingStrategy(sf, every=7)
+    real.run(verbose=False)
+
+    assert real.curr_time_str > real.candle_time_str
+    assert len(fast.portfolio.orders) > 10
+    assert [ o.to_dict() for o in real.portfolio.orders ] == [ o.to_dict() for o in fast.portfolio.orders ]
+
+def test_orders_are_placed_at_the_candle():
+    sf = synthetic.generate_stockframe(100)
+    strat = RecordingStrategy(sf, every=10)
+    strat.run(fast_forward=True, verbose=False)
+
+    orders = list(strat.portfolio.orders)
+    assert len(orders) == 10
+    assert [ (o.purchase_dt, o.purchase_price) for o in orders ] == strat.seen[9::10]
+    assert [ o.quantity for o in orders ] == [-1.0, 1.0] * 5
+
+def test_unknown_params():
+    with pytest.raises(KeyError):
+        RecordingStrategy(synthetic.generate_stockframe(10), period=3)
+
+def test_indicators_share_graph_values():
+    strat = RecordingStrategy(synthetic.generate_stockframe(200))
+    ema: str = strat.TA_EMA(strat.sf.close, period=5)
+    fast, = strat.add_indicators(fast=indgraph.EMA(indgraph.Source("close"), 5))
+    # The EMA is computed once, whichever way it was asked for
+    assert strat._indicators[fast] is strat._indicators[ema]
+
+    assert strat.add_indicators(fast=indgraph.EMA(indgraph.Source("close"), 5)) == ["fast"]
+    with pytest.raises(KeyError):
+        strat.add_indicators(fast=indgraph.EMA(indgraph.Source("close"), 6))
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+import talib
+
+from bench import synthetic
+from trbot import streaming
+
+
+@pytest.fixture(scope="module")
+def close() -> np.ndarray:
+    return synthetic.generate_stockframe(2000, seed=1).close.copy()
+
+def _stream(indicator, values: np.ndarray) -> np.ndarray:
+    return np.array([ indicator.update(float(v)) for v in values ])
+
+
+@pytest.mark.parametrize("period", [2, 14, 30])
+def test_sma(close, period):
+    np.testing.assert_allclose(
+        _stream(streaming.StreamingSMA(period), close), talib.SMA(close, timeperiod=period),
+        rtol=1e-9, equal_nan=True
+    )
+
+@pytest.mark.parametrize("period", [2, 14, 30])
+def test_ema(close, period):
+    np.testing.assert_allclose(
+        _stream(streaming.StreamingEMA(period), close), talib.EMA(close, timeperiod=period),
+        rtol=1e-9, equal_nan=True
+    )
+
+@pytest.mark.parametrize("period", [2, 14, 30])
+def test_rsi(close, period):
+    np.testing.assert_allclose(
+        _stream(streaming.StreamingRSI(period), close), talib.RSI(close, timeperiod=period),
+        rtol=1e-9, equal_nan=True
+    )
+
+def test_rsi_flat_series():
+    flat: np.ndarray = np.full(50, 100.0)
+    np.testing.assert_allclose(
+        _stream(streaming.StreamingRSI(14), flat), talib.RSI(flat, timeperiod=14), equal_nan=True
+    )
+
+@pytest.mark.parametrize("periods", [(12, 26, 9), (5, 35, 5), (26, 12, 9)])
+def test_macd(close, periods):
+    fast, slow, signal = periods
+    indicator = streaming.StreamingMACD(fast, slow, signal)
+    values: np.ndarray = np.array([ indicator.update(float(v)) for v in close ])
+    expected = talib.MACD(close, fastperiod=fast, slowperiod=slow, signalperiod=signal)
+    for i in range(3):
+        np.testing.assert_allclose(values[:, i], expected[i], rtol=1e-9, atol=1e-12, equal_nan=True)
+
+@pytest.mark.parametrize("period", [5, 20])
+def test_bbands(close, period):
+    indicator = streaming.StreamingBBANDS(period, 2.0, 1.5)
+    values: np.ndarray = np.array([ indicator.update(float(v)) for v in close ])
+    expected = talib.BBANDS(close, timeperiod=period, nbdevup=2.0, nbdevdn=1.5)
+    for i in range(3):
+        np.testing.assert_allclose(values[:, i], expected[i], rtol=1e-9, equal_nan=True)
@@ -0,0 +1,36 @@
+from trbot import tracing
+
+
+def test_histogram_buckets():
+    hist = tracing.Histogram()
+    for value in (0, 100, 128, 129, 130, 256, 257, 1 << 40):
+        hist.record(value)
+
+    assert hist._buckets[0] == 3      # 0, 100 and 128 (<= 128ns)
+    assert hist._buckets[1] == 3      # 129, 130 and 256 ((128, 256]ns)
+    assert hist._buckets[2] == 1      # 257 ((256, 512]ns)
+    assert hist._buckets[-1] == 1     # way past the last bound
+    assert hist.count == 8
+
+def test_percentile_is_bucket_upper_bound():
+    hist = tracing.Histogram()
+    for _ in range(10):
+        hist.record(130)
+    hist.record(5000)
+    assert hist.percentile(50) == 256
+    assert hist.percentile(100) == 5000
+
+def test_prometheus_buckets():
+    tracing.reset()
+    try:
+        tracing.observe("step", 130)
+        tracing.observe("step", 300)
+        text: str = tracing.to_prometheus()
+    finally:
+        tracing.reset()
+
+    assert 'trbot_step_seconds_bucket{le="1.28e-07"} 0' in text
+    assert 'trbot_step_seconds_bucket{le="2.56e-07"} 1' in text
+    assert 'trbot_step_seconds_bucket{le="5.12e-07"} 2' in text
+    assert 'trbot_step_seconds_bucket{le="+Inf"} 2' in text
+    assert "trbot_step_seconds_count 2" in text
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+import talib
+
+from bench import synthetic
+from bench.suite import CrossoverStrategy
+from trbot import candles
+from trbot.vectorized import Signal, SignalStrategy, crossover
+
+
+class SignalCrossover(SignalStrategy):
+    PARAMS = CrossoverStrategy.PARAMS
+
+    def signals(self) -> tuple[Signal, Signal]:
+        fast = talib.EMA(self.sf.close, timeperiod=self.params["fast_period"])
+        slow = talib.EMA(self.sf.close, timeperiod=self.params["slow_period"])
+        return self.crossover(fast, slow), self.crossover(slow, fast)
+
+
+def _fills(orders) -> list[tuple]:
+    return [ (o.status, o.quantity, o.purchase_price, o.purchase_dt) for o in orders ]
+
+@pytest.mark.parametrize("params", [{}, { "fast_period": 5, "slow_period": 30 }])
+def test_parity_with_per_candle_strategy(params):
+    sf = synthetic.generate_stockframe(5000, seed=3)
+    per_candle = CrossoverStrategy(sf, **params)
+    per_candle.run(fast_forward=True, verbose=False)
+    vectorized = SignalCrossover(sf, **params)
+    vectorized.run()
+
+    assert len(per_candle.portfolio.orders) > 10
+    assert _fills(vectorized.portfolio.orders) == _fills(per_candle.portfolio.orders)
+    assert vectorized.portfolio.capital == per_candle.portfolio.capital
+
+def test_parity_with_start_at():
+    sf = synthetic.generate_stockframe(5000, seed=4)
+    start: str = candles.timestamp_to_datetime(int(sf.timestamps[2500]))
+    per_candle = CrossoverStrategy(sf)
+    per_candle.start_at(start)
+    per_candle.run(fast_forward=True, verbose=False)
+    vectorized = SignalCrossover(sf)
+    vectorized.start_at(start)
+    vectorized.run()
+
+    assert _fills(vectorized.portfolio.orders) == _fills(per_candle.portfolio.orders)
+
+def test_crossover():
+    a: np.ndarray = np.array([1.0, 2.0, 3.0, np.nan, 3.0, 1.0])
+    np.testing.assert_array_equal(
+        crossover(a, 2.5), [False, False, True, False, False, False]
+    )
+
+def test_unknown_params():
+    sf = synthetic.generate_stockframe(10)
+    with pytest.raises(KeyError):
+        SignalCrossover(sf, period=3)
+    with pytest.raises(KeyError):
+        CrossoverStrategy(sf, period=3)
@@ -1,12 +1,14 @@
 from datetime import datetime
-import csv, enum, json, requests, time
+import asyncio, csv, enum, json, requests, time
 
 import pandas as pd
 
 
 from . import candles
 from .candles import Candle, CandleOption, Timespan
+from .journal import PortfolioJournal
 from .portfolio import Order, OrderType, Portfolio, Position
+from .runtime import CandleFeed, LiveRuntime
 from .stockframe import Stockframe
 from .strategy import Strategy
 
@@ -14,7 +16,38 @@ from .strategy import Strategy
 class TradingBot:
     BASE_URL: str = "https://api.polygon.io"
 
-    def __init__(self, portfolio_filepath: str | None = None) -> None:
+    def __init__(self, portfolio_filepath: str | None = None, journal_dir: str | None = None) -> None:
+        """ `portfolio_filepath` is a JSON file with the initial portfolio, while executions
+        get persisted to a journal in `journal_dir` (which the portfolio is restored from
+        on the next start, once it holds any) """
+        self._journal: PortfolioJournal | None = None
         self._portfolio: Portfolio = Portfolio()
-        if portfolio_filepath is not None:
+        if journal_dir is not None:
+            self._journal = PortfolioJournal(journal_dir)
+            self._portfolio = self._journal.load()
+        if portfolio_filepath is not None and (self._journal is None or self._journal.seq == 0):
             self._init_portfolio(portfolio_filepath)
+            if self._journal is not None:
+                # The journal only records what executions change, so the initial state
+                # has to be in its snapshot to be restored
+                self._journal.compact(self._portfolio)
+
+    @property
+    def portfolio(self) -> Portfolio:
+        return self._portfolio
+
+    def run(self, strategies: list[Strategy], feed: CandleFeed, verbose: bool = False) -> dict[str, float]:
+        """ Trade the candles of the feed with the strategies (see `runtime.LiveRuntime`)
+
+        Every execution is appended to the journal (if any). Returns the candle to order
+        latency stats of the run.
+        """
+        runtime = LiveRuntime(strategies, feed, self._portfolio)
+        try:
+            return asyncio.run(runtime.run(verbose))
+        finally:
+            if self._journal is not None:
+                self._journal.close()
+
+    def _init_portfolio(self, filepath: str) -> None:
+        self._portfolio._init_from_json(filepath)
@@ -1,18 +1,95 @@
 from datetime import datetime, timedelta
-import json, sys, time
+import json, logging, threading, time
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from . import candles
-from .candles import Candle, CandleOption, Timespan
+from .candles import CandleBatch, CandleOption, Timespan
+from .ingest import ColumnBuffer
 from .portfolio import Portfolio, Order, OrderStatus, OrderType, Position
+from .quotes import QuoteProvider
 
 
+logger: logging.Logger = logging.getLogger(__name__)
+
 _BASE_URL: str = "https://api.polygon.io"
 _API_KEY_FILEPATH: str = "./API_KEY.secret"
 _API_KEY: str = ""
 _REQ_PER_MIN: int = 4
-_REQUEST_TIMES: list[datetime] = []
+_REQ_TIMEOUT_SEC: float = 30.0
+_MAX_RETRIES: int = 5
+_BACKOFF_BASE_SEC: float = 1.0
+# Status codes worth retrying (rate limited or server side errors)
+_RETRY_STATUS_CODES: set[int] = {429, 500, 502, 503, 504}
+_POOL_SIZE: int = 16
+# Approximate maximum limit of candles returned request
+_MAX_CANDLES_PER_REQ: int = 1150
+
+
+class RequestError(Exception):
+    pass
+
+
+class RateLimiter:
+    """ Thread-safe token bucket """
+
+    def __init__(self, req_per_min: int, burst: int = 1) -> None:
+        # NOTE: with a burst of 1, there can never be more than `req_per_min` requests
+        # within any 60 second window, which is how the API counts them
+        self._rate: float = req_per_min / 60.0
+        self._capacity: float = float(burst)
+        self._tokens: float = float(burst)
+        self._updated: float = time.monotonic()
+        self._lock: threading.Lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """ Take a token, waiting for one to become available if needed """
+        while True:
+            with self._lock:
+                now: float = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                delay: float = (1.0 - self._tokens) / self._rate
+
+            time.sleep(delay)
+
+
+_RATE_LIMITER: RateLimiter = RateLimiter(_REQ_PER_MIN)
+_SESSION: requests.Session | None = None
+_SESSION_LOCK: threading.Lock = threading.Lock()
+_API_KEY_LOCK: threading.Lock = threading.Lock()
+
+def set_base_url(url: str) -> None:
+    """ Point the broker to another server implementing the same API (e.g. a local stand-in) """
+    global _BASE_URL
+    _BASE_URL = url.rstrip("/")
+
+def set_api_key(api_key: str) -> None:
+    global _API_KEY
+    _API_KEY = api_key
+
+def set_rate_limit(req_per_min: int, burst: int = 1) -> None:
+    global _RATE_LIMITER
+    _RATE_LIMITER = RateLimiter(req_per_min, burst)
+
+
+class PolygonQuoteProvider(QuoteProvider):
+    """ Requests the 1 minute candle at the given time from the API (meant for live trading) """
+
+    def get_quote(self, symbol: str, timestamp: int) -> float:
+        return _get_quote(symbol, candles.timestamp_to_datetime(timestamp))
+
+
+_QUOTE_PROVIDER: QuoteProvider = PolygonQuoteProvider()
+
+def set_quote_provider(provider: QuoteProvider) -> None:
+    """ Change where market orders get their prices from (e.g. a `StockframeQuoteProvider` in backtests) """
+    global _QUOTE_PROVIDER
+    _QUOTE_PROVIDER = provider
 
 def is_market_open() -> bool:
     return True
@@ -20,7 +97,7 @@ def is_market_open() -> bool:
 def market_order(symbol: str, quantity: float, dt_str: str | None = None) -> Order:
     start = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S") if dt_str is not None else datetime.now()
     dt: str = (start + timedelta(seconds=1)).strftime("%Y-%m-%d %H:%M:%S")
-    purchase_price: float = _get_quote(symbol, dt)
+    purchase_price: float = _QUOTE_PROVIDER.get_quote(symbol, candles.datetime_to_timestamp(dt))
 
     return Order(
         symbol=symbol,
@@ -36,60 +113,81 @@ def execute_order(order: Order, portfolio: Portfolio) -> None:
         order.status = OrderStatus.WORKING
         return
 
-    capital: float = portfolio.capital
-    if order.abs_value() <= capital:
-        # Subtract order from total and update portfolio's positions
-        portfolio.capital = capital - order.abs_value()
-        # Update order status
-        order.status = OrderStatus.FILLED
-        portfolio.add_order(order)
-    else:
-        # Order cancelled due to insufficient funds (Update order status)
-        order.status = OrderStatus.CANCELLED
-        portfolio.add_order(order)
-
-    # Update portfolio position
-    if order.symbol in portfolio.positions.keys():
-        # Position already exists
-        pst: Position = portfolio.positions[order.symbol]
-        new_value = pst.market_value() + order.value()
-        pst.price = order.purchase_price
-        pst.quantity = new_value / order.purchase_price
-    else:
-        # New position was justed created
-        portfolio.positions[order.symbol] = Position(order.quantity, order.purchase_price)
-
-def get_historical_candles(opt: CandleOption) -> list[Candle]:
+    # NOTE: the checks and updates happen as one step, in case of concurrent executions
+    with portfolio.lock:
+        capital: float = portfolio.capital
+        if order.abs_value() <= capital:
+            # Subtract order from total and update portfolio's positions
+            portfolio.capital = capital - order.abs_value()
+            # Update order status
+            order.status = OrderStatus.FILLED
+            portfolio.add_order(order)
+        else:
+            # Order cancelled due to insufficient funds (Update order status)
+            order.status = OrderStatus.CANCELLED
+            portfolio.add_order(order)
+
+        # Update portfolio position
+        if order.symbol in portfolio.positions.keys():
+            # Position already exists
+            pst: Position = portfolio.positions[order.symbol]
+            new_value = pst.market_value() + order.value()
+            pst.price = order.purchase_price
+            pst.quantity = new_value / order.purchase_price
+        else:
+            # New position was justed created
+            portfolio.positions[order.symbol] = Position(order.quantity, order.purchase_price)
+
+        portfolio.order_executed(order)
+
+def get_historical_candles(opt: CandleOption) -> CandleBatch:
     """ Get historical candles for a certain stock as specified in the options """
+    windows: list[CandleOption] = split_windows(opt)
+    # Every window is decoded into the same columns (which also drops the candles
+    # repeated at the boundaries of the windows)
+    buf = ColumnBuffer(capacity=len(windows) * _MAX_CANDLES_PER_REQ)
+    start_time: float = time.time()
+    for window in windows:
+        _get_candles(window, buf)
+        logger.info("Query complete: %s to %s (len(candles) = %d)", window.start, window.end, len(buf))
+
+    diff: float = time.time() - start_time
+    logger.info("Completed in %.3f seconds.", diff)
+
+    return buf.to_batch()
+
+def get_window_candles(window: CandleOption) -> CandleBatch:
+    """ Get the candles of a single request-sized window (see `split_windows`)
+
+    Safe to call from many threads at once (e.g. to fetch the windows concurrently).
+    """
+    return _get_candles(window)
+
+def split_windows(opt: CandleOption) -> list[CandleOption]:
+    """ Split the range of the options into windows that fit within a single request """
     start_unix: int = candles.datetime_to_timestamp(opt.start)
     end_unix: int = candles.datetime_to_timestamp(opt.end)
 
-    cnds: list[Candle] = []
-    # Approximate maximum limit of candles returned request
-    MAX_CANDLES_PER_REQ: int = 1150
-
     # Total milliseconds range of all the candles
-    MS_PER_REQ: int = MAX_CANDLES_PER_REQ * opt.mult * opt.timespan.to_ms()
+    MS_PER_REQ: int = _MAX_CANDLES_PER_REQ * opt.mult * opt.timespan.to_ms()
 
+    windows: list[CandleOption] = []
     curr_start: int = start_unix
-    start_time: float = time.time()
     while curr_start <= end_unix:
         curr_end: int = min(curr_start + MS_PER_REQ, end_unix)
-
-        opt.start = candles.timestamp_to_datetime(curr_start)
-        opt.end = candles.timestamp_to_datetime(curr_end)
-        batch = _get_candles(opt)
-        cnds.extend(batch)
-
-        print(f"Query complete: {opt.start} to {opt.end}")
-        print(f"len(candles) = {len(cnds)}\n----------")
+        windows.append(CandleOption(
+            ticker=opt.ticker,
+            start=candles.timestamp_to_datetime(curr_start),
+            end=candles.timestamp_to_datetime(curr_end),
+            mult=opt.mult,
+            timespan=opt.timespan,
+            adjusted=opt.adjusted,
+            limit=opt.limit
+        ))
 
         curr_start = curr_end + opt.mult * opt.timespan.to_ms()
 
-    diff: float = time.time() - start_time
-    print(f"Completed in {diff:.3} seconds.")
-
-    return cnds
+    return windows
 
 def _get_quote(symbol: str, dt_str: str | None = None) -> float:
     dt: datetime = datetime.now()
@@ -104,12 +202,16 @@ def _get_quote(symbol: str, dt_str: str | None = None) -> float:
         mult=1,
         timespan=Timespan.MINUTE
     )
-    candles: list[Candle] = _get_candles(opt)
+    candles: CandleBatch = _get_candles(opt)
     assert len(candles) == 1, "ERROR: there should only be one candle here for a quote request"
 
     return candles[0].close
 
-def _get_candles(opt: CandleOption) -> list[Candle]:
+def _get_candles(opt: CandleOption, buf: ColumnBuffer | None = None) -> CandleBatch:
+    """ Decode every page of an aggregates request into `buf` (a new buffer by default)
+
+    Returns every candle of the buffer (views of its columns).
+    """
     # Init API_KEY if not done already
     if len(_API_KEY) == 0:
         _init_api_key()
@@ -123,65 +225,66 @@ def _get_candles(opt: CandleOption) -> list[Candle]:
         f"?adjusted={str(opt.adjusted).lower()}&limit={opt.limit}&apiKey={_API_KEY}"
     )
 
-    data: bytes = _make_request(target_url)
-    root = json.loads(data)
-
-    cnds: list[Candle] = []
-    for result in root.get("results", []):
-        candle = Candle(
-            result["o"],
-            result["h"],
-            result["l"],
-            result["c"],
-            result["v"],
-            result["t"]
-        )
-        cnds.append(candle)
-
-    next_url = root.get("next_url", None)
+    if buf is None:
+        buf = ColumnBuffer()
+    next_url: str | None = target_url
     while next_url is not None:
-        data = _make_request(f"{next_url}&apiKey={_API_KEY}")
-        root2 = json.loads(data)
-        for result in root2.get("results", []):
-            candle = Candle(
-                result["o"],
-                result["h"],
-                result["l"],
-                result["c"],
-                result["v"],
-                result["t"]
-            )
-            cnds.append(candle)
-
-        next_url = root2.get("next_url", None)
-
-    return cnds
-
-def _make_request(url: str) -> bytes:
-    """ Make HTTP requests while respecting rate limit """
-    dt_now = datetime.now()
-    # Rate limiting: ensure we don't exceed the specified requests per minute
-    if len(_REQUEST_TIMES) >= _REQ_PER_MIN:
-        nth = _REQ_PER_MIN
-        nth_time = _REQUEST_TIMES[-nth]
-        time_since_nth_request = (dt_now - nth_time).total_seconds()
-        # Wait until time since nth request is more than a minute
-        if time_since_nth_request < 60:
-            delay = 60.00 - time_since_nth_request
-            print(f"Waiting {delay:.3f} seconds before next request...")
-            time.sleep(delay)
+        data: bytes = _make_request(next_url)
+        root = json.loads(data)
+        buf.append_results(root.get("results", []))
 
-    # Update request time list
-    _REQUEST_TIMES.append(dt_now)
+        next_url = root.get("next_url", None)
+        if next_url is not None:
+            next_url = f"{next_url}&apiKey={_API_KEY}"
 
-    resp = requests.get(url)
-    if not resp.ok:
-        print(f"[{resp.status_code}] ERROR: {resp.json()}")
-        sys.exit(1)
+    return buf.to_batch()
 
-    return resp.content
+def _make_request(url: str) -> bytes:
+    """ Make HTTP requests while respecting rate limit (transient errors are retried) """
+    attempt: int = 0
+    while True:
+        _RATE_LIMITER.acquire()
+
+        delay: float = _BACKOFF_BASE_SEC * (2 ** attempt)
+        try:
+            resp = _session().get(url, timeout=_REQ_TIMEOUT_SEC)
+        except (requests.ConnectionError, requests.Timeout) as err:
+            if attempt == _MAX_RETRIES:
+                raise RequestError(f"Request failed after {attempt + 1} attempts: {err}") from err
+            logger.warning("%s, retrying in %.1f seconds...", err, delay)
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        if resp.ok:
+            return resp.content
+
+        if resp.status_code not in _RETRY_STATUS_CODES or attempt == _MAX_RETRIES:
+            raise RequestError(f"[{resp.status_code}] {resp.text}")
+
+        retry_after: str | None = resp.headers.get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        logger.warning("[%d] retrying in %.1f seconds...", resp.status_code, delay)
+        time.sleep(delay)
+        attempt += 1
+
+def _session() -> requests.Session:
+    """ Session shared by every request, so connections get pooled and reused """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = requests.Session()
+            adapter = HTTPAdapter(pool_connections=_POOL_SIZE, pool_maxsize=_POOL_SIZE)
+            _SESSION.mount("https://", adapter)
+            _SESSION.mount("http://", adapter)
+        return _SESSION
 
 def _init_api_key() -> None:
     global _API_KEY
-    with open(_API_KEY_FILEPATH, "r") as f:
-        _API_KEY = f.read().strip()
+    # NOTE: requests made from many threads at once all find the key missing
+    with _API_KEY_LOCK:
+        if len(_API_KEY) > 0:
+            return
+        with open(_API_KEY_FILEPATH, "r") as f:
+            _API_KEY = f.read().strip()
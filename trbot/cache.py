@@ -0,0 +1,143 @@
+import json, os, time
+
+import numpy as np
+from numpy.typing import NDArray
+
+from . import candles, downloader, store
+from .candles import CandleBatch, CandleOption
+from .stockframe import Stockframe
+
+
+Range = tuple[int, int]
+# Ranges are sent as datetime strings, which only have a resolution of one second
+_RESOLUTION_MS: int = 1000
+
+class CandleCache:
+    """ Local cache of downloaded candles that only fetches the time ranges it's missing
+
+    Candles are cached per ticker, multiplier, timespan and adjusted flag in the candle
+    store format, along with a list of the time ranges (unix ms, inclusive) that have
+    already been downloaded.
+    """
+
+    def __init__(self, cache_dir: str) -> None:
+        self._cache_dir: str = cache_dir
+
+    def get(self, opt: CandleOption, show_progress: bool = False) -> Stockframe:
+        """ Get the candles of the options, downloading only the gaps of the cache """
+        self.update([opt], show_progress)
+        return Stockframe.from_store(self.filepath(opt), opt.start, opt.end)
+
+    def update(self, opts: list[CandleOption], show_progress: bool = False) -> None:
+        """ Download the missing ranges of every option (all at once) and merge them in """
+        gap_opts: list[CandleOption] = []
+        owners: list[int] = []
+        for i, opt in enumerate(opts):
+            for start, end in self.missing(opt):
+                # NOTE: rounded up, or the string would fall back onto the covered second
+                start = -(-start // _RESOLUTION_MS) * _RESOLUTION_MS
+                gap_opts.append(CandleOption(
+                    ticker=opt.ticker,
+                    start=candles.timestamp_to_datetime(start),
+                    end=candles.timestamp_to_datetime(end),
+                    mult=opt.mult,
+                    timespan=opt.timespan,
+                    adjusted=opt.adjusted,
+                    limit=opt.limit
+                ))
+                owners.append(i)
+
+        if len(gap_opts) == 0:
+            return
+
+        batches: list[CandleBatch] = downloader.download_many(gap_opts, show_progress=show_progress)
+        for i, opt in enumerate(opts):
+            fetched: list[tuple[CandleOption, CandleBatch]] = [
+                (gap_opt, batch) for gap_opt, batch, owner in zip(gap_opts, batches, owners)
+                if owner == i
+            ]
+            if len(fetched) > 0:
+                self._merge(opt, fetched)
+
+    def coverage(self, opt: CandleOption) -> list[Range]:
+        """ Time ranges already downloaded for the options' ticker, multiplier and timespan """
+        ranges_path: str = self._ranges_path(opt)
+        if not os.path.exists(ranges_path):
+            return []
+
+        with open(ranges_path, "r") as f:
+            return [ (int(start), int(end)) for start, end in json.load(f) ]
+
+    def missing(self, opt: CandleOption) -> list[Range]:
+        """ Time ranges of the options that aren't in the cache yet """
+        start: int = candles.datetime_to_timestamp(opt.start)
+        end: int = candles.datetime_to_timestamp(opt.end)
+        return _subtract(self.coverage(opt), start, end)
+
+    def filepath(self, opt: CandleOption) -> str:
+        subdir: str = "adjusted" if opt.adjusted else "unadjusted"
+        return candles.store_outpath(
+            os.path.join(self._cache_dir, subdir), opt.ticker, opt.mult, opt.timespan
+        )
+
+    def _ranges_path(self, opt: CandleOption) -> str:
+        return f"{self.filepath(opt)}.json"
+
+    def _merge(self, opt: CandleOption, fetched: list[tuple[CandleOption, CandleBatch]]) -> None:
+        filepath: str = self.filepath(opt)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        parts: list[store.Columns] = []
+        if os.path.exists(filepath):
+            parts.append(store.open_columns(filepath))
+        for _, batch in fetched:
+            parts.append(batch.columns)
+
+        # Newly downloaded candles come last, so they win over cached duplicates
+        columns: list[NDArray] = [ np.concatenate([ p[k] for p in parts ]) for k in range(6) ]
+        order: NDArray[np.intp] = np.argsort(columns[0], kind="stable")
+        timestamps: NDArray[np.int64] = columns[0][order]
+        keep: NDArray[np.bool_] = np.append(timestamps[1:] != timestamps[:-1], True)
+        keep_idx: NDArray[np.intp] = order[keep]
+        store.write(filepath, tuple(col[keep_idx] for col in columns))  # type: ignore
+
+        # The candle currently in progress isn't final yet, so its range is left out
+        # of the coverage for it to be downloaded again next time
+        bar_ms: int = opt.mult * opt.timespan.to_ms()
+        now_ms: int = int(time.time() * 1000)
+        ranges: list[Range] = self.coverage(opt)
+        for gap_opt, _ in fetched:
+            start: int = candles.datetime_to_timestamp(gap_opt.start)
+            end: int = min(candles.datetime_to_timestamp(gap_opt.end), now_ms - bar_ms)
+            if start <= end:
+                ranges.append((start, end))
+
+        with open(self._ranges_path(opt), "w") as f:
+            json.dump(_union(ranges), f)
+
+
+def _union(ranges: list[Range]) -> list[Range]:
+    merged: list[Range] = []
+    for start, end in sorted(ranges):
+        if len(merged) > 0 and start <= merged[-1][1] + _RESOLUTION_MS:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def _subtract(ranges: list[Range], start: int, end: int) -> list[Range]:
+    """ Parts of [start, end] that aren't covered by any of the ranges """
+    gaps: list[Range] = []
+    curr: int = start
+    for r_start, r_end in _union(ranges):
+        if r_end < curr:
+            continue
+        if r_start > end:
+            break
+        if r_start > curr:
+            gaps.append((curr, r_start - 1))
+        curr = max(curr, r_end + 1)
+
+    if curr <= end:
+        gaps.append((curr, end))
+    return gaps
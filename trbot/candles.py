@@ -1,8 +1,15 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
+from functools import lru_cache
+import os
+
+import numpy as np
+from numpy.typing import NDArray
 
 
 class Candle:
+    __slots__ = ("open", "high", "low", "close", "volume", "timestamp")
+
     def __init__(self, open_: float, high: float, low: float, close: float, volume: float, timestamp: int):
         self.open: float = open_
         self.high: float = high
@@ -28,6 +35,125 @@ class Candle:
                 self.timestamp == other.timestamp)
 
 
+class CandleBatch:
+    """ Many candles stored as typed columns instead of one object per candle
+
+    Indexing a batch still gives back `Candle` records (or a sub-batch for slices).
+    """
+    __slots__ = ("_timestamps", "_open", "_high", "_low", "_close", "_volume")
+
+    def __init__(self, timestamps: NDArray[np.int64], open_: NDArray[np.float64],
+        high: NDArray[np.float64], low: NDArray[np.float64], close: NDArray[np.float64],
+        volume: NDArray[np.float64]
+    ) -> None:
+        self._timestamps: NDArray[np.int64] = np.ascontiguousarray(timestamps, dtype=np.int64)
+        self._open: NDArray[np.float64] = np.ascontiguousarray(open_, dtype=np.float64)
+        self._high: NDArray[np.float64] = np.ascontiguousarray(high, dtype=np.float64)
+        self._low: NDArray[np.float64] = np.ascontiguousarray(low, dtype=np.float64)
+        self._close: NDArray[np.float64] = np.ascontiguousarray(close, dtype=np.float64)
+        self._volume: NDArray[np.float64] = np.ascontiguousarray(volume, dtype=np.float64)
+
+    @classmethod
+    def empty(cls) -> 'CandleBatch':
+        return cls(np.empty(0, dtype=np.int64), *(np.empty(0, dtype=np.float64) for _ in range(5)))
+
+    @classmethod
+    def from_candles(cls, cnds: list[Candle]) -> 'CandleBatch':
+        count: int = len(cnds)
+        return cls(
+            np.fromiter((c.timestamp for c in cnds), dtype=np.int64, count=count),
+            np.fromiter((c.open for c in cnds), dtype=np.float64, count=count),
+            np.fromiter((c.high for c in cnds), dtype=np.float64, count=count),
+            np.fromiter((c.low for c in cnds), dtype=np.float64, count=count),
+            np.fromiter((c.close for c in cnds), dtype=np.float64, count=count),
+            np.fromiter((c.volume for c in cnds), dtype=np.float64, count=count),
+        )
+
+    @classmethod
+    def from_results(cls, results: list[dict]) -> 'CandleBatch':
+        """ Build a batch out of the "results" of an aggregates response """
+        count: int = len(results)
+        return cls(
+            np.fromiter((r["t"] for r in results), dtype=np.int64, count=count),
+            np.fromiter((r["o"] for r in results), dtype=np.float64, count=count),
+            np.fromiter((r["h"] for r in results), dtype=np.float64, count=count),
+            np.fromiter((r["l"] for r in results), dtype=np.float64, count=count),
+            np.fromiter((r["c"] for r in results), dtype=np.float64, count=count),
+            np.fromiter((r["v"] for r in results), dtype=np.float64, count=count),
+        )
+
+    @classmethod
+    def concat(cls, batches: list['CandleBatch']) -> 'CandleBatch':
+        if len(batches) == 0:
+            return cls.empty()
+        if len(batches) == 1:
+            return batches[0]
+        return cls(*(np.concatenate(cols) for cols in zip(*(b.columns for b in batches))))
+
+    def drop_duplicates(self) -> 'CandleBatch':
+        """ Drop the candles whose timestamp isn't past the one before them (e.g. repeated
+        at the boundary of two requests) """
+        if len(self) == 0:
+            return self
+        latest: NDArray[np.int64] = np.maximum.accumulate(self._timestamps)
+        keep: NDArray[np.bool_] = np.r_[True, self._timestamps[1:] > latest[:-1]]
+        if np.all(keep):
+            return self
+        return CandleBatch(*(col[keep] for col in self.columns))
+
+    @property
+    def columns(self) -> tuple[NDArray[np.int64], NDArray[np.float64], NDArray[np.float64],
+                               NDArray[np.float64], NDArray[np.float64], NDArray[np.float64]]:
+        """ (timestamps, open, high, low, close, volume) """
+        return (self._timestamps, self._open, self._high, self._low, self._close, self._volume)
+
+    @property
+    def timestamps(self) -> NDArray[np.int64]:
+        return self._timestamps
+
+    @property
+    def open(self) -> NDArray[np.float64]:
+        return self._open
+
+    @property
+    def high(self) -> NDArray[np.float64]:
+        return self._high
+
+    @property
+    def low(self) -> NDArray[np.float64]:
+        return self._low
+
+    @property
+    def close(self) -> NDArray[np.float64]:
+        return self._close
+
+    @property
+    def volume(self) -> NDArray[np.float64]:
+        return self._volume
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return CandleBatch(*(col[key] for col in self.columns))
+        return Candle(
+            float(self._open[key]),
+            float(self._high[key]),
+            float(self._low[key]),
+            float(self._close[key]),
+            float(self._volume[key]),
+            int(self._timestamps[key])
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return f"CandleBatch {{ size: {len(self)} }}"
+
+
 class Timespan(Enum):
     MINUTE = "minute"
     HOUR = "hour"
@@ -87,13 +213,16 @@ class CandleOption:
 def candles_outpath(out_dir: str, ticker: str, mult: int, timespan: Timespan) -> str:
     return f"{out_dir}/ohlcv-{ticker}-{mult}{timespan.value}.csv"
 
+def store_outpath(out_dir: str, ticker: str, mult: int, timespan: Timespan) -> str:
+    return f"{out_dir}/ohlcv-{ticker}-{mult}{timespan.value}.bin"
+
 def candle_info_from_path(filepath: str) -> dict:
-    # filepath format: {out_dir}/ohlcv-{TICKER}-{MULT}{TIMESPAN}.csv
+    # filepath format: {out_dir}/ohlcv-{TICKER}-{MULT}{TIMESPAN}.{csv|bin}
     #        Example : candles/ohlcv-AAPL-5minute.csv
 
     # filepath = "candles/ohlcv-AAPL-5minute.csv"
     # path_no_ext = "candles/ohlcv-AAPL-5minute"
-    path_no_ext: str = filepath[:-4]
+    path_no_ext: str = os.path.splitext(filepath)[0]
 
     # parts = ["candles/ohlcv", "AAPL", "5minute"]
     parts: list[str] = path_no_ext.split('-')
@@ -125,3 +254,65 @@ def timestamp_to_datetime(timestamp: int) -> str:
 def datetime_to_timestamp(dt_str: str) -> int:
     dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
     return int(dt.timestamp() * 1000)
+
+# Local UTC offsets only ever change on a quarter-hour boundary, and at most a few times
+# a year, so they're looked up once per day (and once per quarter-hour on the days they change)
+_OFFSET_STEP_MS: int = 15 * 60 * 1000
+_MS_PER_DAY: int = 24 * 60 * 60 * 1000
+
+@lru_cache(maxsize=1 << 16)
+def _utc_offset_ms(timestamp: int) -> int:
+    dt: datetime = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).astimezone()
+    return int(dt.utcoffset().total_seconds() * 1000)  # type: ignore
+
+def _utc_offsets_ms(timestamps: NDArray[np.int64]) -> NDArray[np.int64]:
+    return np.fromiter(
+        (_utc_offset_ms(ts) for ts in timestamps.tolist()),
+        dtype=np.int64,
+        count=len(timestamps)
+    )
+
+def _unique_inverse(values: NDArray[np.int64]) -> tuple[NDArray[np.int64], NDArray[np.intp]]:
+    if len(values) > 0 and np.all(values[1:] >= values[:-1]):
+        # Avoid sorting values that are already sorted (the common case)
+        starts: NDArray[np.intp] = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+        inverse: NDArray[np.intp] = np.repeat(
+            np.arange(len(starts)), np.diff(np.r_[starts, len(values)])
+        )
+        return values[starts], inverse
+    return np.unique(values, return_inverse=True)  # type: ignore
+
+def _local_offsets_ms(timestamps: NDArray[np.int64]) -> NDArray[np.int64]:
+    days, day_inverse = _unique_inverse(timestamps // _MS_PER_DAY)
+    day_offsets: NDArray[np.int64] = _utc_offsets_ms(days * _MS_PER_DAY)
+    next_day_offsets: NDArray[np.int64] = _utc_offsets_ms((days + 1) * _MS_PER_DAY)
+    offsets: NDArray[np.int64] = day_offsets[day_inverse]
+
+    changing: NDArray[np.intp] = np.flatnonzero(day_offsets != next_day_offsets)
+    if len(changing) > 0:
+        mask: NDArray[np.bool_] = np.isin(day_inverse, changing)
+        steps, step_inverse = _unique_inverse(timestamps[mask] // _OFFSET_STEP_MS)
+        offsets[mask] = _utc_offsets_ms(steps * _OFFSET_STEP_MS)[step_inverse]
+
+    return offsets
+
+def timestamps_to_local_ms(timestamps: NDArray[np.int64]) -> NDArray[np.int64]:
+    """ Shift unix timestamps (in ms) to milliseconds of local wall-clock time """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    return timestamps + _local_offsets_ms(timestamps)
+
+def local_ms_to_timestamps(local_ms: NDArray[np.int64]) -> NDArray[np.int64]:
+    """ Inverse of `timestamps_to_local_ms` """
+    local_ms = np.asarray(local_ms, dtype=np.int64)
+    guess: NDArray[np.int64] = local_ms - _local_offsets_ms(local_ms)
+    return local_ms - _local_offsets_ms(guess)
+
+def timestamps_to_datetimes(timestamps: NDArray[np.int64]) -> NDArray[np.str_]:
+    """ Vectorized version of `timestamp_to_datetime` """
+    local: NDArray = timestamps_to_local_ms(timestamps).astype("datetime64[ms]").astype("datetime64[s]")
+    return np.char.replace(np.datetime_as_string(local), "T", " ")
+
+def datetimes_to_timestamps(dt_strs) -> NDArray[np.int64]:
+    """ Vectorized version of `datetime_to_timestamp` """
+    local: NDArray = np.asarray(dt_strs, dtype="datetime64[s]").astype("datetime64[ms]")
+    return local_ms_to_timestamps(local.astype(np.int64))
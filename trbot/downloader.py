@@ -0,0 +1,68 @@
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import logging, threading, time
+
+from . import broker
+from .candles import CandleBatch, CandleOption
+from .ingest import ColumnBuffer
+
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class _Progress:
+    def __init__(self, total: int, enabled: bool) -> None:
+        self._total: int = total
+        self._done: int = 0
+        self._candles: int = 0
+        self._enabled: bool = enabled
+        self._start: float = time.time()
+        self._lock: threading.Lock = threading.Lock()
+
+    def update(self, num_candles: int) -> None:
+        with self._lock:
+            self._done += 1
+            self._candles += num_candles
+            if self._enabled:
+                logger.info("[%d/%d] windows, %d candles, %.1fs elapsed",
+                    self._done, self._total, self._candles, time.time() - self._start)
+
+
+def download_many(opts: list[CandleOption], max_workers: int = 8,
+    show_progress: bool = True
+) -> list[CandleBatch]:
+    """ Download the historical candles of many options concurrently
+
+    Every option is split into request-sized windows and all the windows are fetched by a
+    pool of threads over pooled connections, while sharing the broker's rate limiter.
+    The candles of each option are returned in the same order as `opts`. With
+    `show_progress`, every downloaded window is logged (at INFO).
+    """
+    windows: list[list[CandleOption]] = [ broker.split_windows(opt) for opt in opts ]
+    progress = _Progress(sum(len(w) for w in windows), show_progress)
+
+    def fetch(window: CandleOption) -> CandleBatch:
+        batch: CandleBatch = broker.get_window_candles(window)
+        progress.update(len(batch))
+        return batch
+
+    results: list[list[CandleBatch]] = [ [ CandleBatch.empty() for _ in w ] for w in windows ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures: dict[Future, tuple[int, int]] = {
+            executor.submit(fetch, window): (i, j)
+            for i, opt_windows in enumerate(windows)
+            for j, window in enumerate(opt_windows)
+        }
+        for future in as_completed(futures):
+            i, j = futures[future]
+            results[i][j] = future.result()
+
+    return [ _merge(batches) for batches in results ]
+
+def _merge(batches: list[CandleBatch]) -> CandleBatch:
+    """ Join the windows of an option (dropping the candles repeated at their boundaries) """
+    if len(batches) == 1:
+        return batches[0]
+    buf = ColumnBuffer(capacity=sum(len(b) for b in batches))
+    for batch in batches:
+        buf.append_batch(batch)
+    return buf.to_batch()
@@ -0,0 +1,134 @@
+from typing import Iterator
+
+import numpy as np
+from numpy.typing import NDArray
+
+from . import indgraph
+from .portfolio import Portfolio
+from .replayer import CandleReplayer
+from .stockframe import Stockframe
+from .strategy import IndValues, Strategy
+
+
+class PortfolioEngine:
+    """ Backtest many strategies (each over its own stockframe) against one shared portfolio
+
+    The candles of every stockframe are merged into a single stream ordered by time, and
+    each candle is handed to the strategy it belongs to.
+    """
+    # Span of time (in ms) whose candles are merged in one go
+    DEFAULT_WINDOW_MS: int = 7 * 24 * 60 * 60 * 1000
+
+    def __init__(self, strategies: list[Strategy], portfolio: Portfolio | None = None,
+        window_ms: int = DEFAULT_WINDOW_MS
+    ) -> None:
+        self._portfolio: Portfolio = portfolio if portfolio is not None else Portfolio()
+        self._strategies: list[Strategy] = strategies
+        self._window_ms: int = window_ms
+        for strat in self._strategies:
+            strat.portfolio = self._portfolio
+
+    @property
+    def portfolio(self) -> Portfolio:
+        return self._portfolio
+
+    @property
+    def strategies(self) -> list[Strategy]:
+        return self._strategies
+
+    def run(self, verbose: bool = False) -> Portfolio:
+        for strat in self._strategies:
+            strat.begin(verbose)
+
+        series: list[NDArray[np.int64]] = [
+            strat.sf.timestamps[strat._ind:] for strat in self._strategies
+        ]
+        for owners in merge_timestamps(series, self._window_ms):
+            for i in owners.tolist():
+                self._strategies[i]._step()
+
+        return self._portfolio
+
+
+class MultiStrategyRunner:
+    """ Run many strategies over the same stockframe in a single replay
+
+    The strategies share one replayer (so one clock) and the values of the indicators
+    they computed (by graph node key), so an indicator used by several of them (e.g. the
+    same EMA) is computed once, while each strategy keeps its own indicator names,
+    portfolio and order book. A family of the same strategy with other parameters can
+    thus give the same names to different indicators.
+    """
+
+    def __init__(self, strategies: list[Strategy]) -> None:
+        if len(strategies) == 0:
+            raise ValueError("There are no strategies to run")
+
+        first: Strategy = strategies[0]
+        for strat in strategies:
+            if strat.sf is not first.sf:
+                raise ValueError("Every strategy has to run over the same stockframe")
+            if strat._ind != first._ind:
+                raise ValueError("Every strategy has to start at the same candle")
+
+        self._strategies: list[Strategy] = strategies
+        self._repl: CandleReplayer = first._repl
+        self._graph_memo: dict[indgraph.NodeKey, IndValues] = {}
+        for strat in strategies:
+            strat._repl = self._repl
+            strat._graph_memo = self._graph_memo
+
+    @property
+    def strategies(self) -> list[Strategy]:
+        return self._strategies
+
+    @property
+    def computed_indicators(self) -> dict[indgraph.NodeKey, IndValues]:
+        """ Values of every indicator computed for the strategies, by graph node key """
+        return self._graph_memo
+
+    def run(self, verbose: bool = False) -> list[Portfolio]:
+        """ Replay the candles once through every strategy (returns their portfolios, in order) """
+        for strat in self._strategies:
+            strat.begin(verbose)
+
+        sf: Stockframe = self._strategies[0].sf
+        while self._strategies[0]._ind < sf.size:
+            self._repl.skip_to_next_candle()
+            if not self._repl.is_candle_available():
+                break
+            for strat in self._strategies:
+                strat._process_candle()
+
+        return [ strat.portfolio for strat in self._strategies ]
+
+
+def merge_timestamps(series: list[NDArray[np.int64]], window_ms: int) -> Iterator[NDArray[np.intp]]:
+    """ Merge sorted timestamp arrays into one stream ordered by time
+
+    Yields, one window of time after another, the index of the series each timestamp
+    of the merged stream comes from. Equal timestamps keep the order of the series.
+    """
+    positions: list[int] = [0] * len(series)
+    while True:
+        # Start the window at the earliest pending timestamp, so gaps in the data
+        # (nights, weekends) never produce empty windows
+        pending: list[int] = [
+            int(ts[pos]) for ts, pos in zip(series, positions) if pos < len(ts)
+        ]
+        if len(pending) == 0:
+            return
+        window_end: int = min(pending) + window_ms
+
+        chunks: list[NDArray[np.int64]] = []
+        owners: list[NDArray[np.intp]] = []
+        for i, ts in enumerate(series):
+            pos: int = positions[i]
+            end: int = int(np.searchsorted(ts, window_end, side="left"))
+            if end > pos:
+                chunks.append(ts[pos:end])
+                owners.append(np.full(end - pos, i, dtype=np.intp))
+                positions[i] = end
+
+        order: NDArray[np.intp] = np.argsort(np.concatenate(chunks), kind="stable")
+        yield np.concatenate(owners)[order]
@@ -0,0 +1,157 @@
+""" Content-addressed indicator cache
+
+Indicator values are stored on disk as `.npy` files named after a fingerprint of the
+input series along with the indicator's name and parameters, so any run (or sweep
+worker) over the same data reuses them instead of recomputing them. Cached arrays are
+memory mapped read-only, and the least recently used ones are evicted once the cache
+grows past its size limit.
+"""
+from hashlib import blake2b
+from typing import Any, Callable
+import json, os, threading, uuid, weakref
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+IndValues = NDArray[np.float64]
+
+class IndicatorCache:
+    DEFAULT_MAX_BYTES: int = 512 * 1024 * 1024
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self._cache_dir: str = cache_dir
+        self._max_bytes: int = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def cache_dir(self) -> str:
+        return self._cache_dir
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def get_or_compute(self, name: str, series: NDArray, params: dict[str, Any],
+        compute: Callable[[], IndValues]
+    ) -> IndValues:
+        key: str = cache_key(name, series, params)
+        values: IndValues | None = self.get(key)
+        if values is None:
+            values = compute()
+            self.put(key, values)
+        return values
+
+    def get(self, key: str) -> IndValues | None:
+        path: str = self._path(key)
+        try:
+            values: IndValues = np.load(path, mmap_mode="r")
+        except (FileNotFoundError, ValueError, OSError):
+            # Missing, evicted in the meantime or partially written by a crashed process
+            return None
+
+        # Bump the modification time, which is what the eviction goes by
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return values
+
+    def put(self, key: str, values: IndValues) -> None:
+        path: str = self._path(key)
+        # NOTE: written under a unique name first, so concurrent workers never see
+        # (or clobber) each other's partial files
+        tmp_path: str = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(values))
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> None:
+        """ Delete the least recently used entries until the cache fits within its limit """
+        entries: list[tuple[float, str, int]] = sorted(self._entries())
+        total: int = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if total <= self._max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        for _, path, _ in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _entries(self) -> list[tuple[float, str, int]]:
+        """ (mtime, path, size) of every cached array """
+        entries: list[tuple[float, str, int]] = []
+        for entry in os.scandir(self._cache_dir):
+            if entry.name.endswith(".npy"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, f"{key}.npy")
+
+
+_CACHE: IndicatorCache | None = None
+
+def set_cache(cache: IndicatorCache | None) -> None:
+    """ Cache used by the strategies' indicators (None disables caching) """
+    global _CACHE
+    _CACHE = cache
+
+def get_cache() -> IndicatorCache | None:
+    return _CACHE
+
+def compute(name: str, series: NDArray, params: dict[str, Any],
+    fn: Callable[[], IndValues]
+) -> IndValues:
+    """ Compute an indicator through the current cache (if there's one) """
+    if _CACHE is None:
+        return fn()
+    return _CACHE.get_or_compute(name, series, params, fn)
+
+def cache_key(name: str, series: NDArray, params: dict[str, Any]) -> str:
+    h = blake2b(digest_size=16)
+    h.update(fingerprint(series).encode())
+    h.update(name.encode())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return f"{name}-{h.hexdigest()}"
+
+# Fingerprints of read-only series, by id (the weak references drop them along with the series)
+_fingerprints: dict[int, tuple[weakref.ref, str]] = {}
+_fingerprints_lock: threading.Lock = threading.Lock()
+
+def fingerprint(series: NDArray) -> str:
+    """ Hash of the contents (along with the type and shape) of a series
+
+    Read-only series (e.g. memory mapped candle stores) can't change under us, so their
+    fingerprint is only computed once.
+    """
+    memo: bool = not series.flags.writeable
+    if memo:
+        with _fingerprints_lock:
+            hit: tuple[weakref.ref, str] | None = _fingerprints.get(id(series))
+            if hit is not None and hit[0]() is series:
+                return hit[1]
+
+    h = blake2b(digest_size=16)
+    h.update(f"{series.dtype.str}{series.shape}".encode())
+    h.update(memoryview(np.ascontiguousarray(series)).cast("B"))
+    digest: str = h.hexdigest()
+
+    if memo:
+        key: int = id(series)
+        with _fingerprints_lock:
+            _fingerprints[key] = (weakref.ref(series, lambda _: _fingerprints.pop(key, None)), digest)
+    return digest
@@ -0,0 +1,230 @@
+""" Lazy indicator graph
+
+Indicators are declared as expressions over the columns of a stockframe, e.g.
+
+    close = Source("close")
+    macd, signal, hist = MACD(close, 12, 26, 9)
+    upper, middle, lower = BBANDS(close, 20)
+    spread = EMA(close, 12) - EMA(close, 26)
+
+and nothing gets computed until the graph is evaluated. Nodes are identified by their
+structure (type, parameters and inputs), so a node shared by several indicators (like
+`EMA(close, 12)` above, used by both `macd` and `spread`) is computed once, and nodes
+that no requested indicator depends on are never computed at all.
+"""
+from abc import ABCMeta, abstractmethod
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+import talib
+
+from .stockframe import Stockframe
+
+
+IndValues = NDArray[np.float64]
+NodeKey = tuple[Any, ...]
+
+class Node(metaclass=ABCMeta):
+    def __init__(self, *inputs: 'Node') -> None:
+        self._inputs: tuple[Node, ...] = inputs
+        self._key: NodeKey | None = None
+
+    @property
+    def inputs(self) -> tuple['Node', ...]:
+        return self._inputs
+
+    @property
+    def key(self) -> NodeKey:
+        """ Structural identity of the node (equal for nodes that compute the same values) """
+        if self._key is None:
+            self._key = (type(self).__name__, *self._params(), *(node.key for node in self._inputs))
+        return self._key
+
+    def _params(self) -> tuple[Any, ...]:
+        return ()
+
+    @abstractmethod
+    def compute(self, sf: Stockframe, inputs: list[IndValues]) -> IndValues:
+        """ Values of the node given the values of its inputs """
+        pass
+
+    def __repr__(self) -> str:
+        args: list[str] = [ repr(node) for node in self._inputs ] + [ repr(p) for p in self._params() ]
+        return f"{type(self).__name__}({', '.join(args)})"
+
+    # =========================== ARITHMETIC ===========================
+    def __add__(self, other: 'Node | float') -> 'Node':
+        return BinaryOp("add", self, _as_node(other))
+
+    def __radd__(self, other: float) -> 'Node':
+        return BinaryOp("add", _as_node(other), self)
+
+    def __sub__(self, other: 'Node | float') -> 'Node':
+        return BinaryOp("sub", self, _as_node(other))
+
+    def __rsub__(self, other: float) -> 'Node':
+        return BinaryOp("sub", _as_node(other), self)
+
+    def __mul__(self, other: 'Node | float') -> 'Node':
+        return BinaryOp("mul", self, _as_node(other))
+
+    def __rmul__(self, other: float) -> 'Node':
+        return BinaryOp("mul", _as_node(other), self)
+
+    def __truediv__(self, other: 'Node | float') -> 'Node':
+        return BinaryOp("div", self, _as_node(other))
+
+    def __rtruediv__(self, other: float) -> 'Node':
+        return BinaryOp("div", _as_node(other), self)
+
+    def __neg__(self) -> 'Node':
+        return BinaryOp("mul", Const(-1.0), self)
+
+
+class Source(Node):
+    """ A column of the stockframe (open, high, low, close or volume) """
+    COLUMNS: list[str] = ["open", "high", "low", "close", "volume"]
+
+    def __init__(self, column: str = "close") -> None:
+        if column not in Source.COLUMNS:
+            raise KeyError(f"Unknown column '{column}' (expected one of {Source.COLUMNS})")
+        super().__init__()
+        self._column: str = column
+
+    def _params(self) -> tuple[Any, ...]:
+        return (self._column,)
+
+    def compute(self, sf: Stockframe, inputs: list[IndValues]) -> IndValues:
+        return getattr(sf, self._column)
+
+
+class Const(Node):
+    def __init__(self, value: float) -> None:
+        super().__init__()
+        self._value: float = float(value)
+
+    def _params(self) -> tuple[Any, ...]:
+        return (self._value,)
+
+    def compute(self, sf: Stockframe, inputs: list[IndValues]) -> IndValues:
+        return np.full(sf.size, self._value)
+
+
+class BinaryOp(Node):
+    _OPS = {
+        "add": np.add,
+        "sub": np.subtract,
+        "mul": np.multiply,
+        "div": np.divide,
+    }
+
+    def __init__(self, op: str, lhs: Node, rhs: Node) -> None:
+        if op not in BinaryOp._OPS:
+            raise KeyError(f"Unknown operation '{op}'")
+        super().__init__(lhs, rhs)
+        self._op: str = op
+
+    def _params(self) -> tuple[Any, ...]:
+        return (self._op,)
+
+    def compute(self, sf: Stockframe, inputs: list[IndValues]) -> IndValues:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return BinaryOp._OPS[self._op](inputs[0], inputs[1])
+
+
+class SMA(Node):
+    def __init__(self, source: Node, period: int = 30) -> None:
+        super().__init__(source)
+        self._period: int = period
+
+    def _params(self) -> tuple[Any, ...]:
+        return (self._period,)
+
+    def compute(self, sf: Stockframe, inputs: list[IndValues]) -> IndValues:
+        return talib.SMA(inputs[0], timeperiod=self._period)
+
+
+class EMA(Node):
+    def __init__(self, source: Node, period: int = 30) -> None:
+        super().__init__(source)
+        self._period: int = period
+
+    def _params(self) -> tuple[Any, ...]:
+        return (self._period,)
+
+    def compute(self, sf: Stockframe, inputs: list[IndValues]) -> IndValues:
+        return talib.EMA(inputs[0], timeperiod=self._period)
+
+
+class RSI(Node):
+    def __init__(self, source: Node, period: int = 14) -> None:
+        super().__init__(source)
+        self._period: int = period
+
+    def _params(self) -> tuple[Any, ...]:
+        return (self._period,)
+
+    def compute(self, sf: Stockframe, inputs: list[IndValues]) -> IndValues:
+        return talib.RSI(inputs[0], timeperiod=self._period)
+
+
+class STDDEV(Node):
+    """ Population standard deviation over a rolling window """
+
+    def __init__(self, source: Node, period: int = 5) -> None:
+        super().__init__(source)
+        self._period: int = period
+
+    def _params(self) -> tuple[Any, ...]:
+        return (self._period,)
+
+    def compute(self, sf: Stockframe, inputs: list[IndValues]) -> IndValues:
+        return talib.STDDEV(inputs[0], timeperiod=self._period, nbdev=1.0)
+
+
+def MACD(source: Node, fast_period: int = 12, slow_period: int = 26,
+    signal_period: int = 9
+) -> tuple[Node, Node, Node]:
+    """ (macd, signal, histogram) nodes
+
+    NOTE: the EMAs are the plain EMAs of the source (so they're shared with any other
+    indicator using them), while talib.MACD seeds its fast EMA later on. Both converge
+    after the warm up, but the first values differ slightly.
+    """
+    macd: Node = EMA(source, fast_period) - EMA(source, slow_period)
+    signal: Node = EMA(macd, signal_period)
+    return macd, signal, macd - signal
+
+def BBANDS(source: Node, period: int = 5, nbdevup: float = 2.0,
+    nbdevdn: float = 2.0
+) -> tuple[Node, Node, Node]:
+    """ (upper, middle, lower) nodes, same as talib.BBANDS with a simple moving average """
+    middle: Node = SMA(source, period)
+    stddev: Node = STDDEV(source, period)
+    return middle + stddev * nbdevup, middle, middle - stddev * nbdevdn
+
+
+def evaluate(nodes: dict[str, Node], sf: Stockframe,
+    memo: dict[NodeKey, IndValues] | None = None
+) -> dict[str, IndValues]:
+    """ Values of every named node over the stockframe
+
+    Only the nodes they depend on get computed, each of them once. Values already in
+    `memo` (by node key) are reused, and every computed value is added to it.
+    """
+    if memo is None:
+        memo = {}
+    return { name: _evaluate(node, sf, memo) for name, node in nodes.items() }
+
+def _evaluate(node: Node, sf: Stockframe, memo: dict[NodeKey, IndValues]) -> IndValues:
+    key: NodeKey = node.key
+    values: IndValues | None = memo.get(key)
+    if values is None:
+        inputs: list[IndValues] = [ _evaluate(i, sf, memo) for i in node.inputs ]
+        values = node.compute(sf, inputs)
+        memo[key] = values
+    return values
+
+def _as_node(value: Node | float) -> Node:
+    return value if isinstance(value, Node) else Const(value)
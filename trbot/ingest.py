@@ -0,0 +1,142 @@
+""" Columnar ingest of aggregate API responses
+
+Pages of an aggregates response are decoded straight into preallocated typed columns
+(timestamp, open, high, low, close, volume), so a download never builds a `Candle` (or
+any other object) per row, and the finished columns are handed over without a copy.
+"""
+from operator import itemgetter
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .candles import CandleBatch, Timespan
+from .stockframe import Stockframe
+
+
+# Keys of a result of the aggregates API, in the order of the columns
+_RESULT_KEYS: tuple[str, ...] = ("t", "o", "h", "l", "c", "v")
+
+
+class ColumnBuffer:
+    """ Growable candle columns that drop repeated candles as they're appended
+
+    The candles of an append are sorted by time, and any candle whose timestamp was already
+    appended (such as the ones repeated at the boundary of two pages or two windows) is
+    dropped on the way in. Appending a new candle older than the latest one raises a
+    ValueError, as the columns only ever grow at the end.
+    """
+    # Number of rows the columns grow by (at least)
+    DEFAULT_CHUNK: int = 16384
+
+    def __init__(self, capacity: int = 0, chunk: int = DEFAULT_CHUNK) -> None:
+        self._chunk: int = max(1, chunk)
+        self._size: int = 0
+        self._columns: list[np.ndarray] = [
+            np.empty(capacity, dtype=np.int64 if i == 0 else np.float64)
+            for i in range(len(_RESULT_KEYS))
+        ]
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._columns[0])
+
+    def append_results(self, results: list[dict]) -> int:
+        """ Append the "results" of an aggregates page (returns the number of candles kept) """
+        count: int = len(results)
+        if count == 0:
+            return 0
+
+        self._reserve(count)
+        start: int = self._size
+        for col, key in zip(self._columns, _RESULT_KEYS):
+            col[start:start + count] = np.fromiter(
+                map(itemgetter(key), results), dtype=col.dtype, count=count
+            )
+        return self._commit(count)
+
+    def append_batch(self, batch: CandleBatch) -> int:
+        """ Append already decoded candles (returns the number of candles kept) """
+        count: int = len(batch)
+        if count == 0:
+            return 0
+
+        self._reserve(count)
+        start: int = self._size
+        for col, values in zip(self._columns, batch.columns):
+            col[start:start + count] = values
+        return self._commit(count)
+
+    def to_batch(self) -> CandleBatch:
+        """ Candles appended so far (views of the buffer, see `trim`) """
+        self._trim_if_sparse()
+        return CandleBatch(*(col[:self._size] for col in self._columns))
+
+    def to_stockframe(self, ticker: str, mult: int, timespan: Timespan) -> Stockframe:
+        """ Stockframe over the candles appended so far (views of the buffer, see `trim`) """
+        self._trim_if_sparse()
+        return Stockframe.from_arrays(ticker, mult, timespan, *(col[:self._size] for col in self._columns))
+
+    def trim(self) -> None:
+        """ Shrink the columns down to the candles appended so far
+
+        Views handed out by `to_batch` and `to_stockframe` keep the whole buffer alive, so
+        they trim it first when most of it is unused (e.g. when the capacity was reserved
+        for more candles than came in). Appending after a trim grows the columns again.
+        """
+        for i, col in enumerate(self._columns):
+            self._columns[i] = col[:self._size].copy()
+
+    def _trim_if_sparse(self) -> None:
+        # NOTE: growing never leaves more than half of the buffer (plus a chunk) unused,
+        # so buffers filled by appends alone are handed out without a copy
+        if self.capacity > 2 * self._size + self._chunk:
+            self.trim()
+
+    def _reserve(self, count: int) -> None:
+        needed: int = self._size + count
+        if needed <= self.capacity:
+            return
+
+        # Grow by whole chunks, and at least double, so appends stay amortized O(1)
+        capacity: int = max(needed, 2 * self.capacity)
+        capacity = -(-capacity // self._chunk) * self._chunk
+        for i, col in enumerate(self._columns):
+            grown: np.ndarray = np.empty(capacity, dtype=col.dtype)
+            grown[:self._size] = col[:self._size]
+            self._columns[i] = grown
+
+    def _commit(self, count: int) -> int:
+        """ Keep the `count` rows written past the end, minus the repeated ones """
+        start: int = self._size
+        end: int = start + count
+        timestamps: NDArray[np.int64] = self._columns[0][start:end]
+
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            # NOTE: the sort is stable, so the first of repeated rows is the one kept
+            order: NDArray[np.intp] = np.argsort(timestamps, kind="stable")
+            for col in self._columns:
+                col[start:end] = col[start:end][order]
+
+        keep: NDArray[np.bool_] = np.empty(count, dtype=np.bool_)
+        keep[0] = True
+        np.greater(timestamps[1:], timestamps[:-1], out=keep[1:])
+        if start > 0 and timestamps[0] <= self._columns[0][start - 1]:
+            # Rows at or before the latest one kept have to repeat one of the kept rows
+            older: NDArray[np.bool_] = timestamps <= self._columns[0][start - 1]
+            kept_ts: NDArray[np.int64] = self._columns[0][:start]
+            pos: NDArray[np.intp] = np.minimum(np.searchsorted(kept_ts, timestamps[older]), start - 1)
+            if not np.all(kept_ts[pos] == timestamps[older]):
+                raise ValueError("Candles older than the latest one appended can't be inserted")
+            keep &= ~older
+
+        kept: int = count
+        if not keep.all():
+            kept = int(np.count_nonzero(keep))
+            for col in self._columns:
+                col[start:start + kept] = col[start:end][keep]
+
+        self._size += kept
+        return kept
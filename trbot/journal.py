@@ -0,0 +1,198 @@
+""" Append-only portfolio journal
+
+Layout of a journal directory:
+    snapshot.json          capital and positions as of a certain event (written atomically)
+    journal.jsonl          one event per executed order, appended after the snapshot
+    orders-{seq}.jsonl     older events rotated out by a compaction (the order history)
+
+Every executed order costs a single appended line, and a restart only reads the latest
+snapshot plus the events appended after it.
+"""
+from typing import IO, Iterator
+import glob, json, os
+
+from .portfolio import Order, OrderStatus, OrderType, Portfolio, Position
+
+
+class PortfolioJournal:
+    SNAPSHOT_FILENAME: str = "snapshot.json"
+    JOURNAL_FILENAME: str = "journal.jsonl"
+    DEFAULT_COMPACT_EVERY: int = 1000
+
+    def __init__(self, dirpath: str, compact_every: int = DEFAULT_COMPACT_EVERY, sync: bool = False) -> None:
+        self._dirpath: str = dirpath
+        self._compact_every: int = compact_every
+        # Whether every append is flushed all the way to disk (slower, but survives power loss)
+        self._sync: bool = sync
+        self._seq: int = 0
+        self._tail_size: int = 0
+        self._file: IO[str] | None = None
+        os.makedirs(dirpath, exist_ok=True)
+
+    @property
+    def seq(self) -> int:
+        """ Sequence number of the latest event """
+        return self._seq
+
+    def load(self, initial_capital: float = 1000.0) -> Portfolio:
+        """ Rebuild the portfolio from the latest snapshot and the events appended after it
+
+        The returned portfolio is attached to the journal, and only holds the orders that
+        were executed since the last compaction (see `history` for all of them).
+        """
+        self.close()
+        pft = Portfolio(initial_capital)
+        self._seq = 0
+        self._tail_size = 0
+
+        snapshot_path: str = self._path(self.SNAPSHOT_FILENAME)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "r") as f:
+                root = json.load(f)
+            self._seq = int(root["seq"])
+            pft.capital = float(root["capital"])
+            pft.positions = {
+                symbol: Position(float(v["quantity"]), float(v["price"]))
+                for symbol, v in root["positions"].items()
+            }
+
+        journal_path: str = self._path(self.JOURNAL_FILENAME)
+        end: int = 0
+        for event, end in _read_lines(journal_path):
+            # Events at or before the snapshot are left over from an interrupted compaction
+            if event["seq"] <= self._seq:
+                continue
+            _apply(pft, event)
+            self._seq = event["seq"]
+            self._tail_size += 1
+
+        # Cut off a partially written last line, so the next event isn't appended onto it
+        if os.path.exists(journal_path) and os.path.getsize(journal_path) > end:
+            os.truncate(journal_path, end)
+
+        pft.journal = self
+        return pft
+
+    def record(self, order: Order, portfolio: Portfolio) -> None:
+        """ Append an executed order along with the state of the portfolio it left behind """
+        self._seq += 1
+        pst: Position | None = portfolio.positions.get(order.symbol)
+        event: dict = {
+            "seq": self._seq,
+            "symbol": order.symbol,
+            "type": order.type.value,
+            "status": order.status.value,
+            "quantity": order.quantity,
+            "price": order.purchase_price,
+            "dt": order.purchase_dt,
+            "limit": order.limit_price,
+            "stop": order.stop_price,
+            "capital": portfolio.capital,
+            "position": None if pst is None else [ pst.quantity, pst.price ],
+        }
+
+        f: IO[str] = self._journal_file()
+        f.write(json.dumps(event, separators=(",", ":")) + "\n")
+        f.flush()
+        if self._sync:
+            os.fsync(f.fileno())
+
+        self._tail_size += 1
+        if self._tail_size >= self._compact_every:
+            self.compact(portfolio)
+
+    def compact(self, portfolio: Portfolio) -> None:
+        """ Snapshot the portfolio and rotate the journal's events out into the history """
+        snapshot: dict = {
+            "seq": self._seq,
+            "capital": portfolio.capital,
+            "positions": {
+                symbol: { "quantity": pst.quantity, "price": pst.price }
+                for symbol, pst in portfolio.positions.items()
+            },
+        }
+        tmp_path: str = self._path(f"{self.SNAPSHOT_FILENAME}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(self.SNAPSHOT_FILENAME))
+
+        self.close()
+        journal_path: str = self._path(self.JOURNAL_FILENAME)
+        if os.path.exists(journal_path):
+            os.replace(journal_path, self._path(f"orders-{self._seq:012}.jsonl"))
+        self._tail_size = 0
+
+    def history(self) -> Iterator[Order]:
+        """ Every order ever recorded, oldest first """
+        paths: list[str] = sorted(glob.glob(self._path("orders-*.jsonl")))
+        paths.append(self._path(self.JOURNAL_FILENAME))
+
+        last_seq: int = 0
+        for path in paths:
+            for event in _read_events(path):
+                if event["seq"] > last_seq:
+                    last_seq = event["seq"]
+                    yield _event_order(event)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _journal_file(self) -> IO[str]:
+        if self._file is None:
+            self._file = open(self._path(self.JOURNAL_FILENAME), "a")
+        return self._file
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self._dirpath, filename)
+
+
+def _read_events(path: str) -> Iterator[dict]:
+    for event, _ in _read_lines(path):
+        yield event
+
+def _read_lines(path: str) -> Iterator[tuple[dict, int]]:
+    """ Every complete event of a journal file along with the offset right after its line
+
+    Only the last line can be partially written (the process died mid-append), which is
+    the one line not ending with a newline. Any other line that can't be decoded means the
+    file got corrupted, which raises a ValueError rather than dropping the events after it.
+    """
+    if not os.path.exists(path):
+        return
+
+    end: int = 0
+    with open(path, "rb") as f:
+        for num, line in enumerate(f, start=1):
+            if not line.endswith(b"\n"):
+                return
+            try:
+                event: dict = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Corrupted event on line {num} of '{path}'") from e
+            end += len(line)
+            yield event, end
+
+def _event_order(event: dict) -> Order:
+    order = Order(
+        symbol=event["symbol"],
+        order_type=OrderType(event["type"]),
+        quantity=float(event["quantity"]),
+        purchase_price=float(event["price"]),
+        purchase_dt=event["dt"],
+        # NOTE: older journals don't have the trigger prices of pending orders
+        limit_price=event.get("limit"),
+        stop_price=event.get("stop")
+    )
+    order.status = OrderStatus(event["status"])
+    return order
+
+def _apply(pft: Portfolio, event: dict) -> None:
+    pft.capital = float(event["capital"])
+    if event["position"] is not None:
+        quantity, price = event["position"]
+        pft.positions[event["symbol"]] = Position(float(quantity), float(price))
+    pft.add_order(_event_order(event))
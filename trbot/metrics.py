@@ -0,0 +1,162 @@
+import numpy as np
+from numpy.typing import NDArray
+
+from . import candles
+from .portfolio import Order, OrderBatch, OrderStatus
+from .stockframe import Stockframe
+
+
+_MS_PER_YEAR: float = 365.25 * 24 * 60 * 60 * 1000
+
+def equity_curve(orders: list[Order] | OrderBatch, sf: Stockframe,
+    initial_capital: float = 1000.0
+) -> dict[str, NDArray[np.float64]]:
+    """ Position, cash and equity at the close of every candle of the stockframe
+
+    Only the filled orders of the stockframe's ticker are taken into account, and each of
+    them is filled on the candle it was placed on (the latest candle at or before its date).
+    Fills dated before the first candle raise a ValueError, as there's no candle to put them on.
+    """
+    index, quantity, price = _fills(orders, sf)
+    return _equity_curve(index, quantity, price, sf, initial_capital)
+
+def _equity_curve(index: NDArray[np.intp], quantity: NDArray[np.float64],
+    price: NDArray[np.float64], sf: Stockframe, initial_capital: float
+) -> dict[str, NDArray[np.float64]]:
+    size: int = sf.size
+    position: NDArray[np.float64] = np.cumsum(np.bincount(index, weights=quantity, minlength=size))
+    cash: NDArray[np.float64] = initial_capital + np.cumsum(
+        np.bincount(index, weights=-quantity * price, minlength=size)
+    )
+    return {
+        "position": position,
+        "cash": cash,
+        "equity": cash + position * sf.close,
+    }
+
+def compute(orders: list[Order] | OrderBatch, sf: Stockframe, initial_capital: float = 1000.0,
+    periods_per_year: float | None = None
+) -> dict[str, float]:
+    """ Performance metrics of a finished run
+
+    `periods_per_year` (used to annualize the Sharpe and Sortino ratios) defaults to the
+    number of candles per year of the stockframe. Fills are put on candles the same way as
+    in `equity_curve`.
+    """
+    index, quantity, price = _fills(orders, sf)
+    curve: dict[str, NDArray[np.float64]] = _equity_curve(index, quantity, price, sf, initial_capital)
+    equity: NDArray[np.float64] = curve["equity"]
+    if len(equity) == 0:
+        return {}
+
+    final_position: float = float(curve["position"][-1])
+    last_close: float = float(sf.close[-1])
+    realized: float = _realized_pl(quantity, price)
+    total: float = float(equity[-1]) - initial_capital
+
+    # Returns between the close of consecutive candles
+    prev: NDArray[np.float64] = equity[:-1]
+    returns: NDArray[np.float64] = np.divide(
+        np.diff(equity), prev, out=np.zeros(len(prev)), where=prev != 0
+    )
+    if periods_per_year is None:
+        years: float = (int(sf.timestamps[-1]) - int(sf.timestamps[0])) / _MS_PER_YEAR
+        periods_per_year = len(returns) / years if years > 0 else 0.0
+
+    mean: float = float(returns.mean()) if len(returns) > 0 else 0.0
+    std: float = float(returns.std()) if len(returns) > 0 else 0.0
+    downside: float = float(np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))) if len(returns) > 0 else 0.0
+    annualize: float = float(np.sqrt(periods_per_year))
+
+    peak: NDArray[np.float64] = np.maximum.accumulate(equity)
+    drawdown: NDArray[np.float64] = np.divide(
+        peak - equity, peak, out=np.zeros(len(peak)), where=peak > 0
+    )
+
+    traded: float = float(np.sum(np.abs(quantity * price)))
+    mean_equity: float = float(equity.mean())
+
+    return {
+        "final_equity": float(equity[-1]),
+        "total_pl": total,
+        "realized_pl": realized,
+        "unrealized_pl": total - realized,
+        "market_value": final_position * last_close,
+        "total_return": total / initial_capital if initial_capital != 0 else 0.0,
+        "max_drawdown": float(drawdown.max()),
+        "sharpe": mean / std * annualize if std > 0 else 0.0,
+        "sortino": mean / downside * annualize if downside > 0 else 0.0,
+        "exposure": float(np.mean(curve["position"] != 0)),
+        "turnover": traded / mean_equity if mean_equity != 0 else 0.0,
+        "num_fills": float(len(quantity)),
+    }
+
+def _fills(orders: list[Order] | OrderBatch, sf: Stockframe
+) -> tuple[NDArray[np.intp], NDArray[np.float64], NDArray[np.float64]]:
+    """ Candle index, signed quantity and price of every filled order of the stockframe's ticker """
+    timestamps: NDArray[np.int64]
+    quantity: NDArray[np.float64]
+    price: NDArray[np.float64]
+    if isinstance(orders, OrderBatch):
+        filled: NDArray[np.bool_] = (
+            (orders.statuses == OrderBatch._STATUSES.index(OrderStatus.FILLED)) &
+            (orders.symbol_codes == (
+                orders.symbols.index(sf.ticker) if sf.ticker in orders.symbols else -1
+            ))
+        )
+        timestamps = orders.timestamps[filled]
+        quantity = orders.quantity[filled]
+        price = orders.purchase_price[filled]
+    else:
+        fills: list[Order] = [
+            o for o in orders if o.status == OrderStatus.FILLED and o.symbol == sf.ticker
+        ]
+        timestamps = candles.datetimes_to_timestamps([ o.purchase_dt for o in fills ])
+        quantity = np.array([ o.quantity for o in fills ], dtype=np.float64)
+        price = np.array([ o.purchase_price for o in fills ], dtype=np.float64)
+
+    index: NDArray[np.intp] = np.searchsorted(sf.timestamps, timestamps, side="right") - 1
+    early: int = int(np.count_nonzero(index < 0))
+    if early > 0:
+        raise ValueError(
+            f"{early} filled order(s) of {sf.ticker} are dated before the first candle of the stockframe"
+        )
+    return index, quantity, price
+
+def _realized_pl(quantity: NDArray[np.float64], price: NDArray[np.float64]) -> float:
+    pl, _ = _closed_trades(quantity, price)
+    return float(pl.sum())
+
+def _closed_trades(quantity: NDArray[np.float64], price: NDArray[np.float64]
+) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    """ Realized P/L and cost basis of every fill that reduced, closed or flipped a position """
+    # NOTE: the average cost depends on every fill before it, so this walks the fills
+    # (not the candles) one by one
+    pls: list[float] = []
+    costs: list[float] = []
+    position: float = 0.0
+    avg_cost: float = 0.0
+    for qty, px in zip(quantity.tolist(), price.tolist()):
+        if qty == 0.0:
+            continue
+        if position == 0.0 or (position > 0.0) == (qty > 0.0):
+            # Opening or adding to a position
+            new_position: float = position + qty
+            avg_cost = (avg_cost * position + px * qty) / new_position
+            position = new_position
+            continue
+
+        # Reducing, closing or flipping a position
+        closed: float = min(abs(qty), abs(position))
+        direction: float = 1.0 if position > 0.0 else -1.0
+        pls.append(closed * (px - avg_cost) * direction)
+        costs.append(closed * avg_cost)
+        position += qty
+        if abs(position) < 1e-12:
+            position = 0.0
+            avg_cost = 0.0
+        elif (position > 0.0) != (direction > 0.0):
+            # Flipped to the other side at the fill's price
+            avg_cost = px
+
+    return np.array(pls, dtype=np.float64), np.array(costs, dtype=np.float64)
@@ -0,0 +1,179 @@
+""" Monte Carlo and bootstrap robustness analysis
+
+Resamples the results of a finished run (the P/L of its trades or the returns of its
+equity) or the returns of the underlying candles into thousands of alternative paths, to
+tell how much of a result is luck:
+
+    pnl = montecarlo.trade_pnl(strategy.portfolio.orders, sf)
+    sim = montecarlo.simulate(pnl, num_paths=10_000, method="block", pnl=True, seed=42)
+    print(montecarlo.summarize(sim))
+
+Returns are compounded along a path, as they are relative to the equity they were made
+on. The P/L of trades isn't (a trade of a few shares makes the same dollars no matter
+how large the account is), so it's added to the equity instead.
+
+Paths are simulated in chunks of batched NumPy arrays, every chunk with its own random
+generator spawned from the seed, so the results don't depend on how the chunks are spread
+over processes. Chunks are sized by their number of steps (paths × horizon), so a long
+horizon (e.g. minute returns) means fewer paths per chunk rather than larger arrays.
+"""
+from multiprocessing import Pool
+from typing import Any
+
+import numpy as np
+from numpy.typing import NDArray
+
+from . import metrics
+from .portfolio import Order, OrderBatch
+from .stockframe import Stockframe
+
+
+METHODS: list[str] = ["iid", "block"]
+# Steps simulated at once (each costs about 32 bytes of arrays while its chunk runs)
+DEFAULT_CHUNK_SIZE: int = 1 << 20
+
+# Per worker process state (set up once by `_init_worker`)
+_returns: NDArray[np.float64] | None = None
+
+def trade_pnl(orders: list[Order] | OrderBatch, sf: Stockframe) -> NDArray[np.float64]:
+    """ Realized P/L (in dollars) of every trade that reduced or closed a position """
+    _, quantity, price = metrics._fills(orders, sf)
+    pl, _ = metrics._closed_trades(quantity, price)
+    return pl
+
+def equity_returns(orders: list[Order] | OrderBatch, sf: Stockframe,
+    initial_capital: float = 1000.0
+) -> NDArray[np.float64]:
+    """ Returns of the run's equity between the close of consecutive candles """
+    equity: NDArray[np.float64] = metrics.equity_curve(orders, sf, initial_capital)["equity"]
+    return _pct_change(equity)
+
+def price_returns(sf: Stockframe) -> NDArray[np.float64]:
+    """ Returns of the close between consecutive candles """
+    return _pct_change(sf.close)
+
+def simulate(returns: NDArray[np.float64], num_paths: int = 10_000, horizon: int | None = None,
+    method: str = "iid", block_size: int = 20, initial_capital: float = 1000.0,
+    ruin_threshold: float = 0.5, seed: int | None = None, processes: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE, pnl: bool = False
+) -> dict[str, NDArray]:
+    """ Resample the returns into `num_paths` equity paths of `horizon` steps each
+
+    With the "iid" method every step draws any of the returns, while the "block" method
+    draws runs of `block_size` consecutive returns (wrapping around at the end), which
+    keeps streaks and volatility clusters. A path is ruined once its equity falls to
+    `ruin_threshold` of the initial capital or below. With `pnl`, the values are dollar
+    P/L (e.g. from `trade_pnl`) added to the equity rather than returns compounded into it.
+
+    `chunk_size` is the number of steps (paths × horizon) simulated at once, though a
+    chunk always holds at least one path.
+
+    Returns the final equity, max drawdown and ruin flag of every path, along with the
+    initial capital.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}' (expected one of {METHODS})")
+    if num_paths < 1:
+        raise ValueError(f"There should be at least one path to simulate (got num_paths={num_paths})")
+    if horizon is not None and horizon < 1:
+        raise ValueError(f"Paths should be at least one step long (got horizon={horizon})")
+
+    returns = np.ascontiguousarray(returns, dtype=np.float64)
+    returns = returns[np.isfinite(returns)]
+    if len(returns) == 0:
+        raise ValueError("There are no returns to resample")
+    if horizon is None:
+        horizon = len(returns)
+
+    paths_per_chunk: int = max(1, chunk_size // horizon)
+    sizes: list[int] = [
+        min(paths_per_chunk, num_paths - i) for i in range(0, num_paths, paths_per_chunk)
+    ]
+    seeds: list[np.random.SeedSequence] = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks: list[tuple[Any, ...]] = [
+        (size, horizon, method, block_size, initial_capital, ruin_threshold, pnl, child)
+        for size, child in zip(sizes, seeds)
+    ]
+
+    chunks: list[dict[str, NDArray]]
+    if processes <= 1 or len(tasks) <= 1:
+        _init_worker(returns)
+        try:
+            chunks = [ _run_chunk(task) for task in tasks ]
+        finally:
+            # Don't keep the returns alive once done
+            _init_worker(None)
+    else:
+        with Pool(min(processes, len(tasks)), initializer=_init_worker, initargs=(returns,)) as pool:
+            chunks = pool.map(_run_chunk, tasks)
+
+    sim: dict[str, NDArray] = {
+        key: np.concatenate([ c[key] for c in chunks ]) for key in chunks[0].keys()
+    }
+    sim["initial_capital"] = np.array(initial_capital, dtype=np.float64)
+    return sim
+
+def summarize(sim: dict[str, NDArray]) -> dict[str, float]:
+    """ Percentiles of the final equity and max drawdown, along with the probabilities of
+    ending at a loss and of ruin """
+    initial_capital: float = float(sim["initial_capital"])
+    final: NDArray[np.float64] = sim["final_equity"]
+    drawdown: NDArray[np.float64] = sim["max_drawdown"]
+    summary: dict[str, float] = {}
+    for q in (5, 25, 50, 75, 95):
+        summary[f"final_equity_p{q}"] = float(np.percentile(final, q))
+    for q in (50, 95, 99):
+        summary[f"max_drawdown_p{q}"] = float(np.percentile(drawdown, q))
+    summary["mean_final_equity"] = float(final.mean())
+    summary["prob_loss"] = float(np.mean(final < initial_capital))
+    summary["risk_of_ruin"] = float(np.mean(sim["ruined"]))
+    return summary
+
+def _init_worker(returns: NDArray[np.float64] | None) -> None:
+    global _returns
+    _returns = returns
+
+def _run_chunk(task: tuple[Any, ...]) -> dict[str, NDArray]:
+    num_paths, horizon, method, block_size, initial_capital, ruin_threshold, pnl, seed = task
+    assert _returns is not None, "ERROR: worker was not initialized"
+    rng: np.random.Generator = np.random.default_rng(seed)
+    n: int = len(_returns)
+
+    index: NDArray[np.intp]
+    if method == "iid":
+        index = rng.integers(0, n, size=(num_paths, horizon))
+    else:
+        block_size = max(1, min(block_size, n))
+        num_blocks: int = -(-horizon // block_size)
+        starts: NDArray[np.intp] = rng.integers(0, n, size=(num_paths, num_blocks, 1))
+        index = ((starts + np.arange(block_size)) % n).reshape(num_paths, -1)[:, :horizon]
+
+    # Equity of every path after every step
+    equity: NDArray[np.float64] = np.take(_returns, index)
+    del index
+    if pnl:
+        np.cumsum(equity, axis=1, out=equity)
+        equity += initial_capital
+    else:
+        equity += 1.0
+        np.cumprod(equity, axis=1, out=equity)
+        equity *= initial_capital
+
+    final_equity: NDArray[np.float64] = equity[:, -1].copy()
+    ruined: NDArray[np.bool_] = equity.min(axis=1) <= initial_capital * ruin_threshold
+
+    # NOTE: computed in place, so a chunk never holds more than two arrays of its size
+    peak: NDArray[np.float64] = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, initial_capital, out=peak)
+    np.divide(equity, peak, out=equity)
+    max_drawdown: NDArray[np.float64] = 1.0 - equity.min(axis=1)
+
+    return {
+        "final_equity": final_equity,
+        "max_drawdown": np.maximum(max_drawdown, 0.0),
+        "ruined": ruined,
+    }
+
+def _pct_change(values: NDArray[np.float64]) -> NDArray[np.float64]:
+    prev: NDArray[np.float64] = values[:-1]
+    return np.divide(np.diff(values), prev, out=np.zeros(len(prev)), where=prev != 0)
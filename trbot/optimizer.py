@@ -0,0 +1,97 @@
+from itertools import product
+from multiprocessing import Pool
+from typing import Any
+import os
+
+import pandas as pd
+
+from . import indcache, metrics
+from .stockframe import Stockframe
+from .strategy import Strategy
+
+
+# Per worker process state (set up once by `_init_worker`)
+_strategy_cls: type[Strategy] | None = None
+_stockframes: dict[str, Stockframe] = {}
+
+# Metrics reported for every run of a sweep
+_METRICS: list[str] = ["total_return", "max_drawdown", "sharpe", "sortino", "exposure", "turnover"]
+
+def sweep(strategy_cls: type[Strategy], grid: dict[str, list[Any]], filepaths: list[str],
+    processes: int | None = None, rank_by: str = "total_return", indicator_cache_dir: str | None = None
+) -> pd.DataFrame:
+    """ Backtest every combination of the parameter grid on every dataset and rank the results
+
+    The runs are spread over a pool of `processes` workers (all cores by default), and each
+    worker loads a dataset at most once no matter how many runs use it. `strategy_cls` has
+    to be importable (i.e. defined at the top level of a module) for the workers to use it.
+    With `indicator_cache_dir`, indicators are shared through an `IndicatorCache` there
+    (across the workers, and across sweeps).
+
+    The final value and every metric are derived from the filled orders (see `metrics`),
+    so the runs are ranked by their actual equity rather than by the broker's capital.
+    """
+    keys: list[str] = list(grid.keys())
+    combos: list[dict[str, Any]] = [
+        dict(zip(keys, values)) for values in product(*(grid[k] for k in keys))
+    ]
+    tasks: list[tuple[str, dict[str, Any]]] = [
+        (filepath, params) for filepath in filepaths for params in combos
+    ]
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    results: list[dict[str, Any]]
+    if processes <= 1:
+        prev_cache: indcache.IndicatorCache | None = indcache.get_cache()
+        _init_worker(strategy_cls, indicator_cache_dir)
+        try:
+            results = [ _run_task(task) for task in tasks ]
+        finally:
+            indcache.set_cache(prev_cache)
+    else:
+        # Large chunks keep the inter-process overhead low, while still leaving
+        # enough chunks to balance the load between the workers
+        chunksize: int = max(1, len(tasks) // (processes * 8))
+        with Pool(processes, initializer=_init_worker, initargs=(strategy_cls, indicator_cache_dir)) as pool:
+            results = list(pool.imap_unordered(_run_task, tasks, chunksize=chunksize))
+
+    df = pd.DataFrame(results)
+    if len(df) == 0:
+        return df
+    return df.sort_values(rank_by, ascending=False, ignore_index=True)
+
+def load_stockframe(filepath: str) -> Stockframe:
+    """ Load a dataset written either as a CSV or as a candle store """
+    if filepath.endswith(".bin"):
+        return Stockframe.from_store(filepath)
+    return Stockframe.from_csv(filepath)
+
+def _init_worker(strategy_cls: type[Strategy], indicator_cache_dir: str | None = None) -> None:
+    global _strategy_cls
+    _strategy_cls = strategy_cls
+    _stockframes.clear()
+    if indicator_cache_dir is not None:
+        indcache.set_cache(indcache.IndicatorCache(indicator_cache_dir))
+
+def _run_task(task: tuple[str, dict[str, Any]]) -> dict[str, Any]:
+    filepath, params = task
+    sf: Stockframe | None = _stockframes.get(filepath)
+    if sf is None:
+        sf = load_stockframe(filepath)
+        _stockframes[filepath] = sf
+
+    assert _strategy_cls is not None, "ERROR: worker was not initialized"
+    strat: Strategy = _strategy_cls(sf, **params)
+    strat.run(fast_forward=True, verbose=False)
+
+    pft = strat.portfolio
+    perf: dict[str, float] = metrics.compute(pft.orders, sf, pft.initial_capital)
+    return {
+        "ticker": sf.ticker,
+        **params,
+        "final_value": perf.get("final_equity", pft.initial_capital),
+        "orders": len(pft.orders),
+        **{ k: perf.get(k, 0.0) for k in _METRICS },
+    }
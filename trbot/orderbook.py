@@ -0,0 +1,218 @@
+""" Pending orders (limit, stop, take-profit and stop-loss)
+
+Working orders are kept per symbol in two books sorted by trigger price:
+    falling    triggered once the low reaches down to their price (buy limits, sell stops)
+    rising     triggered once the high reaches up to their price (sell limits, buy stops)
+so the orders triggered by a candle are a contiguous run at one end of each book, found
+with a binary search. Matching a candle costs O(log n + k) for k triggered orders, no
+matter how many other orders are resting. Expiries are kept in a heap ordered by time.
+"""
+from bisect import bisect_left, bisect_right, insort
+import heapq, itertools
+
+from . import broker
+from .portfolio import Order, OrderStatus, OrderType, Portfolio
+
+
+# Sort key of an order within a book: (trigger price, order id)
+_BookKey = tuple[float, int]
+
+class _SymbolBooks:
+    __slots__ = ("falling", "rising")
+
+    def __init__(self) -> None:
+        self.falling: list[_BookKey] = []
+        self.rising: list[_BookKey] = []
+
+
+class OrderBook:
+    def __init__(self) -> None:
+        self._books: dict[str, _SymbolBooks] = {}
+        self._orders: dict[int, Order] = {}
+        # Book each working order rests in, along with its key in there
+        self._locations: dict[int, tuple[list[_BookKey], _BookKey]] = {}
+        self._expiries: list[tuple[int, int]] = []
+        self._oco_groups: dict[int, list[int]] = {}
+        self._oco_of: dict[int, int] = {}
+        self._ids = itertools.count(1)
+
+    def __len__(self) -> int:
+        """ Number of working orders """
+        return len(self._orders)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._orders
+
+    def get(self, order_id: int) -> Order | None:
+        return self._orders.get(order_id)
+
+    def working(self, symbol: str | None = None) -> list[Order]:
+        return [ o for o in self._orders.values() if symbol is None or o.symbol == symbol ]
+
+    def submit(self, order: Order, expires_at: int | None = None) -> int:
+        """ Rest an order in the book until it's triggered, cancelled or expired
+
+        `expires_at` (unix ms) is the time from which the order can't be triggered anymore.
+        Returns the id of the order.
+        """
+        if order.type == OrderType.MARKET:
+            raise ValueError("Market orders aren't pending orders, execute them with the broker")
+
+        price: float = _trigger_price(order)
+        order_id: int = next(self._ids)
+        order.status = OrderStatus.WORKING
+
+        books: _SymbolBooks | None = self._books.get(order.symbol)
+        if books is None:
+            books = _SymbolBooks()
+            self._books[order.symbol] = books
+
+        book: list[_BookKey] = books.falling if _is_falling(order) else books.rising
+        key: _BookKey = (price, order_id)
+        insort(book, key)
+        self._orders[order_id] = order
+        self._locations[order_id] = (book, key)
+        if expires_at is not None:
+            heapq.heappush(self._expiries, (expires_at, order_id))
+        return order_id
+
+    def submit_oco(self, orders: list[Order], expires_at: int | None = None) -> list[int]:
+        """ Submit orders that cancel each other: once one of them fills, the others are cancelled
+        (e.g. the take-profit and stop-loss of a bracket) """
+        ids: list[int] = [ self.submit(order, expires_at) for order in orders ]
+        group: int = ids[0]
+        # NOTE: a copy, as the group shrinks while its orders leave the book
+        self._oco_groups[group] = list(ids)
+        for order_id in ids:
+            self._oco_of[order_id] = group
+        return ids
+
+    def cancel(self, order_id: int) -> bool:
+        """ Cancel a working order (returns False if it isn't working anymore) """
+        order: Order | None = self._remove(order_id)
+        if order is None:
+            return False
+        order.status = OrderStatus.CANCELLED
+        self._leave_group(order_id)
+        return True
+
+    def expire(self, timestamp: int) -> list[Order]:
+        """ Expire the working orders whose expiry is at or before the given time """
+        expired: list[Order] = []
+        while len(self._expiries) > 0 and self._expiries[0][0] <= timestamp:
+            _, order_id = heapq.heappop(self._expiries)
+            # NOTE: entries of orders that already left the book are just skipped
+            order: Order | None = self._remove(order_id)
+            if order is not None:
+                order.status = OrderStatus.EXPIRED
+                self._leave_group(order_id)
+                expired.append(order)
+        return expired
+
+    def on_candle(self, symbol: str, timestamp: int, dt_str: str, open_: float, high: float,
+        low: float, portfolio: Portfolio
+    ) -> list[Order]:
+        """ Execute the orders of the symbol triggered by a candle
+
+        Expired orders are dropped first. Triggered orders are filled at their price (or at
+        the open, if the candle gapped through it) in the order they were submitted, and
+        their OCO siblings get cancelled. Returns every order that left the book.
+
+        A candle can't tell which of several triggered legs of an OCO group the price
+        reached first, so the stop legs are filled first (the worst case, e.g. the
+        stop-loss rather than the take-profit of a bracket).
+        """
+        done: list[Order] = self.expire(timestamp)
+        books: _SymbolBooks | None = self._books.get(symbol)
+        if books is None or len(self._orders) == 0:
+            return done
+
+        # Triggered runs: the top of the falling book and the bottom of the rising book
+        start: int = bisect_left(books.falling, (low, 0))
+        end: int = bisect_right(books.rising, (high, float("inf")))
+        triggered: list[_BookKey] = books.falling[start:] + books.rising[:end]
+        if len(triggered) == 0:
+            return done
+        triggered.sort(key=lambda key: key[1])
+        if len(triggered) > 1:
+            # Legs of a same OCO group are moved to where the group's first triggered leg
+            # is, stops first
+            firsts: dict[int, int] = {}
+            for _, order_id in triggered:
+                oco_group: int | None = self._oco_of.get(order_id)
+                if oco_group is not None:
+                    firsts.setdefault(oco_group, order_id)
+            triggered.sort(key=lambda key: (
+                firsts.get(self._oco_of.get(key[1], -1), key[1]),
+                not _is_stop(self._orders[key[1]]),
+                key[1]
+            ))
+
+        for _, order_id in triggered:
+            order: Order | None = self._remove(order_id)
+            if order is None:
+                # Cancelled by the fill of an OCO sibling on this same candle
+                continue
+
+            price: float = _trigger_price(order)
+            if _is_falling(order):
+                order.purchase_price = min(open_, price)
+            else:
+                order.purchase_price = max(open_, price)
+            order.purchase_dt = dt_str
+            broker.execute_order(order, portfolio)
+            done.append(order)
+
+            group: int | None = self._oco_of.get(order_id)
+            siblings: list[int] = self._leave_group(order_id)
+            if order.status == OrderStatus.FILLED and group is not None:
+                # The whole group is done with
+                self._oco_groups.pop(group, None)
+                for sibling_id in siblings:
+                    self._oco_of.pop(sibling_id, None)
+                    sibling: Order | None = self._remove(sibling_id)
+                    if sibling is not None:
+                        sibling.status = OrderStatus.CANCELLED
+                        done.append(sibling)
+
+        return done
+
+    def _remove(self, order_id: int) -> Order | None:
+        order: Order | None = self._orders.pop(order_id, None)
+        if order is None:
+            return None
+
+        book, key = self._locations.pop(order_id)
+        i: int = bisect_left(book, key)
+        del book[i]
+        return order
+
+    def _leave_group(self, order_id: int) -> list[int]:
+        """ Take an order out of its OCO group (returns the other orders left in the group) """
+        group: int | None = self._oco_of.pop(order_id, None)
+        if group is None:
+            return []
+        ids: list[int] = self._oco_groups[group]
+        ids.remove(order_id)
+        if len(ids) == 0:
+            del self._oco_groups[group]
+        return list(ids)
+
+
+def _trigger_price(order: Order) -> float:
+    price: float | None = (
+        order.limit_price if order.type in (OrderType.LIMIT, OrderType.TAKE_PROFIT)
+        else order.stop_price
+    )
+    if price is None:
+        raise ValueError(f"Missing the trigger price of a {order.type.value} order")
+    return price
+
+def _is_stop(order: Order) -> bool:
+    return order.type in (OrderType.STOP, OrderType.STOP_LOSS)
+
+def _is_falling(order: Order) -> bool:
+    """ Whether the order gets triggered by the price falling to it (rather than rising) """
+    is_limit: bool = order.type in (OrderType.LIMIT, OrderType.TAKE_PROFIT)
+    is_buy: bool = order.quantity > 0.0
+    return is_limit == is_buy
@@ -1,8 +1,22 @@
 from enum import Enum
-import json, os
+from typing import TYPE_CHECKING
+import json, logging, os, threading
+
+import numpy as np
+from numpy.typing import NDArray
+
+from . import candles
+
+if TYPE_CHECKING:
+    from .journal import PortfolioJournal
+
+
+logger: logging.Logger = logging.getLogger(__name__)
 
 
 class Position:
+    __slots__ = ("quantity", "price")
+
     def __init__(self, quantity: float, price: float) -> None:
         self.quantity: float = quantity
         self.price: float = price
@@ -20,6 +34,10 @@ class Position:
 
 class OrderType(Enum):
     MARKET = "market"
+    LIMIT = "limit"
+    STOP = "stop"
+    TAKE_PROFIT = "take_profit"
+    STOP_LOSS = "stop_loss"
 
 class OrderStatus(Enum):
     CANCELLED = "cancelled"
@@ -29,8 +47,11 @@ class OrderStatus(Enum):
 
 
 class Order:
+    __slots__ = ("symbol", "type", "status", "quantity", "purchase_price", "purchase_dt",
+                 "limit_price", "stop_price")
+
     def __init__(self, symbol: str, order_type: OrderType, quantity: float, purchase_price: float,
-        purchase_dt: str
+        purchase_dt: str, limit_price: float | None = None, stop_price: float | None = None
     ):
         self.symbol: str = symbol
         self.type: OrderType = order_type
@@ -38,6 +59,10 @@ class Order:
         self.quantity: float = quantity
         self.purchase_price: float = purchase_price
         self.purchase_dt: str = purchase_dt
+        # Price of limit and take-profit orders
+        self.limit_price: float | None = limit_price
+        # Price of stop and stop-loss orders
+        self.stop_price: float | None = stop_price
 
     def __repr__(self) -> str:
         return (
@@ -48,7 +73,9 @@ class Order:
             f"    quantity: {self.quantity}\n"
             f"    purchase_price: {self.purchase_price}\n"
             f"    purchase_dt: {self.purchase_dt}\n"
-            f"}}"
+            + (f"    limit_price: {self.limit_price}\n" if self.limit_price is not None else "")
+            + (f"    stop_price: {self.stop_price}\n" if self.stop_price is not None else "")
+            + f"}}"
         )
 
     def value(self) -> float:
@@ -58,7 +85,7 @@ class Order:
         return abs(self.value())
 
     def to_dict(self) -> dict:
-        return {
+        d: dict = {
             "symbol": self.symbol,
             "type": self.type.value,
             "status": self.status.value,
@@ -66,13 +93,146 @@ class Order:
             "purchase_price": f"{self.purchase_price:.2f}",
             "purchase_dt": self.purchase_dt,
         }
+        if self.limit_price is not None:
+            d["limit_price"] = f"{self.limit_price:.2f}"
+        if self.stop_price is not None:
+            d["stop_price"] = f"{self.stop_price:.2f}"
+        return d
+
+
+class OrderBatch:
+    """ Many orders stored as typed columns instead of one object per order
+
+    Symbols, types and statuses are stored as small integer codes, the order dates as
+    unix timestamps (ms) and missing limit/stop prices as NaN. Indexing a batch still gives
+    back `Order` records (copies, as the batch doesn't keep the objects around).
+
+    NOTE: the dates are only parsed into timestamps (all at once) when `timestamps` is
+    read, so appending an order stays cheap.
+    """
+    _TYPES: list[OrderType] = list(OrderType)
+    _STATUSES: list[OrderStatus] = list(OrderStatus)
+
+    def __init__(self, capacity: int = 64) -> None:
+        capacity = max(1, capacity)
+        self._size: int = 0
+        self._symbols: list[str] = []
+        self._symbol_codes: dict[str, int] = {}
+        self._symbol: NDArray[np.int32] = np.empty(capacity, dtype=np.int32)
+        self._type: NDArray[np.uint8] = np.empty(capacity, dtype=np.uint8)
+        self._status: NDArray[np.uint8] = np.empty(capacity, dtype=np.uint8)
+        self._quantity: NDArray[np.float64] = np.empty(capacity, dtype=np.float64)
+        self._price: NDArray[np.float64] = np.empty(capacity, dtype=np.float64)
+        self._timestamp: NDArray[np.int64] = np.empty(capacity, dtype=np.int64)
+        self._dts: list[str] = []
+        # Number of dates parsed into `_timestamp` so far
+        self._num_parsed: int = 0
+        self._limit: NDArray[np.float64] = np.empty(capacity, dtype=np.float64)
+        self._stop: NDArray[np.float64] = np.empty(capacity, dtype=np.float64)
+
+    @classmethod
+    def from_orders(cls, orders: list[Order]) -> 'OrderBatch':
+        batch = cls(capacity=len(orders))
+        for order in orders:
+            batch.append(order)
+        return batch
+
+    def append(self, order: Order) -> None:
+        if self._size == len(self._symbol):
+            self._grow()
+
+        code: int | None = self._symbol_codes.get(order.symbol)
+        if code is None:
+            code = len(self._symbols)
+            self._symbols.append(order.symbol)
+            self._symbol_codes[order.symbol] = code
+
+        i: int = self._size
+        self._symbol[i] = code
+        self._type[i] = OrderBatch._TYPES.index(order.type)
+        self._status[i] = OrderBatch._STATUSES.index(order.status)
+        self._quantity[i] = order.quantity
+        self._price[i] = order.purchase_price
+        self._dts.append(order.purchase_dt)
+        self._limit[i] = np.nan if order.limit_price is None else order.limit_price
+        self._stop[i] = np.nan if order.stop_price is None else order.stop_price
+        self._size += 1
+
+    def _grow(self) -> None:
+        capacity: int = len(self._symbol) * 2
+        for name in ("_symbol", "_type", "_status", "_quantity", "_price", "_timestamp",
+                     "_limit", "_stop"):
+            old: NDArray = getattr(self, name)
+            new: NDArray = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    @property
+    def symbols(self) -> list[str]:
+        """ Symbol of every code in `symbol_codes` """
+        return self._symbols
+
+    @property
+    def symbol_codes(self) -> NDArray[np.int32]:
+        return self._symbol[:self._size]
+
+    @property
+    def statuses(self) -> NDArray[np.uint8]:
+        """ Index of every order's status within `OrderStatus` """
+        return self._status[:self._size]
+
+    @property
+    def quantity(self) -> NDArray[np.float64]:
+        return self._quantity[:self._size]
+
+    @property
+    def purchase_price(self) -> NDArray[np.float64]:
+        return self._price[:self._size]
+
+    @property
+    def timestamps(self) -> NDArray[np.int64]:
+        if self._num_parsed < self._size:
+            self._timestamp[self._num_parsed:self._size] = candles.datetimes_to_timestamps(
+                self._dts[self._num_parsed:self._size]
+            )
+            self._num_parsed = self._size
+        return self._timestamp[:self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, i: int) -> Order:
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("order index out of range")
+
+        order = Order(
+            symbol=self._symbols[self._symbol[i]],
+            order_type=OrderBatch._TYPES[self._type[i]],
+            quantity=float(self._quantity[i]),
+            purchase_price=float(self._price[i]),
+            purchase_dt=self._dts[i],
+            limit_price=None if np.isnan(self._limit[i]) else float(self._limit[i]),
+            stop_price=None if np.isnan(self._stop[i]) else float(self._stop[i])
+        )
+        order.status = OrderBatch._STATUSES[self._status[i]]
+        return order
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self[i]
 
 
 class Portfolio:
     def __init__(self, initial_capital: float = 1000.0) -> None:
+        self._initial_capital: float = initial_capital
         self._capital: float = initial_capital
         self._positions: dict[str, Position] = {}
         self._orders: list[Order] = []
+        self._journal: 'PortfolioJournal | None' = None
+        # Held while an order gets applied (e.g. by the concurrent executions of a live runtime)
+        self._lock: threading.Lock = threading.Lock()
 
     @property
     def capital(self) -> float:
@@ -82,6 +242,10 @@ class Portfolio:
     def capital(self, value: float) -> None:
         self._capital = value
 
+    @property
+    def initial_capital(self) -> float:
+        return self._initial_capital
+
     @property
     def positions(self) -> dict[str, Position]:
         return self._positions
@@ -94,9 +258,36 @@ class Portfolio:
     def orders(self) -> list[Order]:
         return self._orders
 
+    def order_batch(self) -> OrderBatch:
+        """ Columnar copy of the orders (e.g. for `metrics`) """
+        return OrderBatch.from_orders(self._orders)
+
+    @property
+    def lock(self) -> threading.Lock:
+        return self._lock
+
+    @property
+    def journal(self) -> 'PortfolioJournal | None':
+        return self._journal
+
+    @journal.setter
+    def journal(self, value: 'PortfolioJournal | None') -> None:
+        self._journal = value
+
+    def market_value(self, prices: dict[str, float]) -> float:
+        """ Capital plus the value of every position at the given prices """
+        return self._capital + sum(
+            pst.quantity * prices.get(symbol, pst.price) for symbol, pst in self._positions.items()
+        )
+
     def add_order(self, order: Order) -> None:
         self._orders.append(order)
 
+    def order_executed(self, order: Order) -> None:
+        """ Called once an order has been applied to the portfolio """
+        if self._journal is not None:
+            self._journal.record(order, self)
+
     def __repr__(self) -> str:
         return json.dumps(Portfolio.to_dict(self), indent=4)
 
@@ -117,7 +308,7 @@ class Portfolio:
 
     def _init_from_json(self, filepath: str) -> None:
         if not os.path.exists(filepath):
-            print(f"[ERROR] Unable to find '{filepath}'")
+            logger.error("Unable to find '%s'", filepath)
             return
 
         with open(filepath, "r") as f:
@@ -127,7 +318,7 @@ class Portfolio:
             for k, v in root["positions"].items():
                 pos = Position(
                     quantity=float(v["quantity"]),
-                    price=float(v["purchase_price"]),
+                    price=float(v["price"]),
                 )
                 psts[k] = pos
 
@@ -0,0 +1,44 @@
+from abc import ABCMeta, abstractmethod
+
+import numpy as np
+
+from .stockframe import Stockframe
+
+
+class QuoteProvider(metaclass=ABCMeta):
+    @abstractmethod
+    def get_quote(self, symbol: str, timestamp: int) -> float:
+        """ Price of the symbol at the given time (unix ms) """
+        pass
+
+
+class StockframeQuoteProvider(QuoteProvider):
+    """ Answers quotes from already loaded candles, without any network access
+
+    The quote at a certain time is the open of the candle that time falls within or, if
+    it falls within a gap between candles, the close of the last candle that already ended.
+    Either way, no price from after that time is ever used. The candle is found with a
+    binary search over the stockframe's timestamps.
+    """
+
+    def __init__(self, stockframes: list[Stockframe] | None = None) -> None:
+        self._stockframes: dict[str, Stockframe] = {}
+        for sf in stockframes or []:
+            self.add(sf)
+
+    def add(self, sf: Stockframe) -> None:
+        self._stockframes[sf.ticker] = sf
+
+    def get_quote(self, symbol: str, timestamp: int) -> float:
+        sf: Stockframe | None = self._stockframes.get(symbol)
+        if sf is None:
+            raise KeyError(f"No candles were loaded for '{symbol}'")
+
+        ind: int = int(np.searchsorted(sf.timestamps, timestamp, side="right")) - 1
+        if ind < 0:
+            raise ValueError(f"No candles of '{symbol}' exist at or before {timestamp}")
+
+        duration_ms: int = sf.mult * sf.timespan.to_ms()
+        if timestamp < int(sf.timestamps[ind]) + duration_ms:
+            return float(sf.open[ind])
+        return float(sf.close[ind])
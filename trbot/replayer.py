@@ -1,7 +1,8 @@
-from datetime import datetime, timedelta
+from datetime import datetime
+
+import numpy as np
+from numpy.typing import NDArray
 
-from . import candles
-from .candles import Candle
 from .stockframe import Stockframe
 
 class CandleReplayer:
@@ -10,44 +11,85 @@ class CandleReplayer:
     DEFAULT_TIME_FACTOR: int = 7200
 
     def __init__(self, sf: Stockframe, time_factor: float = DEFAULT_TIME_FACTOR, start_ind: int = 0) -> None:
-        self._dates: list[str] = sf.df["Date"].to_list()
-        assert sf.size == len(self._dates)
-
+        self._timestamps: NDArray[np.int64] = sf.timestamps
         self.time_factor: float = time_factor
-        self._index: int = start_ind
-
-        start_dt_str: str = self._dates[self._index]
-        self._start_time: datetime = datetime.strptime(start_dt_str, "%Y-%m-%d %H:%M:%S")
-        self._time: datetime = self._start_time
 
+        self._index: int = 0
+        # Current time of the replay (unix ms)
+        self._time: int = 0
         self._is_ready: bool = True
+        self.seek_index(start_ind)
+        self._start_time: int = self._time
 
     @property
     def start_time(self) -> datetime:
-        return self._start_time
+        return datetime.fromtimestamp(self._start_time / 1000)
 
     @property
     def current_time(self) -> datetime:
+        return datetime.fromtimestamp(self._time / 1000)
+
+    @property
+    def current_timestamp(self) -> int:
         return self._time
 
+    @property
+    def index(self) -> int:
+        """ Index of the next candle to be made available """
+        return self._index
+
+    def extend(self, timestamps: NDArray[np.int64]) -> None:
+        """ Replay a longer series of timestamps, starting with the current ones (e.g. once
+        candles that came in live were appended to the stockframe) """
+        assert len(timestamps) >= len(self._timestamps), "ERROR: the timestamps can only be extended"
+        self._timestamps = timestamps
+
+    def seek_index(self, index: int) -> None:
+        """ Move the replay to the start of a certain candle, which becomes the next one available """
+        self._index = max(0, min(index, len(self._timestamps)))
+        if self._index < len(self._timestamps):
+            self._time = int(self._timestamps[self._index])
+        elif len(self._timestamps) > 0:
+            self._time = int(self._timestamps[-1])
+        self._is_ready = True
+
+    def seek_time(self, timestamp: int) -> int:
+        """ Move the replay to a certain time (unix ms)
+
+        The first candle at or after that time becomes the next one available.
+        Returns the index of that candle.
+        """
+        self._index = int(np.searchsorted(self._timestamps, timestamp, side="left"))
+        self._time = timestamp
+        self._is_ready = True
+        return self._index
+
     def update_time(self, dt_in_sec: float):
         """ Increment timer in seconds """
 
-        if self._index + 1 >= len(self._dates):
+        if self._index >= len(self._timestamps):
             # There are no more candles to make available
             self._is_ready = False
             return
 
-        dt_str: str = self._dates[self._index]
-        next_time: datetime = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-        if self._time >= next_time:
+        if self._time >= self._timestamps[self._index]:
             self._is_ready = True
 
-        self._time += timedelta(seconds=dt_in_sec * self.DEFAULT_TIME_FACTOR)
-        self._time = self._time.replace(second=0, microsecond=0)
+        self._time += int(dt_in_sec * self.time_factor * 1000)
+        self._time -= self._time % 60_000
+
+    def skip_to_next_candle(self) -> None:
+        """ Move the clock straight to the next candle instead of waiting for it """
+        if self._index >= len(self._timestamps):
+            # There are no more candles to make available
+            self._is_ready = False
+            return
+
+        self._time = int(self._timestamps[self._index])
+        self._is_ready = True
 
     def is_candle_available(self) -> bool:
-        if not self._is_ready or self._index >= len(self._dates):
+        if not self._is_ready or self._index >= len(self._timestamps):
             return False
 
         # Once this method is called, a candle is assumed to be consumed
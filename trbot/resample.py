@@ -0,0 +1,70 @@
+import numpy as np
+from numpy.typing import NDArray
+
+from . import candles
+from .candles import Timespan
+from .stockframe import Stockframe
+
+
+_MS_PER_DAY: int = Timespan.DAY.to_ms()
+
+def resample(sf: Stockframe, mult: int, timespan: Timespan,
+    session_start: str | None = None, session_end: str | None = None
+) -> Stockframe:
+    """ Build the candles of a higher timespan out of the candles of a lower one
+
+    Candles are grouped by local calendar day, so no candle of the result spans two
+    sessions. Intraday candles are aligned to the start of the session (midnight unless
+    `session_start` is given). With `session_start`/`session_end` ("HH:MM", local time),
+    candles outside of the session are left out.
+    """
+    src_ms: int = sf.mult * sf.timespan.to_ms()
+    dst_ms: int = mult * timespan.to_ms()
+    if dst_ms < src_ms or dst_ms % src_ms != 0:
+        raise ValueError(
+            f"Can't resample {sf.mult}{sf.timespan} candles into {mult}{timespan} candles"
+        )
+
+    timestamps: NDArray[np.int64] = sf.timestamps
+    local: NDArray[np.int64] = candles.timestamps_to_local_ms(timestamps)
+    day: NDArray[np.int64] = local // _MS_PER_DAY
+    time_of_day: NDArray[np.int64] = local - day * _MS_PER_DAY
+
+    open_at: int = _time_of_day_ms(session_start) if session_start is not None else 0
+    close_at: int = _time_of_day_ms(session_end) if session_end is not None else _MS_PER_DAY
+    in_session: NDArray[np.bool_] = (time_of_day >= open_at) & (time_of_day < close_at)
+
+    # Start (in local ms) of the bucket every candle belongs to
+    bucket: NDArray[np.int64]
+    if timespan == Timespan.DAY:
+        bucket = (day // mult) * mult * _MS_PER_DAY
+    else:
+        bucket = day * _MS_PER_DAY + open_at + ((time_of_day - open_at) // dst_ms) * dst_ms
+
+    if not np.all(in_session):
+        bucket = bucket[in_session]
+        idx: NDArray[np.intp] = np.flatnonzero(in_session)
+    else:
+        idx = np.arange(len(bucket))
+
+    if len(bucket) == 0:
+        return Stockframe.from_arrays(
+            sf.ticker, mult, timespan, np.empty(0, dtype=np.int64),
+            *(np.empty(0, dtype=np.float64) for _ in range(5))
+        )
+
+    starts: NDArray[np.intp] = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends: NDArray[np.intp] = np.r_[starts[1:], len(bucket)] - 1
+    return Stockframe.from_arrays(
+        sf.ticker, mult, timespan,
+        candles.local_ms_to_timestamps(bucket[starts]),
+        sf.open[idx[starts]],
+        np.maximum.reduceat(sf.high[idx], starts),
+        np.minimum.reduceat(sf.low[idx], starts),
+        sf.close[idx[ends]],
+        np.add.reduceat(sf.volume[idx], starts),
+    )
+
+def _time_of_day_ms(hh_mm: str) -> int:
+    hours, minutes = hh_mm.split(":")
+    return (int(hours) * 60 + int(minutes)) * 60 * 1000
@@ -0,0 +1,273 @@
+""" Asyncio live runtime
+
+The work of a live bot is split into tasks connected by bounded queues:
+    feed         puts every new candle on the candle queue
+    router       hands every candle over to the lane of its symbol
+and, in the lane of every symbol:
+    strategy     runs the strategies of the symbol and queues their market orders
+                 (pending orders rest in the strategy's order book right away)
+    execution    executes the orders in a worker thread (so a slow broker never blocks
+                 the event loop)
+Lanes only ever wait on their own executions, so a symbol with a slow broker (or many
+orders) doesn't hold up the evaluation of the others. A full queue makes its producer
+wait (backpressure), so a slow stage can't pile up an unbounded backlog: once a lane is
+`queue_size` candles behind, the router (and then the feed) waits for it.
+
+Every candle is pushed to the strategies of its symbol (see `Strategy.push_candle`): a
+candle the strategy's stockframe already holds has to be its next one, while newer
+candles get appended to it.
+
+The pending orders of a strategy are matched against a candle before the strategy sees
+it, after its orders of the previous candles were executed (same as in a backtest). The
+strategy stage waits for that, so an order book is never used by two threads at once.
+
+The executions of the lanes run concurrently, each one applied to the portfolio as a
+single step (see `broker.execute_order`), and are persisted by the journal of the
+portfolio (see `journal.PortfolioJournal`), one appended line per order.
+
+A `ReplayFeed` replays stored candles (e.g. `trout/aggs`) as if they came in live:
+
+    feed = ReplayFeed.from_dir("trout/aggs")
+    runtime = LiveRuntime([ MyStrategy(sf) for sf in feed.stockframes ], feed)
+    stats = asyncio.run(runtime.run())
+"""
+from abc import ABCMeta, abstractmethod
+import asyncio, glob, os, threading, time
+
+import numpy as np
+from numpy.typing import NDArray
+
+from . import tracing
+from .engine import PortfolioEngine, merge_timestamps
+from .optimizer import load_stockframe
+from .candles import Candle
+from .portfolio import Order, OrderType, Portfolio
+from .stockframe import Stockframe
+from .strategy import Strategy
+
+
+class CandleEvent:
+    __slots__ = ("symbol", "candle", "received_ns")
+
+    def __init__(self, symbol: str, candle: Candle, received_ns: int) -> None:
+        self.symbol: str = symbol
+        self.candle: Candle = candle
+        # When the candle came in (time.perf_counter_ns), to measure latencies from
+        self.received_ns: int = received_ns
+
+    @property
+    def timestamp(self) -> int:
+        return self.candle.timestamp
+
+
+class CandleFeed(metaclass=ABCMeta):
+    @abstractmethod
+    async def stream(self, queue: 'asyncio.Queue[CandleEvent | None]') -> None:
+        """ Put every new candle on the queue, in time order (returns once the feed ends) """
+        pass
+
+
+class ReplayFeed(CandleFeed):
+    """ Replays the candles of stockframes in time order, `interval_sec` apart """
+
+    def __init__(self, stockframes: list[Stockframe], interval_sec: float = 0.0) -> None:
+        self._stockframes: list[Stockframe] = stockframes
+        self._interval_sec: float = interval_sec
+
+    @classmethod
+    def from_dir(cls, dirpath: str, tickers: list[str] | None = None,
+        interval_sec: float = 0.0
+    ) -> 'ReplayFeed':
+        """ Replay the candle files (CSV or candle stores) of a directory """
+        stockframes: list[Stockframe] = []
+        for filepath in sorted(glob.glob(os.path.join(dirpath, "ohlcv-*"))):
+            if not filepath.endswith((".csv", ".bin")):
+                continue
+            sf: Stockframe = load_stockframe(filepath)
+            if tickers is None or sf.ticker in tickers:
+                stockframes.append(sf)
+        return cls(stockframes, interval_sec)
+
+    @property
+    def stockframes(self) -> list[Stockframe]:
+        return self._stockframes
+
+    async def stream(self, queue: 'asyncio.Queue[CandleEvent | None]') -> None:
+        series: list[NDArray[np.int64]] = [ sf.timestamps for sf in self._stockframes ]
+        positions: list[int] = [0] * len(series)
+        for owners in merge_timestamps(series, PortfolioEngine.DEFAULT_WINDOW_MS):
+            for i in owners.tolist():
+                sf: Stockframe = self._stockframes[i]
+                j: int = positions[i]
+                positions[i] += 1
+                candle = Candle(float(sf.open[j]), float(sf.high[j]), float(sf.low[j]),
+                    float(sf.close[j]), float(sf.volume[j]), int(series[i][j]))
+                if self._interval_sec > 0:
+                    await asyncio.sleep(self._interval_sec)
+                await queue.put(CandleEvent(sf.ticker, candle, time.perf_counter_ns()))
+
+
+class _Execution:
+    """ An order to execute or, with `matched` set, the pending orders of the current candle
+    to match """
+    __slots__ = ("strat", "order", "received_ns", "matched")
+
+    def __init__(self, strat: Strategy, order: Order | None, received_ns: int,
+        matched: 'asyncio.Future[None] | None' = None
+    ) -> None:
+        self.strat: Strategy = strat
+        self.order: Order | None = order
+        self.received_ns: int = received_ns
+        self.matched: asyncio.Future[None] | None = matched
+
+
+class _Lane:
+    """ The strategies of a symbol, along with the queues of their candles and orders """
+    __slots__ = ("strategies", "candles_q", "orders_q")
+
+    def __init__(self, queue_size: int) -> None:
+        self.strategies: list[Strategy] = []
+        self.candles_q: asyncio.Queue[CandleEvent | None] = asyncio.Queue(queue_size)
+        self.orders_q: asyncio.Queue[_Execution | None] = asyncio.Queue(queue_size)
+
+
+class LiveRuntime:
+    DEFAULT_QUEUE_SIZE: int = 1024
+
+    def __init__(self, strategies: list[Strategy], feed: CandleFeed,
+        portfolio: Portfolio | None = None, queue_size: int = DEFAULT_QUEUE_SIZE
+    ) -> None:
+        self._strategies: list[Strategy] = strategies
+        self._feed: CandleFeed = feed
+        self._portfolio: Portfolio = portfolio if portfolio is not None else Portfolio()
+        self._queue_size: int = queue_size
+        # Held while an order book is used (only ever by one thread at a time, see above)
+        self._book_locks: dict[Strategy, threading.Lock] = {}
+        for strat in strategies:
+            strat.portfolio = self._portfolio
+            self._book_locks[strat] = threading.Lock()
+
+        # Candle to order latencies (ns) of the executed orders
+        self._latencies: list[int] = []
+        self._num_candles: int = 0
+
+    @property
+    def portfolio(self) -> Portfolio:
+        return self._portfolio
+
+    async def run(self, verbose: bool = False) -> dict[str, float]:
+        """ Run until the feed ends and every queued order is executed
+
+        Returns the number of candles and orders along with the candle to order latency
+        percentiles (in ms).
+        """
+        for strat in self._strategies:
+            strat.begin(verbose)
+
+        lanes: dict[str, _Lane] = {}
+        for strat in self._strategies:
+            lane: _Lane = lanes.setdefault(strat.sf.ticker, _Lane(self._queue_size))
+            lane.strategies.append(strat)
+        candles_q: asyncio.Queue[CandleEvent | None] = asyncio.Queue(self._queue_size)
+
+        await asyncio.gather(
+            self._run_feed(candles_q),
+            self._run_router(candles_q, lanes),
+            *( self._run_strategies(lane) for lane in lanes.values() ),
+            *( self._run_execution(lane) for lane in lanes.values() ),
+        )
+        return self.stats()
+
+    def stats(self) -> dict[str, float]:
+        latencies: NDArray[np.float64] = np.array(self._latencies, dtype=np.float64) / 1e6
+        stats: dict[str, float] = {
+            "candles": float(self._num_candles),
+            "orders": float(len(latencies)),
+        }
+        for q in (50, 90, 99):
+            stats[f"p{q}_ms"] = float(np.percentile(latencies, q)) if len(latencies) > 0 else 0.0
+        stats["max_ms"] = float(latencies.max()) if len(latencies) > 0 else 0.0
+        return stats
+
+    async def _run_feed(self, candles_q: 'asyncio.Queue[CandleEvent | None]') -> None:
+        try:
+            await self._feed.stream(candles_q)
+        finally:
+            await candles_q.put(None)
+
+    async def _run_router(self, candles_q: 'asyncio.Queue[CandleEvent | None]',
+        lanes: dict[str, _Lane]
+    ) -> None:
+        try:
+            while True:
+                event: CandleEvent | None = await candles_q.get()
+                if event is None:
+                    break
+                self._num_candles += 1
+
+                lane: _Lane | None = lanes.get(event.symbol)
+                if lane is not None:
+                    await lane.candles_q.put(event)
+        finally:
+            for lane in lanes.values():
+                await lane.candles_q.put(None)
+
+    async def _run_strategies(self, lane: _Lane) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        try:
+            while True:
+                event: CandleEvent | None = await lane.candles_q.get()
+                if event is None:
+                    break
+
+                for strat in lane.strategies:
+                    strat.push_candle(event.candle)
+
+                    if len(strat.order_book) > 0:
+                        # Queued behind the strategy's earlier orders, as matching needs
+                        # the portfolio they leave behind
+                        matched: asyncio.Future[None] = loop.create_future()
+                        await lane.orders_q.put(_Execution(strat, None, event.received_ns, matched))
+                        await matched
+
+                    with self._book_locks[strat]:
+                        order: Order | None = strat.evaluate()
+                        if order is not None and order.type != OrderType.MARKET:
+                            # Rests in the order book, nothing to execute yet
+                            strat.place(order)
+                            order = None
+                    if order is not None:
+                        await lane.orders_q.put(_Execution(strat, order, event.received_ns))
+
+                # Let the other stages run between candles, even while the queues have
+                # room (which is when putting and getting never suspend)
+                await asyncio.sleep(0)
+        finally:
+            await lane.orders_q.put(None)
+
+    async def _run_execution(self, lane: _Lane) -> None:
+        while True:
+            item: _Execution | None = await lane.orders_q.get()
+            if item is None:
+                break
+
+            if item.matched is not None:
+                try:
+                    await asyncio.to_thread(_match_pending, item.strat, self._book_locks[item.strat])
+                    item.matched.set_result(None)
+                except Exception as e:
+                    # Raised by the strategy stage, which waits on it
+                    item.matched.set_exception(e)
+                continue
+
+            assert item.order is not None
+            await asyncio.to_thread(item.strat.place, item.order)
+            latency: int = time.perf_counter_ns() - item.received_ns
+            self._latencies.append(latency)
+            if tracing.ENABLED:
+                tracing.observe("runtime.candle_to_order", latency)
+
+
+def _match_pending(strat: Strategy, book_lock: threading.Lock) -> None:
+    with book_lock:
+        strat.match_pending()
@@ -2,49 +2,130 @@ import pandas as pd
 import numpy as np
 from numpy.typing import NDArray
 
-from . import candles
-from .candles import Candle, Timespan
+from . import candles, store
+from .candles import Candle, CandleBatch, Timespan
 
 
 class Stockframe:
-    def __init__(self, cnds: list[Candle], ticker: str, mult: int, timespan: Timespan) -> None:
-        data: list[list[str]] = []
-        for c in cnds:
-            data.append([
-                candles.timestamp_to_datetime(c.timestamp),
-                f"{c.open:.4f}",
-                f"{c.high:.4f}",
-                f"{c.low:.4f}",
-                f"{c.close:.4f}",
-                f"{c.volume:.4f}"
-            ])
-
-        self.df: pd.DataFrame = pd.DataFrame(
-            data,
-            columns=["Date", "Open", "High", "Low", "Close", "Volume"] # type: ignore
-        )
+    COLUMNS: list[str] = ["Date", "Open", "High", "Low", "Close", "Volume"]
+
+    def __init__(self, cnds: list[Candle] | CandleBatch, ticker: str, mult: int, timespan: Timespan) -> None:
+        batch: CandleBatch = cnds if isinstance(cnds, CandleBatch) else CandleBatch.from_candles(cnds)
+        self._set_columns(*batch.columns)
         self.ticker: str = ticker
         self.mult: int = mult
         self.timespan: Timespan = timespan
 
+    @classmethod
+    def from_arrays(cls, ticker: str, mult: int, timespan: Timespan, timestamps: NDArray[np.int64],
+        open_: NDArray[np.float64], high: NDArray[np.float64], low: NDArray[np.float64],
+        close: NDArray[np.float64], volume: NDArray[np.float64]
+    ) -> 'Stockframe':
+        """ Wrap already typed columns (no copy is made if they're contiguous and of the right type) """
+        sf = cls(cnds=[], ticker=ticker, mult=mult, timespan=timespan)
+        sf._set_columns(timestamps, open_, high, low, close, volume)
+        return sf
+
     @classmethod
     def from_csv(cls, filepath: str) -> 'Stockframe':
         info: dict = candles.candle_info_from_path(filepath)
 
-        sf = cls(cnds=[], ticker=info["ticker"], mult=info["mult"], timespan=info["timespan"])
-        sf.df = pd.read_csv(filepath)
-        return sf
+        df: pd.DataFrame = pd.read_csv(
+            filepath,
+            dtype={ col: np.float64 for col in cls.COLUMNS[1:] }
+        )
+        return cls.from_arrays(
+            info["ticker"], info["mult"], info["timespan"],
+            candles.datetimes_to_timestamps(df["Date"].to_numpy(dtype=str)),
+            df["Open"].to_numpy(),
+            df["High"].to_numpy(),
+            df["Low"].to_numpy(),
+            df["Close"].to_numpy(),
+            df["Volume"].to_numpy(),
+        )
 
     def save_to_csv(self, outdir: str):
         self.df.to_csv(
             candles.candles_outpath(outdir, self.ticker, self.mult, self.timespan),
-            index=False
+            index=False,
+            float_format="%.4f"
         )
 
+    @classmethod
+    def from_store(cls, filepath: str, start: str | None = None, end: str | None = None) -> 'Stockframe':
+        """ Memory map the candles between start and end (inclusive) from a candle store file """
+        info: dict = candles.candle_info_from_path(filepath)
+
+        start_unix: int | None = candles.datetime_to_timestamp(start) if start is not None else None
+        end_unix: int | None = candles.datetime_to_timestamp(end) if end is not None else None
+        return cls.from_arrays(
+            info["ticker"], info["mult"], info["timespan"],
+            *store.open_columns(filepath, start_unix, end_unix)
+        )
+
+    def save_to_store(self, outdir: str):
+        store.write(
+            candles.store_outpath(outdir, self.ticker, self.mult, self.timespan),
+            (self._timestamps, self._open, self._high, self._low, self._close, self._volume)
+        )
+
+    def _set_columns(self, timestamps: NDArray[np.int64], open_: NDArray[np.float64],
+        high: NDArray[np.float64], low: NDArray[np.float64], close: NDArray[np.float64],
+        volume: NDArray[np.float64]
+    ) -> None:
+        self._timestamps: NDArray[np.int64] = np.ascontiguousarray(timestamps, dtype=np.int64)
+        self._open: NDArray[np.float64] = np.ascontiguousarray(open_, dtype=np.float64)
+        self._high: NDArray[np.float64] = np.ascontiguousarray(high, dtype=np.float64)
+        self._low: NDArray[np.float64] = np.ascontiguousarray(low, dtype=np.float64)
+        self._close: NDArray[np.float64] = np.ascontiguousarray(close, dtype=np.float64)
+        self._volume: NDArray[np.float64] = np.ascontiguousarray(volume, dtype=np.float64)
+
+        size: int = len(self._timestamps)
+        assert all(
+            len(col) == size
+            for col in (self._open, self._high, self._low, self._close, self._volume)
+        ), "ERROR: all columns of a stockframe should have the same length"
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """ Render the candles as a dataframe (meant for exporting) """
+        return pd.DataFrame({
+            "Date": self.dates,
+            "Open": self._open,
+            "High": self._high,
+            "Low": self._low,
+            "Close": self._close,
+            "Volume": self._volume,
+        })
+
     @property
     def size(self) -> int:
-        return len(self.df)
+        return len(self._timestamps)
+
+    @property
+    def timestamps(self) -> NDArray[np.int64]:
+        return self._timestamps
+
+    @property
+    def dates(self) -> NDArray[np.str_]:
+        return candles.timestamps_to_datetimes(self._timestamps)
+
+    @property
+    def open(self) -> NDArray[np.float64]:
+        return self._open
+
+    @property
+    def high(self) -> NDArray[np.float64]:
+        return self._high
+
+    @property
+    def low(self) -> NDArray[np.float64]:
+        return self._low
 
     @property
     def close(self) -> NDArray[np.float64]:
-        return self.df["Close"].to_numpy()
+        return self._close
+
+    @property
+    def volume(self) -> NDArray[np.float64]:
+        return self._volume
@@ -0,0 +1,115 @@
+""" Memory-mapped binary candle store
+
+File layout (little-endian):
+    [header: 64 bytes][timestamps: int64 * N][open][high][low][close][volume]: float64 * N
+
+Every column is stored contiguously, so opening a file only maps it into memory and
+a timestamp range is found with a binary search over the (sorted) timestamp column.
+The pages of a mapped file are shared between every process that opens it.
+"""
+import os
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+MAGIC: bytes = b"TRBOHLCV"
+VERSION: int = 1
+HEADER_SIZE: int = 64
+NUM_COLUMNS: int = 6
+
+_HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("reserved", "<u4"),
+    ("count", "<u8"),
+    ("first_ts", "<i8"),
+    ("last_ts", "<i8"),
+    ("padding", "V24"),
+])
+assert _HEADER_DTYPE.itemsize == HEADER_SIZE
+
+# (timestamps, open, high, low, close, volume)
+Columns = tuple[NDArray[np.int64], NDArray[np.float64], NDArray[np.float64],
+                NDArray[np.float64], NDArray[np.float64], NDArray[np.float64]]
+
+
+def write(filepath: str, columns: Columns) -> None:
+    """ Write the columns to a store file (timestamps must already be sorted) """
+    timestamps: NDArray[np.int64] = np.asarray(columns[0], dtype="<i8")
+    count: int = len(timestamps)
+    if count > 1 and np.any(np.diff(timestamps) < 0):
+        raise ValueError("Timestamps of a candle store must be sorted")
+
+    header = np.zeros(1, dtype=_HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = VERSION
+    header["count"] = count
+    if count > 0:
+        header["first_ts"] = timestamps[0]
+        header["last_ts"] = timestamps[-1]
+
+    # Write to a temporary file first and swap it in, so processes that have the
+    # old file mapped keep a consistent view of it
+    tmp_filepath: str = f"{filepath}.tmp"
+    with open(tmp_filepath, "wb") as f:
+        f.write(header.tobytes())
+        f.write(timestamps.tobytes())
+        for col in columns[1:]:
+            f.write(np.asarray(col, dtype="<f8").tobytes())
+    os.replace(tmp_filepath, filepath)
+
+def open_columns(filepath: str, start: int | None = None, end: int | None = None) -> Columns:
+    """ Map a store file and return the columns of the candles in [start, end] (unix ms)
+
+    The returned arrays are read-only views of the mapped file, nothing is copied.
+    """
+    if os.path.getsize(filepath) <= HEADER_SIZE:
+        # Empty stores can't be memory mapped
+        header = np.fromfile(filepath, dtype=_HEADER_DTYPE, count=1)
+        _check_header(filepath, header)
+        return _empty_columns()
+
+    raw = np.memmap(filepath, dtype=np.uint8, mode="r")
+    header = raw[:HEADER_SIZE].view(_HEADER_DTYPE)
+    _check_header(filepath, header)
+
+    count: int = int(header["count"][0])
+    if len(raw) != HEADER_SIZE + NUM_COLUMNS * 8 * count:
+        raise ValueError(f"'{filepath}' is truncated or corrupted")
+
+    def column(i: int, dtype: str) -> NDArray:
+        offset: int = HEADER_SIZE + i * 8 * count
+        return raw[offset:offset + 8 * count].view(dtype)
+
+    timestamps: NDArray[np.int64] = column(0, "<i8")
+    lo: int = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+    hi: int = count if end is None else int(np.searchsorted(timestamps, end, side="right"))
+    hi = max(lo, hi)
+
+    return (
+        timestamps[lo:hi],
+        column(1, "<f8")[lo:hi],
+        column(2, "<f8")[lo:hi],
+        column(3, "<f8")[lo:hi],
+        column(4, "<f8")[lo:hi],
+        column(5, "<f8")[lo:hi],
+    )
+
+def time_range(filepath: str) -> tuple[int, int] | None:
+    """ First and last timestamps of a store file (read from its header only) """
+    header = np.fromfile(filepath, dtype=_HEADER_DTYPE, count=1)
+    _check_header(filepath, header)
+    if int(header["count"][0]) == 0:
+        return None
+    return int(header["first_ts"][0]), int(header["last_ts"][0])
+
+def _check_header(filepath: str, header: NDArray) -> None:
+    if len(header) != 1 or header["magic"][0] != MAGIC:
+        raise ValueError(f"'{filepath}' is not a candle store file")
+    if int(header["version"][0]) != VERSION:
+        raise ValueError(f"'{filepath}' has unsupported version {int(header['version'][0])}")
+
+def _empty_columns() -> Columns:
+    empty: NDArray[np.float64] = np.empty(0, dtype=np.float64)
+    return (np.empty(0, dtype=np.int64), empty, empty, empty, empty, empty)
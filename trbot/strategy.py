@@ -1,29 +1,90 @@
 from abc import ABCMeta, abstractmethod
-import time
+from typing import Any, Callable
+import logging, time
 
 import numpy as np
 from numpy.typing import NDArray
 import talib
 from talib._ta_lib import MA_Type
 
-from . import broker
-from .candles import Candle
+from . import broker, candles, indcache, indgraph, tracing
+from .candles import Candle, CandleBatch
+from .ingest import ColumnBuffer
 from .stockframe import Stockframe
+from .orderbook import OrderBook
 from .replayer import CandleReplayer
 from .portfolio import Portfolio, Order, OrderType
 
 
+logger: logging.Logger = logging.getLogger(__name__)
+
 IndValues = NDArray[np.float64]
 TripleIndValues = tuple[IndValues, IndValues, IndValues]
 
-class Strategy(metaclass=ABCMeta):
-    def __init__(self, sf: Stockframe):
+class BaseStrategy(metaclass=ABCMeta):
+    """ Parameters, portfolio and stockframe of a strategy, shared by the per-candle
+    `Strategy` and the vectorized `SignalStrategy` """
+
+    # Tunable parameters of the strategy along with their default values
+    PARAMS: dict[str, Any] = {}
+
+    def __init__(self, sf: Stockframe, **params: Any):
+        unknown: set[str] = set(params.keys()) - set(self.PARAMS.keys())
+        if len(unknown) > 0:
+            raise KeyError(f"Unknown parameters for {type(self).__name__}: {sorted(unknown)}")
+
+        self._params: dict[str, Any] = { **self.PARAMS, **params }
         self._portfolio: Portfolio = Portfolio()
-        self._indicators: dict[str, IndValues] = {}
+        # Values of the indicator graph nodes evaluated so far (by node key)
+        self._graph_memo: dict[indgraph.NodeKey, IndValues] = {}
         self._sf: Stockframe = sf
         self._start: int = 0
+
+    @property
+    def params(self) -> dict[str, Any]:
+        return self._params
+
+    @property
+    def portfolio(self) -> Portfolio:
+        return self._portfolio
+
+    @portfolio.setter
+    def portfolio(self, value: Portfolio) -> None:
+        self._portfolio = value
+
+    @property
+    def sf(self) -> Stockframe:
+        return self._sf
+
+    @property
+    def ticker(self) -> str:
+        return self._sf.ticker
+
+
+class Strategy(BaseStrategy):
+    def __init__(self, sf: Stockframe, **params: Any):
+        super().__init__(sf, **params)
+        self._indicators: dict[str, IndValues] = {}
+        # Key of the graph node behind every indicator (by name)
+        self._indicator_nodes: dict[str, indgraph.NodeKey] = {}
+        # How to compute every indicator again once candles get appended (see `push_candle`):
+        # the source column (None for other series), period and function of the TA_*
+        # indicators, and the graph nodes of the `add_indicators` ones
+        self._ta_specs: dict[str, tuple[str | None, int, Callable[..., IndValues]]] = {}
+        self._indicator_graph: dict[str, indgraph.Node] = {}
         self._repl: CandleReplayer = CandleReplayer(self._sf, start_ind=self._start)
         self._ind: int = self._start
+        self._book: OrderBook = OrderBook()
+        # Columns of the stockframe once candles get appended to it
+        self._buffer: ColumnBuffer | None = None
+        # Whether candles (debug) and orders (info) get logged, see `begin`
+        self._log_candles: bool = False
+        self._log_orders: bool = False
+
+    @property
+    def order_book(self) -> OrderBook:
+        """ Pending orders of the strategy (see `submit`) """
+        return self._book
 
     @property
     def last_close(self) -> float:
@@ -34,11 +95,22 @@ class Strategy(metaclass=ABCMeta):
 
     @property
     def curr_time_str(self) -> str:
+        """ Current time of the replay's clock (ahead of the candle in real time mode) """
         return self._repl.current_time.strftime("%Y-%m-%d %H:%M:%S")
 
+    @property
+    def candle_time_str(self) -> str:
+        """ Time of the current candle, which the orders of the strategy are dated at """
+        return candles.timestamp_to_datetime(int(self._sf.timestamps[self._ind-1]))
+
     def get_next_candle(self):
         self._ind += 1
 
+    def start_at(self, dt_str: str) -> None:
+        """ Start the replay from the first candle at or after a certain time """
+        self._start = self._repl.seek_time(candles.datetime_to_timestamp(dt_str))
+        self._ind = self._start
+
     @abstractmethod
     def setup(self) -> None:
         """ Called once """
@@ -49,9 +121,79 @@ class Strategy(metaclass=ABCMeta):
         """ Called on each candle """
         pass
 
-    def run(self) -> None:
+    def run(self, fast_forward: bool = False, verbose: bool = True) -> None:
+        """ Replay every candle of the stockframe through `on_candle`
+
+        In fast forward mode, the replayer's clock jumps from one candle to the next
+        instead of following the wall clock, so a backtest runs without any sleeping.
+        What gets logged follows the level of this module's logger (candles and indicator
+        values at DEBUG, orders at INFO); `verbose=False` silences the run regardless.
+        """
+        self.begin(verbose)
+
+        if fast_forward:
+            self._run_fast_forward()
+        else:
+            self._run_real_time()
+
+    # ============================ STEPPING ============================
+    # NOTE: for drivers of their own (e.g. `runtime.LiveRuntime`), which call `begin` once,
+    # and then for every candle: `push_candle`, `match_pending` (while the order book isn't
+    # empty), `evaluate` and `place`
+    def begin(self, verbose: bool = True) -> None:
+        """ Get ready to process candles (see `run` for `verbose`) """
+        # NOTE: the levels are checked once per run rather than once per candle
+        self._log_candles = verbose and logger.isEnabledFor(logging.DEBUG)
+        self._log_orders = verbose and logger.isEnabledFor(logging.INFO)
         self.setup()
 
+    def push_candle(self, candle: Candle) -> None:
+        """ Make a candle that just came in the current one
+
+        A candle already in the stockframe (e.g. replayed from a stored file) has to be the
+        next one of the stockframe. Newer candles are appended to the stockframe, and the
+        indicators are computed again over it. Raises a ValueError for any other candle.
+        """
+        if self._ind < self._sf.size:
+            expected: int = int(self._sf.timestamps[self._ind])
+            if candle.timestamp != expected:
+                raise ValueError(
+                    f"Got the {self._sf.ticker} candle of {candles.timestamp_to_datetime(candle.timestamp)} "
+                    f"while the next one is at {candles.timestamp_to_datetime(expected)}"
+                )
+        else:
+            self._append_candle(candle)
+
+        self._advance()
+        self.get_next_candle()
+
+    def match_pending(self) -> list[Order]:
+        """ Execute the pending orders triggered by the current candle (returns the orders
+        that left the book) """
+        return self._match_pending(self._ind - 1)
+
+    def evaluate(self) -> Order | None:
+        """ Order of the strategy for the current candle (if any), without placing it """
+        if not tracing.ENABLED:
+            return self.on_candle()
+
+        t0: int = time.perf_counter_ns()
+        order: Order | None = self.on_candle()
+        tracing.observe("strategy.on_candle", time.perf_counter_ns() - t0)
+        tracing.count("strategy.candles")
+        return order
+
+    def place(self, order: Order) -> None:
+        """ Execute a market order, or rest any other order in the order book """
+        if order.type != OrderType.MARKET:
+            self._book.submit(order)
+            return
+
+        broker.execute_order(order, self._portfolio)
+        if self._log_orders:
+            logger.info("%s", order)
+
+    def _run_real_time(self) -> None:
         t: float = time.time()
         dt: float = 0.0
         while self._ind < self._sf.size:
@@ -61,25 +203,110 @@ class Strategy(metaclass=ABCMeta):
             self._repl.update_time(dt)
 
             if self._repl.is_candle_available():
-                print(f"{self._repl.current_time} -> New Candle")
-                self.get_next_candle()
-                order: Order | None = self.on_candle()
-                if order is not None:
-                    broker.execute_order(order, self._portfolio)
-                    print(order)
-            else:
-                print(self._repl.current_time)
+                if self._log_candles:
+                    logger.debug("%s -> New Candle", self._repl.current_time)
+                self._process_candle()
+            elif self._log_candles:
+                logger.debug("%s", self._repl.current_time)
 
             time.sleep(1)
             t = current
 
+    def _run_fast_forward(self) -> None:
+        while self._ind < self._sf.size:
+            if not self._step():
+                break
+
+    def _step(self) -> bool:
+        """ Jump to the next candle and process it (returns False when there are none left) """
+        if not self._advance():
+            return False
+
+        self._process_candle()
+        return True
+
+    def _advance(self) -> bool:
+        """ Move the replayer's clock to the next candle (returns False when there are none left) """
+        traced: bool = tracing.ENABLED
+        if traced:
+            t0: int = time.perf_counter_ns()
+        self._repl.skip_to_next_candle()
+        available: bool = self._repl.is_candle_available()
+        if traced:
+            tracing.observe("replay.step", time.perf_counter_ns() - t0)
+        return available
+
+    def _process_candle(self) -> None:
+        self.get_next_candle()
+        if len(self._book) > 0:
+            self._match_pending(self._ind - 1)
+
+        order: Order | None = self.evaluate()
+        if order is None:
+            return
+
+        if not tracing.ENABLED:
+            self.place(order)
+            return
+
+        t0: int = time.perf_counter_ns()
+        self.place(order)
+        tracing.observe("broker.execute_order", time.perf_counter_ns() - t0)
+        tracing.count(f"broker.orders.{order.status.value}")
+
+    def _match_pending(self, i: int) -> list[Order]:
+        """ Execute the pending orders triggered by the i-th candle """
+        ts: int = int(self._sf.timestamps[i])
+        done: list[Order] = self._book.on_candle(
+            self._sf.ticker, ts, candles.timestamp_to_datetime(ts),
+            float(self._sf.open[i]), float(self._sf.high[i]), float(self._sf.low[i]),
+            self._portfolio
+        )
+        if self._log_orders:
+            for order in done:
+                logger.info("%s", order)
+        return done
+
+    def _append_candle(self, candle: Candle) -> None:
+        for key, (column, _, _) in self._ta_specs.items():
+            if column is None:
+                raise ValueError(
+                    f"The indicator '{key}' isn't computed over a column of the stockframe, "
+                    f"so it can't be extended to new candles"
+                )
+        if self._sf.size > 0 and candle.timestamp <= int(self._sf.timestamps[-1]):
+            raise ValueError(
+                f"Got the {self._sf.ticker} candle of {candles.timestamp_to_datetime(candle.timestamp)}, "
+                f"which isn't past the last one of the stockframe"
+            )
+
+        if self._buffer is None:
+            self._buffer = ColumnBuffer(capacity=self._sf.size + ColumnBuffer.DEFAULT_CHUNK)
+            self._buffer.append_batch(CandleBatch(
+                self._sf.timestamps, self._sf.open, self._sf.high, self._sf.low, self._sf.close,
+                self._sf.volume
+            ))
+        self._buffer.append_batch(CandleBatch.from_candles([candle]))
+        self._sf = self._buffer.to_stockframe(self._sf.ticker, self._sf.mult, self._sf.timespan)
+        self._repl.extend(self._sf.timestamps)
+
+        # NOTE: every indicator is computed again over the whole stockframe, which costs
+        # about as much as `setup` (and bypasses the indicator cache, as the series is new)
+        memo: dict[indgraph.NodeKey, IndValues] = {}
+        for key, (column, period, fn) in self._ta_specs.items():
+            values: IndValues = fn(getattr(self._sf, column), timeperiod=period)
+            self._indicators[key] = values
+            memo[self._indicator_nodes[key]] = values
+        self._indicators.update(indgraph.evaluate(self._indicator_graph, self._sf, memo))
+        self._graph_memo = memo
+
     def buy(self, size: int) -> Order:
         return Order(
             symbol=self._sf.ticker,
             order_type=OrderType.MARKET,
             quantity=float(size),
             purchase_price=self.last_close,
-            purchase_dt=self.curr_time_str
+            purchase_dt=self.candle_time_str
         )
 
     def sell(self, size: int) -> Order:
@@ -88,10 +315,51 @@ class Strategy(metaclass=ABCMeta):
             order_type=OrderType.MARKET,
             quantity=float(size) * -1.0,
             purchase_price=self.last_close,
-            purchase_dt=self.curr_time_str
+            purchase_dt=self.candle_time_str
+        )
+
+    # ========================= PENDING ORDERS =========================
+    # NOTE: quantities are signed here (positive to buy, negative to sell)
+    def limit(self, quantity: float, price: float) -> Order:
+        return self._pending(OrderType.LIMIT, quantity, limit_price=price)
+
+    def stop(self, quantity: float, price: float) -> Order:
+        return self._pending(OrderType.STOP, quantity, stop_price=price)
+
+    def take_profit(self, quantity: float, price: float) -> Order:
+        return self._pending(OrderType.TAKE_PROFIT, quantity, limit_price=price)
+
+    def stop_loss(self, quantity: float, price: float) -> Order:
+        return self._pending(OrderType.STOP_LOSS, quantity, stop_price=price)
+
+    def submit(self, order: Order, expires_at: str | None = None) -> int:
+        """ Rest a pending order until a later candle triggers it (or until it expires) """
+        return self._book.submit(order, _to_timestamp(expires_at))
+
+    def submit_oco(self, orders: list[Order], expires_at: str | None = None) -> list[int]:
+        """ Rest pending orders that cancel each other once one of them fills """
+        return self._book.submit_oco(orders, _to_timestamp(expires_at))
+
+    def cancel(self, order_id: int) -> bool:
+        return self._book.cancel(order_id)
+
+    def _pending(self, order_type: OrderType, quantity: float, limit_price: float | None = None,
+        stop_price: float | None = None
+    ) -> Order:
+        return Order(
+            symbol=self._sf.ticker,
+            order_type=order_type,
+            quantity=float(quantity),
+            purchase_price=self.last_close,
+            purchase_dt=self.candle_time_str,
+            limit_price=limit_price,
+            stop_price=stop_price
         )
 
     def ind_crossover(self, val1: str | float, val2: str | float) -> bool:
+        traced: bool = tracing.ENABLED
+        if traced:
+            t0: int = time.perf_counter_ns()
         s1: list[float] | IndValues = (
             [ val1, val1 ] if isinstance(val1, float)
             else self.series_slice(self._indicators[val1])  # type: ignore
@@ -100,45 +368,95 @@ class Strategy(metaclass=ABCMeta):
             [ val2, val2 ] if isinstance(val2, float)
             else self.series_slice(self._indicators[val2])  # type: ignore
         )
-        try:
-            print(f">> {s1[-4:]}")
-            print(f">> {s2[-4:]}")
-        except IndexError:
-            print(f">> {s1}")
-            print(f">> {s2}")
+        if self._log_candles:
+            logger.debug(">> %s", s1[-4:])
+            logger.debug(">> %s", s2[-4:])
 
+        crossed: bool
         try:
-            return _crossover(s1, s2)
+            crossed = _crossover(s1, s2)
         except ValueError as v_err:
-            print(f"[ERROR] {str(v_err)}")
-            return False
+            if self._log_candles:
+                logger.debug("%s", v_err)
+            crossed = False
+
+        if traced:
+            tracing.observe("strategy.ind_crossover", time.perf_counter_ns() - t0)
+        return crossed
 
     # =========================== INDICATORS ===========================
     def TA_SMA(self, data: IndValues, period: int = 30) -> str:
-        key: str = f"SMA_{period}"
-        if not key in self._indicators.keys():
-            values: IndValues = talib.SMA(data, timeperiod=period)
-            self._indicators[key] = values
-
-        return key
+        return self._add_indicator("SMA", data, period, talib.SMA)
 
     def TA_EMA(self, data: IndValues, period: int = 30) -> str:
-        key: str = f"EMA_{period}"
-        if not key in self._indicators.keys():
-            values: IndValues = talib.EMA(data, timeperiod=period)
-            self._indicators[key] = values
-
-        return key
+        return self._add_indicator("EMA", data, period, talib.EMA)
 
     def TA_RSI(self, data: IndValues, period: int = 14) -> str:
-        key: str = f"RSI_{period}"
+        return self._add_indicator("RSI", data, period, talib.RSI)
+
+    def add_indicators(self, **nodes: indgraph.Node) -> list[str]:
+        """ Evaluate indicator graph nodes over the stockframe, each under the given name
+
+        Nodes shared between the indicators (of this call or any previous one) are only
+        computed once. Returns the names, in order, e.g.
+
+            macd, signal, _ = indgraph.MACD(indgraph.Source("close"))
+            self.macd, self.signal = self.add_indicators(macd=macd, signal=signal)
+
+        A name can't be given to another indicator than the one it already names.
+        """
+        for name, node in nodes.items():
+            if name in self._indicators and self._indicator_nodes.get(name) != node.key:
+                raise KeyError(f"The indicator name '{name}' is already taken by another indicator")
+
+        values: dict[str, IndValues] = indgraph.evaluate(nodes, self._sf, self._graph_memo)
+        self._indicators.update(values)
+        self._indicator_graph.update(nodes)
+        for name, node in nodes.items():
+            self._indicator_nodes[name] = node.key
+        return list(values.keys())
+
+    def _add_indicator(self, name: str, data: IndValues, period: int,
+        fn: Callable[..., IndValues]
+    ) -> str:
+        key: str = f"{name}_{period}"
+        node_key: indgraph.NodeKey
+        if data is self._sf.close:
+            # Same key as the graph node of the indicator, so the values are shared with
+            # `add_indicators` (and between the strategies of a `MultiStrategyRunner`)
+            node_key = _TA_NODES[name](indgraph.Source("close"), period).key
+        else:
+            # Indicators of any other series (e.g. highs or volumes) get keys of their own
+            fp: str = indcache.fingerprint(data)
+            key = f"{key}_{fp[:8]}"
+            node_key = (name, period, fp)
+
         if not key in self._indicators.keys():
-            values: IndValues = talib.RSI(data, timeperiod=period)
+            values: IndValues | None = self._graph_memo.get(node_key)
+            if values is None:
+                values = indcache.compute(
+                    name, data, { "period": period }, lambda: fn(data, timeperiod=period)
+                )
+                self._graph_memo[node_key] = values
             self._indicators[key] = values
+            self._indicator_nodes[key] = node_key
+            column: str | None = next(
+                (c for c in indgraph.Source.COLUMNS if data is getattr(self._sf, c)), None
+            )
+            self._ta_specs[key] = (column, period, fn)
 
         return key
 
 
+_TA_NODES: dict[str, Callable[[indgraph.Node, int], indgraph.Node]] = {
+    "SMA": indgraph.SMA,
+    "EMA": indgraph.EMA,
+    "RSI": indgraph.RSI,
+}
+
+def _to_timestamp(dt_str: str | None) -> int | None:
+    return candles.datetime_to_timestamp(dt_str) if dt_str is not None else None
+
 def _crossover(val1: list[float] | IndValues, val2: list[float] | IndValues) -> bool:
     if len(val1) >= 2 and len(val2) >= 2:
         return val1[-2] < val2[-2] and val1[-1] > val2[-1]
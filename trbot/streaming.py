@@ -0,0 +1,207 @@
+""" Streaming indicators
+
+Each indicator keeps a small rolling state and is updated one value at a time in constant
+time, which makes them suitable for live feeds where the full history isn't known upfront.
+They produce the same values as their talib counterparts (NaN during the warm up period).
+"""
+from collections import deque
+import math
+
+
+_NAN: float = float("nan")
+
+def _is_zero(value: float) -> bool:
+    # Same tolerance talib uses for its zero checks
+    return -1e-14 < value < 1e-14
+
+
+class StreamingSMA:
+    def __init__(self, period: int = 30) -> None:
+        self._period: int = period
+        self._window: deque[float] = deque(maxlen=period)
+        self._total: float = 0.0
+        self._value: float = _NAN
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    @property
+    def is_ready(self) -> bool:
+        return len(self._window) == self._period
+
+    def update(self, value: float) -> float:
+        if len(self._window) == self._period:
+            self._total -= self._window[0]
+        self._window.append(value)
+        self._total += value
+
+        if len(self._window) == self._period:
+            self._value = self._total / self._period
+        return self._value
+
+
+class StreamingEMA:
+    def __init__(self, period: int = 30) -> None:
+        self._period: int = period
+        self._k: float = 2.0 / (period + 1)
+        # The first value of the EMA is the SMA of the first `period` values
+        self._seed: StreamingSMA = StreamingSMA(period)
+        self._value: float = _NAN
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    @property
+    def is_ready(self) -> bool:
+        return self._seed.is_ready
+
+    def update(self, value: float) -> float:
+        if self._seed.is_ready:
+            self._value = (value - self._value) * self._k + self._value
+        else:
+            self._value = self._seed.update(value)
+        return self._value
+
+
+class StreamingRSI:
+    def __init__(self, period: int = 14) -> None:
+        self._period: int = period
+        self._prev: float | None = None
+        self._count: int = 0
+        self._gain: float = 0.0
+        self._loss: float = 0.0
+        self._value: float = _NAN
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    @property
+    def is_ready(self) -> bool:
+        return self._count >= self._period
+
+    def update(self, value: float) -> float:
+        if self._prev is None:
+            self._prev = value
+            return self._value
+
+        diff: float = value - self._prev
+        self._prev = value
+        self._count += 1
+
+        if self._count < self._period:
+            # Accumulate the first `period` changes
+            if diff < 0:
+                self._loss -= diff
+            else:
+                self._gain += diff
+            return self._value
+
+        if self._count == self._period:
+            if diff < 0:
+                self._loss -= diff
+            else:
+                self._gain += diff
+            self._loss /= self._period
+            self._gain /= self._period
+        else:
+            # Wilder's smoothing
+            self._loss *= self._period - 1
+            self._gain *= self._period - 1
+            if diff < 0:
+                self._loss -= diff
+            else:
+                self._gain += diff
+            self._loss /= self._period
+            self._gain /= self._period
+
+        total: float = self._gain + self._loss
+        self._value = 0.0 if _is_zero(total) else 100.0 * (self._gain / total)
+        return self._value
+
+
+class StreamingMACD:
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> None:
+        if slow_period < fast_period:
+            fast_period, slow_period = slow_period, fast_period
+
+        # NOTE: like talib, both EMAs start on the same candle, so the fast EMA is seeded
+        # with the average of the `fast_period` values right before the slow EMA is ready
+        self._fast_period: int = fast_period
+        self._slow_period: int = slow_period
+        self._recent: deque[float] = deque(maxlen=fast_period)
+        self._fast: StreamingEMA = StreamingEMA(fast_period)
+        self._slow: StreamingEMA = StreamingEMA(slow_period)
+        self._signal: StreamingEMA = StreamingEMA(signal_period)
+        self._value: tuple[float, float, float] = (_NAN, _NAN, _NAN)
+
+    @property
+    def value(self) -> tuple[float, float, float]:
+        """ (macd, signal, histogram) """
+        return self._value
+
+    @property
+    def is_ready(self) -> bool:
+        return self._signal.is_ready
+
+    def update(self, value: float) -> tuple[float, float, float]:
+        slow: float = self._slow.update(value)
+        if not self._slow.is_ready:
+            self._recent.append(value)
+            return self._value
+
+        fast: float
+        if self._fast.is_ready:
+            fast = self._fast.update(value)
+        else:
+            self._recent.append(value)
+            for v in self._recent:
+                fast = self._fast.update(v)
+
+        macd: float = fast - slow
+        signal: float = self._signal.update(macd)
+        if self._signal.is_ready:
+            self._value = (macd, signal, macd - signal)
+        return self._value
+
+
+class StreamingBBANDS:
+    def __init__(self, period: int = 5, nbdevup: float = 2.0, nbdevdn: float = 2.0) -> None:
+        self._period: int = period
+        self._nbdevup: float = nbdevup
+        self._nbdevdn: float = nbdevdn
+        self._window: deque[float] = deque(maxlen=period)
+        self._total: float = 0.0
+        self._total_sq: float = 0.0
+        self._value: tuple[float, float, float] = (_NAN, _NAN, _NAN)
+
+    @property
+    def value(self) -> tuple[float, float, float]:
+        """ (upper, middle, lower) """
+        return self._value
+
+    @property
+    def is_ready(self) -> bool:
+        return len(self._window) == self._period
+
+    def update(self, value: float) -> tuple[float, float, float]:
+        if len(self._window) == self._period:
+            old: float = self._window[0]
+            self._total -= old
+            self._total_sq -= old * old
+        self._window.append(value)
+        self._total += value
+        self._total_sq += value * value
+
+        if len(self._window) == self._period:
+            middle: float = self._total / self._period
+            variance: float = self._total_sq / self._period - middle * middle
+            stddev: float = math.sqrt(variance) if variance > 1e-14 else 0.0
+            self._value = (
+                middle + self._nbdevup * stddev,
+                middle,
+                middle - self._nbdevdn * stddev,
+            )
+        return self._value
@@ -0,0 +1,135 @@
+""" Low-overhead counters and latency histograms
+
+Tracing is off by default, in which case instrumented code only pays for reading the
+`ENABLED` flag. Once enabled, latencies (in ns) are recorded into histograms with
+power-of-two buckets, so recording a value is constant time and allocation free.
+
+    from trbot import tracing
+    tracing.enable()
+    strategy.run(fast_forward=True)
+    print(tracing.to_prometheus())
+"""
+import json, threading
+
+
+ENABLED: bool = False
+
+# Bucket i holds the values in (2^(i + _MIN_BITS - 1), 2^(i + _MIN_BITS)] ns, so that its
+# upper bound is inclusive like a Prometheus `le` bound
+_MIN_BITS: int = 7   # (first bucket: <= 128ns)
+_NUM_BUCKETS: int = 30   # (last bucket: >= ~34s)
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self._buckets: list[int] = [0] * _NUM_BUCKETS
+        self._count: int = 0
+        self._sum: int = 0
+        self._min: int = 0
+        self._max: int = 0
+
+    def record(self, value_ns: int) -> None:
+        i: int = (value_ns - 1).bit_length() - _MIN_BITS
+        self._buckets[0 if i < 0 else (_NUM_BUCKETS - 1 if i >= _NUM_BUCKETS else i)] += 1
+        if self._count == 0 or value_ns < self._min:
+            self._min = value_ns
+        if value_ns > self._max:
+            self._max = value_ns
+        self._count += 1
+        self._sum += value_ns
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def percentile(self, q: float) -> int:
+        """ Upper bound (in ns) of the bucket holding the q-th percentile (q within [0, 100]) """
+        if self._count == 0:
+            return 0
+        rank: float = q / 100.0 * self._count
+        seen: int = 0
+        for i, n in enumerate(self._buckets):
+            seen += n
+            if seen >= rank and n > 0:
+                return min(_upper_bound(i), self._max)
+        return self._max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self._count,
+            "sum_ns": self._sum,
+            "min_ns": self._min,
+            "max_ns": self._max,
+            "mean_ns": self._sum / self._count if self._count > 0 else 0.0,
+            "p50_ns": self.percentile(50),
+            "p90_ns": self.percentile(90),
+            "p99_ns": self.percentile(99),
+        }
+
+
+_lock: threading.Lock = threading.Lock()
+_counters: dict[str, int] = {}
+_histograms: dict[str, Histogram] = {}
+
+def enable() -> None:
+    global ENABLED
+    ENABLED = True
+
+def disable() -> None:
+    global ENABLED
+    ENABLED = False
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+def count(name: str, n: int = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def observe(name: str, value_ns: int) -> None:
+    with _lock:
+        hist: Histogram | None = _histograms.get(name)
+        if hist is None:
+            hist = Histogram()
+            _histograms[name] = hist
+        hist.record(value_ns)
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "histograms": { name: hist.to_dict() for name, hist in _histograms.items() },
+        }
+
+def to_json(indent: int | None = 4) -> str:
+    return json.dumps(snapshot(), indent=indent)
+
+def to_prometheus(prefix: str = "trbot") -> str:
+    """ Counters and histograms in the Prometheus text exposition format (latencies in seconds) """
+    lines: list[str] = []
+    with _lock:
+        for name, value in sorted(_counters.items()):
+            metric: str = f"{prefix}_{_sanitize(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+        for name, hist in sorted(_histograms.items()):
+            metric = f"{prefix}_{_sanitize(name)}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative: int = 0
+            for i, n in enumerate(hist._buckets[:-1]):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{_upper_bound(i) / 1e9:.9g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {hist._count}')
+            lines.append(f"{metric}_sum {hist._sum / 1e9:.9g}")
+            lines.append(f"{metric}_count {hist._count}")
+
+    return "\n".join(lines) + "\n"
+
+def _upper_bound(bucket: int) -> int:
+    return 1 << (bucket + _MIN_BITS)
+
+def _sanitize(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
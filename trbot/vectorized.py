@@ -0,0 +1,98 @@
+""" Vectorized signal-based backtests
+
+Instead of deciding on every candle in `on_candle`, a `SignalStrategy` declares its entry
+and exit signals as boolean masks over the whole stockframe, e.g.
+
+    class MyStrategy(SignalStrategy):
+        def signals(self) -> tuple[Signal, Signal]:
+            fast = talib.EMA(self.sf.close, timeperiod=8)
+            slow = talib.EMA(self.sf.close, timeperiod=21)
+            return self.crossover(fast, slow), self.crossover(slow, fast)
+
+Only the candles with a signal go through the broker (one at a time, in order, so the
+capital checks are the same as in the per-candle path), which makes a backtest cost
+about as much as computing its indicators.
+"""
+from abc import abstractmethod
+
+import numpy as np
+from numpy.typing import NDArray
+
+from . import broker, candles, indgraph
+from .portfolio import Order, OrderType, Portfolio
+from .strategy import BaseStrategy
+
+
+Signal = NDArray[np.bool_]
+IndValues = NDArray[np.float64]
+
+def crossover(val1: IndValues | float, val2: IndValues | float) -> Signal:
+    """ Whether val1 crosses above val2 on every candle (i.e. vectorized `Strategy.ind_crossover`)
+
+    The first candle never has a crossover, as there's no candle before it to compare to.
+    """
+    a: NDArray[np.float64] = np.asarray(val1, dtype=np.float64)
+    b: NDArray[np.float64] = np.asarray(val2, dtype=np.float64)
+    size: int = max(a.size, b.size)
+    a = np.broadcast_to(a, (size,))
+    b = np.broadcast_to(b, (size,))
+
+    mask: Signal = np.zeros(size, dtype=np.bool_)
+    # NOTE: comparisons with NaN (e.g. during an indicator's warm up) are false, same as
+    # in the per-candle path
+    np.logical_and(a[:-1] < b[:-1], a[1:] > b[1:], out=mask[1:])
+    return mask
+
+
+class SignalStrategy(BaseStrategy):
+    def start_at(self, dt_str: str) -> None:
+        """ Start from the first candle at or after a certain time """
+        self._start = int(np.searchsorted(
+            self._sf.timestamps, candles.datetime_to_timestamp(dt_str), side="left"
+        ))
+
+    def indicators(self, **nodes: indgraph.Node) -> dict[str, IndValues]:
+        """ Evaluate indicator graph nodes over the stockframe (see `indgraph`) """
+        return indgraph.evaluate(nodes, self._sf, self._graph_memo)
+
+    def crossover(self, val1: IndValues | float, val2: IndValues | float) -> Signal:
+        """ Same as `crossover`, except that no candle before the start is looked at """
+        mask: Signal = crossover(val1, val2)
+        mask[:self._start + 1] = False
+        return mask
+
+    @abstractmethod
+    def signals(self) -> tuple[Signal, Signal]:
+        """ (entries, exits) masks over the candles of the stockframe
+
+        An entry buys and an exit sells on the close of the candle. When both are set on
+        the same candle, the entry wins (like a strategy that checks it first).
+        """
+        pass
+
+    def run(self, size: int = 1) -> Portfolio:
+        """ Backtest the signals, `size` shares per order """
+        entries, exits = self.signals()
+        entries = np.asarray(entries, dtype=np.bool_)
+        exits = np.asarray(exits, dtype=np.bool_) & ~entries
+        if self._start > 0:
+            entries = entries.copy()
+            entries[:self._start] = False
+            exits[:self._start] = False
+
+        index: NDArray[np.intp] = np.flatnonzero(entries | exits)
+        quantity: NDArray[np.float64] = np.where(entries[index], float(size), float(size) * -1.0)
+        price: NDArray[np.float64] = self._sf.close[index]
+        dates: NDArray[np.str_] = candles.timestamps_to_datetimes(self._sf.timestamps[index])
+
+        for qty, px, dt in zip(quantity.tolist(), price.tolist(), dates.tolist()):
+            order = Order(
+                symbol=self._sf.ticker,
+                order_type=OrderType.MARKET,
+                quantity=qty,
+                purchase_price=px,
+                purchase_dt=dt
+            )
+            broker.execute_order(order, self._portfolio)
+
+        return self._portfolio